@@ -0,0 +1,67 @@
+"""
+Benchmark: denoise time against image size for every mode, whole-image vs tiled.
+
+    python benchmarks/bench_denoise.py                          # 1, 4 and 12 megapixels
+    python benchmarks/bench_denoise.py --sizes 1 24 --modes fast balanced --json denoise.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from image_ops import DENOISE_MODES, denoise, denoise_tiled  # noqa: E402
+
+
+def make_image(megapixels: float, sigma: float = 15.0, seed: int = 0) -> np.ndarray:
+    """
+    Smooth 3:2 colour scene with additive Gaussian noise.
+    """
+    rng = np.random.default_rng(seed)
+    width = int(np.sqrt(megapixels * 1e6 * 3 / 2))
+    height = int(megapixels * 1e6 / width)
+    scene = cv2.resize(rng.integers(0, 256, (24, 36, 3), dtype=np.uint8), (width, height),
+                       interpolation=cv2.INTER_CUBIC)
+    noisy = scene + rng.normal(0, sigma, scene.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12], help="megapixels")
+    parser.add_argument("--modes", nargs="+", default=list(DENOISE_MODES), choices=list(DENOISE_MODES))
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--overlap", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'mode':<9} {'MP':>5} {'shape':>11} {'whole (s)':>10} {'tiled (s)':>10} {'speedup':>8}")
+    for megapixels in args.sizes:
+        img = make_image(megapixels)
+        for mode in args.modes:
+            params = DENOISE_MODES[mode]
+            whole = timed(lambda: denoise(img, params))
+            tiled = timed(lambda: denoise_tiled(img, params, args.tile_size, args.overlap, args.workers))
+            shape = f"{img.shape[1]}x{img.shape[0]}"
+            print(f"{mode:<9} {megapixels:>5g} {shape:>11} {whole:>10.2f} {tiled:>10.2f} {whole / tiled:>7.2f}x")
+            results.append({"mode": mode, "megapixels": megapixels, "width": img.shape[1], "height": img.shape[0],
+                            "whole_seconds": whole, "tiled_seconds": tiled, "workers": args.workers})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
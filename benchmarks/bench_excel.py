@@ -0,0 +1,72 @@
+"""
+Benchmark: workbook ingestion (workbook.read_workbook) vs the former openpyxl path.
+
+The baseline is what /analyze did before: pd.read_excel(engine="openpyxl"), which
+reads only the first sheet. The workbook reader is timed for every sheet, sequentially and with parser threads, with each
+engine that is installed (calamine needs `pip install python-calamine`).
+
+    python benchmarks/bench_excel.py                    # 4 sheets x 50k rows
+    python benchmarks/bench_excel.py --sheets 8 --rows 20000 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+import workbook  # noqa: E402
+
+
+def make_workbook(path: str, sheets: int, rows: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(path) as writer:
+        for i in range(sheets):
+            pd.DataFrame({
+                "id": np.arange(rows),
+                "value": np.where(rng.random(rows) < 0.05, np.nan, rng.normal(size=rows)),
+                "city": rng.choice(["Oslo", "Lima", "Pune", " Kyiv "], rows),
+                "qty": rng.integers(0, 100, rows),
+            }).to_excel(writer, sheet_name=f"sheet_{i}", index=False)
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        print(f"Writing {args.sheets} sheets x {args.rows} rows ...")
+        make_workbook(path, args.sheets, args.rows)
+        print(f"workbook size: {os.path.getsize(path) / 1e6:.1f} MB, cpus: {os.cpu_count()}")
+
+        first = timed(lambda: pd.read_excel(path, engine="openpyxl"), args.repeat)
+        print(f"{'openpyxl, first sheet only (former /analyze)':<48} {first:8.2f} s")
+        engines = ["openpyxl"] + (["calamine"] if workbook.HAS_CALAMINE else [])
+        for engine in engines:
+            for workers in sorted({1, args.workers}):
+                seconds = timed(lambda: workbook.read_workbook(path, "xlsx", workers, engine), args.repeat)
+                label = f"{engine}, all {args.sheets} sheets, {workers} worker(s)"
+                print(f"{label:<48} {seconds:8.2f} s  ({seconds / args.sheets:.2f} s/sheet)")
+        if not workbook.HAS_CALAMINE:
+            print("python-calamine is not installed; only the openpyxl engine was timed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark: fused single-pass profiler vs the original describe()-based analyze_tabular.
+
+    python benchmarks/bench_profiler.py                 # wide (1000 cols) + tall (10M rows)
+    python benchmarks/bench_profiler.py --tall-rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from profiler import profile_frame  # noqa: E402
+
+# The baseline relies on select_dtypes('object') still matching pandas 3 'str' columns
+warnings.filterwarnings("ignore", message=".*'str' dtypes are included by select_dtypes")
+
+
+def describe_profile(df: pd.DataFrame) -> dict:
+    """
+    The analyze_tabular implementation profile_frame replaced, kept as the baseline.
+    """
+    analysis = {
+        "rows": int(len(df)),
+        "columns": int(len(df.columns)),
+        "columns_list": list(df.columns),
+        "missing_values": df.isnull().sum().astype(int).to_dict(),
+        "duplicates": int(df.duplicated().sum()),
+        "dtypes": {k: str(v) for k, v in df.dtypes.items()},
+        "numeric_columns": list(df.select_dtypes(include=[np.number]).columns),
+        "categorical_columns": list(df.select_dtypes(include=['object', 'category']).columns)
+    }
+    if analysis["numeric_columns"]:
+        desc = df[analysis["numeric_columns"]].describe()
+        analysis["stats"] = {
+            col: {stat: float(desc.at[stat, col]) for stat in ["mean", "std", "min", "max", "25%", "75%"]}
+            for col in analysis["numeric_columns"]
+        }
+    return analysis
+
+
+def make_frame(rows: int, numeric_cols: int, text_cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(numeric_cols):
+        values = rng.normal(size=rows)
+        values[rng.random(rows) < 0.05] = np.nan
+        data[f"num_{i}"] = values
+    for i in range(text_cols):
+        data[f"txt_{i}"] = rng.choice(np.array(["alpha", "beta", "gamma", None], dtype=object), rows)
+    return pd.DataFrame(data)
+
+
+def best_of(fn, df, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wide-rows", type=int, default=10_000)
+    parser.add_argument("--wide-cols", type=int, default=1_000)
+    parser.add_argument("--tall-rows", type=int, default=10_000_000)
+    parser.add_argument("--tall-cols", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = {
+        "wide": make_frame(args.wide_rows, args.wide_cols - args.wide_cols // 10, args.wide_cols // 10),
+        "tall": make_frame(args.tall_rows, args.tall_cols, 1),
+    }
+    print(f"{'case':<6} {'shape':>18} {'describe (s)':>13} {'fused (s)':>10} {'speedup':>8}")
+    for name, df in cases.items():
+        baseline = best_of(describe_profile, df, args.repeat)
+        fused = best_of(profile_frame, df, args.repeat)
+        shape = f"{df.shape[0]}x{df.shape[1]}"
+        print(f"{name:<6} {shape:>18} {baseline:>13.3f} {fused:>10.3f} {baseline / fused:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: API cold start. Every run is a fresh interpreter in an empty working directory.
+
+- import: time to `import main`, which heavy modules that loaded, and the slowest
+  imports by `python -X importtime`;
+- first response: time from launching uvicorn until GET / answers, and the
+  latency of a first small CSV /analyze sent --settle seconds later (which pays
+  for whatever is still to load, such as the job pool's workers), without and
+  with WARMUP=1.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --json startup.json
+    python benchmarks/bench_startup.py --server-dir ../old-checkout/server   # compare another tree
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "polars", "cv2", "openpyxl", "openai", "google.generativeai")
+CSV = "id,value,name\n" + "".join(f"{i},{i * 0.5 if i % 7 else ''},{' n' if i % 3 else 'N'}\n" for i in range(200))
+
+IMPORT_PROBE = """
+import sys, time, json
+sys.path.insert(0, {server_dir!r})
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(server_dir: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        probe = IMPORT_PROBE.format(server_dir=os.path.abspath(server_dir), heavy=HEAVY_MODULES)
+        run = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=tmp,
+                             capture_output=True, text=True, check=True)
+    result = json.loads(run.stdout.strip().splitlines()[-1])
+    # "import time: self | cumulative | name"; nesting shows as leading spaces before the name
+    slowest = []
+    for line in run.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) <= 3:
+            slowest.append((int(cumulative) / 1e6, name.strip()))
+    slowest.sort(reverse=True)
+    result["slowest"] = [{"module": name, "seconds": round(seconds, 4)} for seconds, name in slowest[:10]]
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_response(server_dir: str, warmup: bool, settle: float, timeout: float = 120.0) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "WARMUP": "1" if warmup else "0"}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir",
+                                   os.path.abspath(server_dir), "--port", str(port), "--log-level", "warning"],
+                                  cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                if time.perf_counter() - start > timeout or server.poll() is not None:
+                    raise RuntimeError("server did not come up")
+                try:
+                    if requests.get(base + "/", timeout=1).status_code == 200:
+                        break
+                except requests.ConnectionError:
+                    time.sleep(0.005)
+            first_response = time.perf_counter() - start
+            time.sleep(settle)
+            sent = time.perf_counter()
+            response = requests.post(base + "/analyze", files={"file": ("bench.csv", CSV, "text/csv")}, timeout=timeout)
+            response.raise_for_status()
+            first_analyze = time.perf_counter() - sent
+        finally:
+            server.terminate()
+            server.wait()
+    return {"first_response": first_response, "first_analyze": first_analyze}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server-dir", default=SERVER_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds between the first response and /analyze")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    imports = [measure_import(args.server_dir) for _ in range(args.repeat)]
+    import_seconds = statistics.median(r["seconds"] for r in imports)
+    print(f"{'import main':<36} {import_seconds:8.3f} s   heavy modules loaded: {imports[0]['loaded'] or 'none'}")
+    for entry in imports[0]["slowest"][:5]:
+        print(f"    {entry['module']:<32} {entry['seconds']:8.3f} s")
+
+    results = {"import_seconds": import_seconds, "loaded_at_import": imports[0]["loaded"],
+               "slowest_imports": imports[0]["slowest"]}
+    for warmup in (False, True):
+        runs = [measure_first_response(args.server_dir, warmup, args.settle) for _ in range(args.repeat)]
+        label = "WARMUP=1" if warmup else "lazy"
+        for key, name in (("first_response", "first GET /"), ("first_analyze", "first /analyze latency")):
+            seconds = statistics.median(run[key] for run in runs)
+            results[f"{key}_seconds{'_warmup' if warmup else ''}"] = seconds
+            print(f"{f'{name} ({label})':<36} {seconds:8.3f} s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "settle": args.settle, **results}, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite: time and peak memory of every stage, on seeded messy data.
+
+Stages measured on a table from datagen.messy_table and an image from
+datagen.noisy_image:
+
+- agent.analyze_tabular and agent.generate_cleaning_plan;
+- CleaningOps.clean_tabular, once per plan action, each on the frame the
+  previous actions produced;
+- CleaningOps.clean_image with the agent's image plan;
+- the API end to end (/analyze, /clean, /download) through a FastAPI test client.
+
+Time is the best of --repeat runs; peak memory is the tracemalloc peak of one
+more run (Python and NumPy allocations, not Arrow buffers). Results are
+written as JSON with the commit and library versions, and compared against an
+earlier run with --baseline:
+
+    python benchmarks/bench_suite.py --json bench.json
+    python benchmarks/bench_suite.py --rows 1000000 --cols 20 --megapixels 4
+    python benchmarks/bench_suite.py --baseline bench.json --tolerance 0.2   # exit 1 on a regression
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from datagen import messy_table, noisy_image  # noqa: E402
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_mb(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def measure(results: list, name: str, fn, repeat: int, **details) -> None:
+    entry = {"name": name, "seconds": round(timed(fn, repeat), 4), "peak_mb": round(peak_mb(fn), 2), **details}
+    results.append(entry)
+    print(f"{name:<44} {entry['seconds']:9.3f} s {entry['peak_mb']:9.1f} MB")
+
+
+def bench_tabular(results: list, df: pd.DataFrame, repeat: int) -> None:
+    from agent import agent
+    from cleaning_ops import CleaningOps
+
+    measure(results, "analyze_tabular", lambda: agent.analyze_tabular(df), repeat)
+    analysis = agent.analyze_tabular(df)
+    measure(results, "generate_cleaning_plan", lambda: agent.generate_cleaning_plan(analysis), repeat)
+    plan = agent.generate_cleaning_plan(analysis)["plan"]
+
+    current = df
+    for step in plan:
+        frame = current
+        measure(results, f"clean_tabular:{step['action']}", lambda: CleaningOps.clean_tabular(frame.copy(), [step]),
+                repeat, rows_in=len(frame))
+        current, _ = CleaningOps.clean_tabular(frame.copy(), [step])
+
+
+def bench_image(results: list, tmp: str, megapixels: float, sigma: float, repeat: int) -> None:
+    from agent import agent
+    from cleaning_ops import CleaningOps
+
+    image_path = os.path.join(tmp, "noisy.png")
+    output_path = os.path.join(tmp, "noisy_cleaned.png")
+    cv2.imwrite(image_path, noisy_image(megapixels, sigma))
+    measure(results, "analyze_image", lambda: agent.analyze_image(image_path), repeat)
+    plan = agent.generate_cleaning_plan(agent.analyze_image(image_path), "image")["plan"]
+    measure(results, "clean_image", lambda: CleaningOps.clean_image(image_path, output_path, plan), repeat,
+            megapixels=megapixels, actions=[step.get("action") for step in plan])
+
+
+def bench_api(results: list, tmp: str, args) -> None:
+    """
+    Each run uploads a table with a different seed, so neither the upload nor
+    the output cache can answer it.
+    """
+    workdir = os.path.join(tmp, "api")
+    os.makedirs(workdir)
+    os.chdir(workdir)
+    from fastapi.testclient import TestClient
+    import main as server
+
+    timings = {"api:analyze": [], "api:clean": [], "api:download": []}
+    with TestClient(server.app) as client:
+        for run in range(args.repeat):
+            body = messy_table(args.rows, args.cols, args.null_rate, args.duplicate_rate, args.outlier_rate,
+                               args.string_noise, args.seed + 1 + run).to_csv(index=False)
+            start = time.perf_counter()
+            analyzed = client.post("/analyze", files={"file": ("bench.csv", body, "text/csv")})
+            analyzed.raise_for_status()
+            timings["api:analyze"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cleaned = client.post(f"/clean/{analyzed.json()['file_id']}")
+            cleaned.raise_for_status()
+            timings["api:clean"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            download = client.get(cleaned.json()["download_url"])
+            download.raise_for_status()
+            timings["api:download"].append(time.perf_counter() - start)
+
+    for name, runs in timings.items():
+        results.append({"name": name, "seconds": round(min(runs), 4), "executor": os.environ["JOB_EXECUTOR"]})
+        print(f"{name:<44} {min(runs):9.3f} s")
+    total = min(map(sum, zip(*timings.values())))
+    results.append({"name": "api:end_to_end", "seconds": round(total, 4), "executor": os.environ["JOB_EXECUTOR"]})
+    print(f"{'api:end_to_end':<44} {total:9.3f} s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                "opencv": cv2.__version__}
+    for module in ("polars", "pyarrow"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return {"commit": git_commit(), "platform": platform.platform(), "cpus": os.cpu_count(), "versions": versions,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+
+
+def regressions(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Stages that got slower, or used more memory, than in `baseline` by more than `tolerance`.
+    """
+    before = {entry["name"]: entry for entry in baseline["results"]}
+    found = []
+    for entry in results:
+        old = before.get(entry["name"])
+        if old is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if metric in entry and old.get(metric) and entry[metric] > old[metric] * (1 + tolerance):
+                found.append(f"{entry['name']} {metric}: {old[metric]} -> {entry[metric]} "
+                             f"(+{entry[metric] / old[metric] - 1:.0%})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--string-noise", type=float, default=0.1)
+    parser.add_argument("--megapixels", type=float, default=1.0)
+    parser.add_argument("--sigma", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="JOB_EXECUTOR for the API stage")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["tabular", "image", "api"])
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a regression")
+    args = parser.parse_args()
+    # Read by config when main is imported
+    os.environ["JOB_EXECUTOR"] = args.executor
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ("json", "baseline", "tolerance", "skip")}
+    print(f"messy table: {args.rows} rows x {args.cols} columns, image: {args.megapixels} MP, cpus: {os.cpu_count()}")
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if "tabular" not in args.skip:
+                df = messy_table(args.rows, args.cols, args.null_rate, args.duplicate_rate, args.outlier_rate,
+                                 args.string_noise, args.seed)
+                bench_tabular(results, df, args.repeat)
+                del df
+            if "image" not in args.skip:
+                bench_image(results, tmp, args.megapixels, args.sigma, args.repeat)
+            if "api" not in args.skip:
+                bench_api(results, tmp, args)
+        finally:
+            os.chdir(cwd)
+
+    report = {"environment": environment(), "parameters": parameters, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != parameters:
+            print("warning: the baseline was run with different parameters")
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
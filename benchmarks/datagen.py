@@ -0,0 +1,129 @@
+"""
+Seeded generator of messy tables and noisy images for benchmarks and load tests.
+
+    python benchmarks/datagen.py --rows 1000000 --cols 12 --out messy.csv
+    python benchmarks/datagen.py --rows 50000 --null-rate 0.2 --duplicate-rate 0.1 --out messy.parquet
+    python benchmarks/datagen.py --image 4 --sigma 20 --out noisy.png
+
+The same arguments and seed always produce the same bytes.
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+WORDS = np.array(["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"])
+
+
+def add_string_noise(values: np.ndarray, rate: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Pads, upper-cases or title-cases a `rate` share of the strings, the
+    inconsistencies clean_text and text standardization deal with.
+    """
+    values = values.astype(object)
+    noisy = np.flatnonzero(rng.random(len(values)) < rate)
+    kinds = rng.integers(0, 4, len(noisy))
+    for i, kind in zip(noisy, kinds):
+        v = values[i]
+        values[i] = (f" {v}", f"{v}  ", v.upper(), v.title())[kind]
+    return values
+
+
+def messy_table(rows: int = 100_000, cols: int = 10, null_rate: float = 0.05, duplicate_rate: float = 0.05,
+                outlier_rate: float = 0.01, string_noise: float = 0.1, seed: int = 0) -> pd.DataFrame:
+    """
+    A table of `rows` rows (duplicates included) and `cols` columns: about half
+    float measurements, a fifth integer counts, the rest low-cardinality text.
+
+    - `null_rate` of every column's cells are missing (integer columns then read back as floats);
+    - `duplicate_rate` of the rows repeat an earlier row exactly;
+    - `outlier_rate` of the float cells are 20-50x the column's spread away from its centre;
+    - `string_noise` of the text cells carry stray whitespace or changed case.
+    """
+    rng = np.random.default_rng(seed)
+    unique_rows = max(1, rows - int(rows * duplicate_rate))
+    n_float = max(1, cols // 2)
+    n_int = cols // 5
+    n_text = max(0, cols - n_float - n_int)
+
+    data = {}
+    for i in range(n_float):
+        centre, spread = rng.uniform(-100, 100), rng.uniform(1, 20)
+        values = rng.normal(centre, spread, unique_rows).round(3)
+        outliers = rng.random(unique_rows) < outlier_rate
+        values[outliers] = centre + spread * rng.choice([-1, 1], outliers.sum()) * rng.uniform(20, 50, outliers.sum())
+        data[f"measure_{i}"] = values
+    for i in range(n_int):
+        data[f"count_{i}"] = rng.integers(0, 1000, unique_rows)
+    for i in range(n_text):
+        vocabulary = WORDS[:int(rng.integers(3, len(WORDS) + 1))]
+        data[f"label_{i}"] = add_string_noise(rng.choice(vocabulary, unique_rows), string_noise, rng)
+    df = pd.DataFrame(data)
+
+    for col in df.columns:
+        missing = rng.random(unique_rows) < null_rate
+        if missing.any():
+            if pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(float).mask(missing)
+            else:
+                df[col] = df[col].mask(missing)
+
+    # Exact repeats of earlier rows, spread through the table
+    repeats = df.iloc[rng.integers(0, unique_rows, rows - unique_rows)]
+    df = pd.concat([df, repeats], ignore_index=True)
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+def noisy_image(megapixels: float = 1.0, sigma: float = 15.0, salt_pepper: float = 0.0, seed: int = 0) -> np.ndarray:
+    """
+    Smooth 3:2 colour scene (BGR, uint8) with Gaussian noise of `sigma` and a
+    `salt_pepper` share of saturated pixels.
+    """
+    rng = np.random.default_rng(seed)
+    width = int(np.sqrt(megapixels * 1e6 * 3 / 2))
+    height = int(megapixels * 1e6 / width)
+    scene = cv2.resize(rng.integers(0, 256, (24, 36, 3), dtype=np.uint8), (width, height),
+                       interpolation=cv2.INTER_CUBIC)
+    noisy = np.clip(scene + rng.normal(0, sigma, scene.shape), 0, 255).astype(np.uint8)
+    if salt_pepper > 0:
+        hit = rng.random((height, width)) < salt_pepper
+        noisy[hit] = rng.choice([0, 255], (int(hit.sum()), 1))
+    return noisy
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    elif path.endswith((".xlsx", ".xls")):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--string-noise", type=float, default=0.1)
+    parser.add_argument("--image", type=float, help="write a noisy image of this many megapixels instead")
+    parser.add_argument("--sigma", type=float, default=15.0)
+    parser.add_argument("--salt-pepper", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help=".csv, .parquet or .xlsx (tables); .png or .jpg (images)")
+    args = parser.parse_args()
+
+    if args.image:
+        cv2.imwrite(args.out, noisy_image(args.image, args.sigma, args.salt_pepper, args.seed))
+    else:
+        write_table(messy_table(args.rows, args.cols, args.null_rate, args.duplicate_rate, args.outlier_rate,
+                                args.string_noise, args.seed), args.out)
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
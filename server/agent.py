@@ -3,9 +3,13 @@ import numpy as np
 import io
 import json
 import os
-from typing import Dict, Any, List, Union
+from typing import Callable, Dict, Any, List, Optional, Union, Iterable
 
-# Optional: Import LLM libraries if we were to strictly use them
+import config
+from profiler import StreamingProfiler, profile_frame
+
+# Optional: Import LLM libraries if we were to strictly use them, inside the method that
+# calls them (like OpenCV below), so servers that never do skip their import cost
 # from google.generativeai import configure, GenerativeModel
 # from openai import OpenAI
 
@@ -20,43 +24,51 @@ class CleaningAgent:
         """
         Analyzes a dataframe to find issues using heuristic profiling.
         """
-        # Safe casting for JSON serialization
-        analysis = {
-            "rows": int(len(df)),
-            "columns": int(len(df.columns)),
-            "columns_list": list(df.columns),
-            "missing_values": df.isnull().sum().astype(int).to_dict(),
-            "duplicates": int(df.duplicated().sum()),
-            "dtypes": {k: str(v) for k, v in df.dtypes.items()},
-            "numeric_columns": list(df.select_dtypes(include=[np.number]).columns),
-            "categorical_columns": list(df.select_dtypes(include=['object', 'category']).columns)
-        }
-        
-        # Enhanced Stats with safe types
-        if analysis["numeric_columns"]:
-            desc = df[analysis["numeric_columns"]].describe()
-            clean_stats = {}
-            for col in analysis["numeric_columns"]:
-                clean_stats[col] = {
-                    "mean": float(desc.at['mean', col]),
-                    "std": float(desc.at['std', col]),
-                    "min": float(desc.at['min', col]),
-                    "max": float(desc.at['max', col]),
-                    "25%": float(desc.at['25%', col]),
-                    "75%": float(desc.at['75%', col])
-                }
-            analysis["stats"] = clean_stats
-            
-        return analysis
+        # One fused pass per column; JSON-safe types (missing stats become None)
+        return profile_frame(df)
+
+    def analyze_tabular_chunks(self, chunks: Iterable[pd.DataFrame],
+                               on_update: Optional[Callable[[StreamingProfiler], None]] = None) -> Dict[str, Any]:
+        """
+        Out-of-core variant of analyze_tabular for files too large to load at once.
+        Returns the same analysis shape; quantiles and (past a limit) duplicates are approximate.
+        `on_update` sees the profiler after every chunk.
+        """
+        profiler = StreamingProfiler(
+            quantile_k=config.QUANTILE_SKETCH_K,
+            exact_duplicate_limit=config.EXACT_DUPLICATE_LIMIT
+        )
+        for chunk in chunks:
+            profiler.update(chunk)
+            if on_update:
+                on_update(profiler)
+        return profiler.to_analysis()
 
     def analyze_image(self, image_path: str) -> Dict[str, Any]:
         """
         Analyzes an image for noise and artifacts.
         """
+        # OpenCV is imported on first use: tabular-only servers start without it
+        import cv2
+        from image_ops import measure_image
+
+        img = cv2.imread(image_path)
+        if img is None:
+            raise ValueError("Image not found")
+        measurements = measure_image(img, config.IMAGE_ANALYSIS_MAX_SIDE)
+
+        issues = []
+        if measurements["noise_sigma"] >= config.IMAGE_NOISE_SKIP_SIGMA:
+            issues.append("High Frequency Noise")
+        if measurements["blockiness"] >= config.IMAGE_BLOCKINESS_THRESHOLD:
+            issues.append("Compression Artifacts")
+        if measurements.get("chroma_sigma", 0) >= config.IMAGE_NOISE_SKIP_SIGMA:
+            issues.append("Color Instability")
         return {
             "type": "image",
             "path": image_path,
-            "detected_issues": ["High Frequency Noise", "Compression Artifacts", "Color Instability"]
+            "detected_issues": issues,
+            **measurements
         }
 
     def generate_cleaning_plan(self, analysis: Dict[str, Any], data_type: str = "tabular") -> Dict[str, Any]:
@@ -139,17 +151,49 @@ class CleaningAgent:
                 })
         
         elif data_type == "image":
-            reasoning.append("Input image analysis reveals Gaussian noise patterns.")
-            reasoning.append("Applying Non-local Means Denoising algorithm for edge preservation.")
-            steps.append({
-                "step": "denoise",
-                "reason": "Noise reduction with edge preservation.",
-                "action": "fastNlMeansDenoisingColored"
-            })
+            sigma = analysis.get("noise_sigma")
+            blocky = analysis.get("blockiness", 1.0) >= config.IMAGE_BLOCKINESS_THRESHOLD
+            if sigma is None:
+                # Analysis without measurements (older cached plans): denoise as before
+                reasoning.append("Applying Non-local Means Denoising algorithm for edge preservation.")
+                steps.append({
+                    "step": "denoise",
+                    "reason": "Noise reduction with edge preservation.",
+                    "action": "fastNlMeansDenoisingColored",
+                    "mode": config.IMAGE_DENOISE_MODE
+                })
+            elif sigma < config.IMAGE_NOISE_SKIP_SIGMA and not blocky:
+                reasoning.append(f"Estimated noise level (sigma {sigma:.1f}) is below {config.IMAGE_NOISE_SKIP_SIGMA:g}; "
+                                 "the image is already clean, skipping denoising.")
+            elif sigma < config.IMAGE_FAST_MODE_SIGMA:
+                # Light noise or block edges only: an edge-preserving bilateral pass is enough
+                reasoning.append(f"Mild noise (sigma {sigma:.1f})" + (" and JPEG blocking" if blocky else "") + " detected.")
+                reasoning.append("Applying a bilateral filter to smooth it while keeping edges.")
+                steps.append({
+                    "step": "denoise",
+                    "reason": "Light smoothing with edge preservation.",
+                    "action": "fastNlMeansDenoisingColored",
+                    "mode": "fast",
+                    "params": {"sigma_color": float(np.clip(4 * sigma, 10, 75))}
+                })
+            else:
+                reasoning.append(f"Input image analysis reveals Gaussian noise patterns (sigma {sigma:.1f}).")
+                reasoning.append("Applying Non-local Means Denoising algorithm for edge preservation.")
+                # Filter strength follows the measured noise instead of a fixed h=10
+                strength = float(np.clip(round(sigma), 3, 20))
+                steps.append({
+                    "step": "denoise",
+                    "reason": "Noise reduction with edge preservation.",
+                    "action": "fastNlMeansDenoisingColored",
+                    "mode": config.IMAGE_DENOISE_MODE,
+                    "params": {"h": strength, "h_color": strength}
+                })
             
         return {
             "plan": steps,
-            "reasoning": reasoning 
+            "reasoning": reasoning,
+            # Planned on the complete analysis; sample-based plans are marked "provisional"
+            "status": "final"
         }
 
 agent = CleaningAgent()
@@ -0,0 +1,65 @@
+import json
+import os
+import re
+import shutil
+import zipfile
+from typing import Dict, Iterable, List, Tuple
+
+TABULAR_EXTENSIONS = ('csv', 'xlsx', 'xls')
+MANIFEST = "manifest.json"
+
+
+def tabular_members(zip_ref: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    CSV/Excel members in archive order, skipping directories and macOS/hidden files.
+    """
+    members = []
+    for info in zip_ref.infolist():
+        if info.is_dir() or info.filename.startswith('__MACOSX'):
+            continue
+        if os.path.basename(info.filename).startswith('.'):
+            continue
+        if info.filename.split('.')[-1].lower() in TABULAR_EXTENSIONS:
+            members.append(info)
+    return members
+
+
+def safe_name(index: int, member_name: str) -> str:
+    # Never trust archive paths on disk (zip-slip); the index keeps equal basenames apart
+    base = re.sub(r'[^A-Za-z0-9._-]', '_', os.path.basename(member_name)) or "member"
+    return f"{index:03d}_{base}"
+
+
+def extract_members(zip_path: str, dest_dir: str, buffer_size: int = 1024 * 1024) -> List[Dict[str, str]]:
+    """
+    Streams every tabular member to `dest_dir` through a `buffer_size` copy buffer,
+    so a member is never held in memory whole. Writes and returns the manifest.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    members = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for index, info in enumerate(tabular_members(zip_ref)):
+            path = os.path.join(dest_dir, safe_name(index, info.filename))
+            with zip_ref.open(info) as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target, buffer_size)
+            members.append({"name": info.filename, "path": path, "ext": info.filename.split('.')[-1].lower()})
+    with open(os.path.join(dest_dir, MANIFEST), 'w') as f:
+        json.dump(members, f)
+    return members
+
+
+def read_manifest(dest_dir: str) -> List[Dict[str, str]]:
+    with open(os.path.join(dest_dir, MANIFEST)) as f:
+        return json.load(f)
+
+
+def write_archive(output_path: str, files: Iterable[Tuple[str, str]], extra: Dict[str, bytes] = None) -> None:
+    """
+    Builds a deflated ZIP from (arcname, path) pairs; ZipFile.write copies in chunks.
+    `extra` adds small in-memory entries such as a JSON report.
+    """
+    with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        for arcname, path in files:
+            zip_ref.write(path, arcname)
+        for arcname, data in (extra or {}).items():
+            zip_ref.writestr(arcname, data)
@@ -0,0 +1,69 @@
+import importlib.util
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from cleaning_ops import CleaningOps
+from metrics import Timings
+from plan_compiler import compile_plan, execute_compiled
+from step_cache import PlanMemo
+
+logger = logging.getLogger(__name__)
+
+# polars is imported by the first polars clean (see warmup), not by every server start
+HAS_POLARS = importlib.util.find_spec("polars") is not None
+
+
+class PandasBackend:
+    """
+    The eager pandas executor: the compiled plan (see plan_compiler), or the
+    step-by-step CleaningOps.clean_tabular with PLAN_OPTIMIZER off. Both resume
+    from and fill `memo` when given (see step_cache).
+    """
+    name = "pandas"
+
+    def clean(self, df: pd.DataFrame, plan: List[Dict[str, Any]], analysis: Optional[Dict[str, Any]] = None,
+              timings: Optional[Timings] = None, memo: Optional[PlanMemo] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        if config.PLAN_OPTIMIZER:
+            compiled = compile_plan(plan, analysis, config.PLAN_COLLAPSE_DUPLICATE_RATIO)
+            return execute_compiled(df, compiled, timings, memo)
+        return CleaningOps.clean_tabular(df, plan, timings, memo)
+
+
+class PolarsBackend:
+    """
+    Lazy, multi-threaded polars executor (see polars_ops). Frames polars cannot
+    represent, such as object columns mixing types, are cleaned by pandas instead.
+    The plan runs as one query, so no per-step timings are recorded and no steps memoized.
+    """
+    name = "polars"
+
+    def clean(self, df: pd.DataFrame, plan: List[Dict[str, Any]], analysis: Optional[Dict[str, Any]] = None,
+              timings: Optional[Timings] = None, memo: Optional[PlanMemo] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        from polars_ops import clean_tabular_polars
+        try:
+            return clean_tabular_polars(df, plan)
+        except Exception as e:
+            # Conversion and compute errors come as polars/arrow exception types
+            logger.warning(f"polars backend failed ({type(e).__name__}: {str(e)}); using pandas")
+        return PandasBackend().clean(df, plan, analysis, timings, memo)
+
+
+BACKENDS = {"pandas": PandasBackend}
+if HAS_POLARS:
+    BACKENDS["polars"] = PolarsBackend
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    The backend called `name`, or CLEAN_BACKEND's. Unknown names are a ValueError;
+    a backend whose library is not installed falls back to pandas.
+    """
+    name = name or config.CLEAN_BACKEND
+    if name not in ("pandas", "polars"):
+        raise ValueError(f"Unknown cleaning backend: {name}. Expected one of ('pandas', 'polars')")
+    if name not in BACKENDS:
+        logger.warning(f"Cleaning backend {name} is not installed; using pandas")
+        name = "pandas"
+    return BACKENDS[name]()
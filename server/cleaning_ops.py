@@ -1,89 +1,100 @@
+import shutil
 import pandas as pd
 import numpy as np
-import cv2
+from outliers import filter_outliers
+from text_ops import clean_text_step
+from metrics import Timings, measure
+from step_cache import PlanMemo
 
 class CleaningOps:
     @staticmethod
-    def clean_tabular(df: pd.DataFrame, plan: list) -> tuple[pd.DataFrame, dict]:
+    def clean_tabular(df: pd.DataFrame, plan: list, timings: Timings = None,
+                      memo: PlanMemo = None) -> tuple[pd.DataFrame, dict]:
+        # Every step is recorded in `timings` (time, memory, rows in and out) when given
         df_clean = df.copy()
         report = {
             "removed_columns": [],
             "imputed_columns": [],
             "outliers_removed": 0,
             "duplicates_removed": 0,
-            "dropped_rows": 0
+            "dropped_rows": 0,
+            "outliers_by_column": {}
         }
+        # Resume after the longest prefix of this plan already run on the same frame (see step_cache)
+        start = 0
+        resumed = memo.resume("stepwise", plan) if memo else None
+        if resumed:
+            start, df_clean, _, report = resumed
         
-        for step in plan:
+        for done, step in enumerate(plan[start:], start + 1):
             action = step.get("action")
-            
-            if action == "drop_columns":
-                cols = step.get("columns", [])
-                df_clean.drop(columns=cols, inplace=True, errors='ignore')
-                report["removed_columns"].extend(cols)
+            with measure(timings, action, "step", len(df_clean)) as entry:
+                if action == "drop_columns":
+                    cols = step.get("columns", [])
+                    df_clean.drop(columns=cols, inplace=True, errors='ignore')
+                    report["removed_columns"].extend(cols)
 
-            elif action == "drop_duplicates":
-                before = len(df_clean)
-                df_clean.drop_duplicates(inplace=True)
-                report["duplicates_removed"] = before - len(df_clean)
-                report["dropped_rows"] += (before - len(df_clean))
+                elif action == "drop_duplicates":
+                    before = len(df_clean)
+                    df_clean.drop_duplicates(inplace=True)
+                    report["duplicates_removed"] = before - len(df_clean)
+                    report["dropped_rows"] += (before - len(df_clean))
                 
-            elif action == "impute_or_drop":
-                details = step.get("details", {})
-                for col, method in details.items():
-                    if col not in df_clean.columns: continue
+                elif action == "impute_or_drop":
+                    details = step.get("details", {})
+                    for col, method in details.items():
+                        if col not in df_clean.columns: continue
                     
-                    if method == "mean":
-                        df_clean[col].fillna(df_clean[col].mean(), inplace=True)
-                        report["imputed_columns"].append(f"{col} (mean)")
-                    elif method == "median":
-                        df_clean[col].fillna(df_clean[col].median(), inplace=True)
-                        report["imputed_columns"].append(f"{col} (median)")
-                    elif method == "mode":
-                        if not df_clean[col].mode().empty:
-                            df_clean[col].fillna(df_clean[col].mode()[0], inplace=True)
-                            report["imputed_columns"].append(f"{col} (mode)")
+                        if method == "mean":
+                            df_clean[col] = df_clean[col].fillna(df_clean[col].mean())
+                            report["imputed_columns"].append(f"{col} (mean)")
+                        elif method == "median":
+                            df_clean[col] = df_clean[col].fillna(df_clean[col].median())
+                            report["imputed_columns"].append(f"{col} (median)")
+                        elif method == "mode":
+                            if not df_clean[col].mode().empty:
+                                df_clean[col] = df_clean[col].fillna(df_clean[col].mode()[0])
+                                report["imputed_columns"].append(f"{col} (mode)")
             
-            elif action == "iqr_filter":
-                cols = step.get("columns", [])
-                initial_rows = len(df_clean)
-                for col in cols:
-                    if col not in df_clean.columns: continue
-                    Q1 = df_clean[col].quantile(0.25)
-                    Q3 = df_clean[col].quantile(0.75)
-                    IQR = Q3 - Q1
-                    lower_bound = Q1 - 1.5 * IQR
-                    upper_bound = Q3 + 1.5 * IQR
-                    # Filter
-                    df_clean = df_clean[(df_clean[col] >= lower_bound) & (df_clean[col] <= upper_bound)]
+                elif action == "iqr_filter":
+                    initial_rows = len(df_clean)
+                    # Bounds for every column come from the same frame; one combined mask
+                    df_clean, flagged = filter_outliers(df_clean, step)
+                    for col, count in flagged.items():
+                        report["outliers_by_column"][col] = report["outliers_by_column"].get(col, 0) + count
                 
-                removed = initial_rows - len(df_clean)
-                report["outliers_removed"] += removed
-                report["dropped_rows"] += removed
+                    removed = initial_rows - len(df_clean)
+                    report["outliers_removed"] += removed
+                    report["dropped_rows"] += removed
 
-            elif action == "clean_text":
-                cols = step.get("columns", [])
-                cleaned_count = 0
-                for col in cols:
-                    if col not in df_clean.columns: continue
-                    # Check if column is object type/string
-                    if df_clean[col].dtype == 'object':
-                        # We can count how many actually changed, or just do it
-                        # For efficiency, we just do it. But to report, let's verify.
-                        # Simple approach: applied to all, assume success.
-                        # Or precise:
-                        # before_hash = df_clean[col].hash_values? No.
-                        df_clean[col] = df_clean[col].astype(str).str.strip()
-                        cleaned_count += 1
+                elif action == "clean_text":
+                    cols = step.get("columns", [])
+                    # Normalizes each distinct value once and reports exact changed-cell counts
+                    df_clean, changed = clean_text_step(df_clean, step)
                 
-                if cleaned_count > 0:
-                    report["standardized_columns"] = report.get("standardized_columns", [])
-                    report["standardized_columns"].extend(cols)
-                    
+                    if changed:
+                        report["standardized_columns"] = report.get("standardized_columns", [])
+                        report["standardized_columns"].extend(cols)
+                        report["standardized_cells"] = report.get("standardized_cells", {})
+                        for col, count in changed.items():
+                            report["standardized_cells"][col] = report["standardized_cells"].get(col, 0) + count
+                entry["rows_out"] = len(df_clean)
+            if memo:
+                memo.store(done, df_clean, None, report)
+
         return df_clean, report
 
     @staticmethod
-    def clean_image(image_path: str, output_path: str, plan: list):
+    def clean_image(image_path: str, output_path: str, plan: list,
+                    tile_size: int = 1024, overlap: int = 16, workers: int = None):
+        if not any(step.get("action") == "fastNlMeansDenoisingColored" for step in plan):
+            # Nothing to do (clean input): keep the original bytes instead of re-encoding
+            shutil.copyfile(image_path, output_path)
+            return output_path
+        # Imported on first use, like in agent.analyze_image
+        import cv2
+        from image_ops import denoise_tiled, resolve_mode
+
         img = cv2.imread(image_path)
         if img is None:
             raise ValueError("Image not found")
@@ -91,7 +102,8 @@ class CleaningOps:
         for step in plan:
             action = step.get("action")
             if action == "fastNlMeansDenoisingColored":
-                img = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+                # Steps without a "mode" keep the original quality settings
+                img = denoise_tiled(img, resolve_mode(step), tile_size, overlap, workers)
                 
         cv2.imwrite(output_path, img)
         return output_path
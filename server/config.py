@@ -0,0 +1,119 @@
+import os
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+CLEANED_DIR = os.environ.get("CLEANED_DIR", "cleaned")
+
+# Out-of-core profiling: CSV uploads above this size are profiled in chunks
+STREAMING_THRESHOLD_MB = float(os.environ.get("STREAMING_THRESHOLD_MB", "256"))
+CHUNK_ROWS = int(os.environ.get("CHUNK_ROWS", "200000"))
+QUANTILE_SKETCH_K = int(os.environ.get("QUANTILE_SKETCH_K", "200"))
+EXACT_DUPLICATE_LIMIT = int(os.environ.get("EXACT_DUPLICATE_LIMIT", "1000000"))
+
+# Streaming executor: row hashes kept in memory before dedupe spills them to partitioned run files
+DEDUPE_MEMORY_LIMIT = int(os.environ.get("DEDUPE_MEMORY_LIMIT", "2000000"))
+
+# Load stage: CSV parser ("c" or the multi-threaded "pyarrow") and lossless dtype
+# shrinking of parsed frames (narrow ints, low-cardinality text as categoricals)
+CSV_ENGINE = os.environ.get("CSV_ENGINE", "c")
+OPTIMIZE_DTYPES = os.environ.get("OPTIMIZE_DTYPES", "0") == "1"
+CATEGORY_MAX_RATIO = float(os.environ.get("CATEGORY_MAX_RATIO", "0.5"))
+
+# Parsed-frame cache (Arrow IPC sidecars written by /analyze, memory-mapped by /clean)
+FRAME_CACHE_DIR = os.environ.get("FRAME_CACHE_DIR", "cache")
+FRAME_CACHE_MAX_MB = float(os.environ.get("FRAME_CACHE_MAX_MB", "2048"))
+
+# Step memoization: frames left after each plan step, kept in memory per process so a
+# re-clean with an edited plan only runs the steps from the first change on (0 disables it)
+STEP_CACHE_MAX_MB = float(os.environ.get("STEP_CACHE_MAX_MB", "512"))
+
+# Upload index (SQLite) and garbage collection of uploads/ and cleaned/ (TTL 0 disables it)
+METADATA_DB = os.environ.get("METADATA_DB", "metadata.db")
+UPLOAD_TTL_SECONDS = int(os.environ.get("UPLOAD_TTL_SECONDS", str(24 * 3600)))
+GC_INTERVAL_SECONDS = int(os.environ.get("GC_INTERVAL_SECONDS", "600"))
+
+# Upload ingestion: chunked async copy, per-file size limit (0: unlimited), and the
+# leading bytes of a CSV analyzed for a provisional plan while the rest arrives
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", "2048"))
+UPLOAD_CHUNK_MB = float(os.environ.get("UPLOAD_CHUNK_MB", "8"))
+UPLOAD_SAMPLE_KB = int(os.environ.get("UPLOAD_SAMPLE_KB", "1024"))
+
+# Progressive analysis: a provisional plan from a reservoir sample of the rows read
+# within the budget, then exact refinements pushed over the job's SSE stream
+ANALYSIS_PREVIEW_BUDGET_MS = int(os.environ.get("ANALYSIS_PREVIEW_BUDGET_MS", "300"))
+ANALYSIS_SAMPLE_ROWS = int(os.environ.get("ANALYSIS_SAMPLE_ROWS", "20000"))
+ANALYSIS_REFINE_INTERVAL_SECONDS = float(os.environ.get("ANALYSIS_REFINE_INTERVAL_SECONDS", "1.0"))
+
+# Content-addressed reuse: identical uploads return the stored analysis/plan, identical
+# (content, plan) cleans return the stored output; both are LRU-evicted past these sizes
+CONTENT_DEDUPE = os.environ.get("CONTENT_DEDUPE", "1") == "1"
+UPLOAD_STORE_MAX_MB = float(os.environ.get("UPLOAD_STORE_MAX_MB", "10240"))
+OUTPUT_CACHE_MAX_MB = float(os.environ.get("OUTPUT_CACHE_MAX_MB", "4096"))
+
+# Job engine: analyze/clean run on a pool so the event loop stays responsive
+JOB_EXECUTOR = os.environ.get("JOB_EXECUTOR", "process")  # "process" or "thread"
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+JOB_MAX_QUEUE = int(os.environ.get("JOB_MAX_QUEUE", "32"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+JOB_EVENTS_POLL_SECONDS = float(os.environ.get("JOB_EVENTS_POLL_SECONDS", "0.25"))
+
+# Plan compiler: prune/reorder/fuse plan steps before execution. Same results as the step-by-step
+# CleaningOps.clean_tabular, whose iqr_filter fits every column's fences on the frame the step
+# receives and drops rows with one joint mask (see outliers.py), unlike re-fitting after each column
+PLAN_OPTIMIZER = os.environ.get("PLAN_OPTIMIZER", "1") == "1"
+PLAN_COLLAPSE_DUPLICATE_RATIO = float(os.environ.get("PLAN_COLLAPSE_DUPLICATE_RATIO", "0.05"))
+
+# Tabular execution backend: "pandas" (eager) or "polars" (lazy, multi-threaded);
+# /clean?backend= overrides it per request
+CLEAN_BACKEND = os.environ.get("CLEAN_BACKEND", "pandas")
+
+# Image denoising: plan mode ("fast", "balanced" or "quality") and the tiled engine's layout
+IMAGE_DENOISE_MODE = os.environ.get("IMAGE_DENOISE_MODE", "balanced")
+IMAGE_TILE_SIZE = int(os.environ.get("IMAGE_TILE_SIZE", "1024"))
+IMAGE_TILE_OVERLAP = int(os.environ.get("IMAGE_TILE_OVERLAP", "16"))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(os.cpu_count() or 1)))
+
+# Image analysis: measured on a copy no larger than this; below the noise sigma (and
+# blockiness) thresholds the planner skips denoising altogether
+IMAGE_ANALYSIS_MAX_SIDE = int(os.environ.get("IMAGE_ANALYSIS_MAX_SIDE", "1024"))
+IMAGE_NOISE_SKIP_SIGMA = float(os.environ.get("IMAGE_NOISE_SKIP_SIGMA", "2.0"))
+IMAGE_FAST_MODE_SIGMA = float(os.environ.get("IMAGE_FAST_MODE_SIGMA", "5.0"))
+IMAGE_BLOCKINESS_THRESHOLD = float(os.environ.get("IMAGE_BLOCKINESS_THRESHOLD", "1.3"))
+
+# Batch endpoints: files per request, and jobs one batch keeps in the pool at once
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "500"))
+BATCH_MAX_IN_FLIGHT = int(os.environ.get("BATCH_MAX_IN_FLIGHT", str(max(2, JOB_WORKERS * 2))))
+
+# Cleaned output: default format of single tables ("" keeps the input's: Excel for Excel,
+# CSV otherwise), rows per written chunk, and how downloads follow outputs still being written
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "")
+OUTPUT_CHUNK_ROWS = int(os.environ.get("OUTPUT_CHUNK_ROWS", "100000"))
+DOWNLOAD_CHUNK_KB = int(os.environ.get("DOWNLOAD_CHUNK_KB", "1024"))
+DOWNLOAD_POLL_SECONDS = float(os.environ.get("DOWNLOAD_POLL_SECONDS", "0.2"))
+
+# Excel workbooks: every sheet is read (calamine when installed, else openpyxl read-only),
+# with this many parser threads; multi-sheet outputs are a workbook or per-sheet Parquet
+EXCEL_WORKERS = int(os.environ.get("EXCEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXCEL_SHEET_FORMAT = os.environ.get("EXCEL_SHEET_FORMAT", "xlsx")  # "xlsx" or "parquet"
+
+# ZIP uploads: members are stream-extracted through this buffer and processed in parallel
+ZIP_COPY_BUFFER_KB = int(os.environ.get("ZIP_COPY_BUFFER_KB", "1024"))
+ZIP_WORKERS = int(os.environ.get("ZIP_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Instrumentation: /clean reports wall/CPU time, peak memory and rows per phase and plan step
+# (also logged as JSON and exported at /metrics). Peak memory is the growth of peak RSS unless
+# TRACE_MEMORY=1 traces allocations with tracemalloc, which is exact per step but slower
+TRACE_MEMORY = os.environ.get("TRACE_MEMORY", "0") == "1"
+
+# Per-request profiling, off unless PROFILING_ENABLED=1: then ?profile=true or an "X-Profile: 1"
+# header runs that /analyze or /clean job under cProfile and tracemalloc, and so does a
+# PROFILE_SAMPLE_RATE share of all of them. Summaries are served at /profiles/{id}
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.0"))
+PROFILES_DIR = os.environ.get("PROFILES_DIR", "profiles")
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "30"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))
+
+# Startup: heavy modules (pandas via the pipeline, OpenCV, polars) load on first use so the
+# server answers quickly after a cold start; WARMUP=1 loads them, and starts the job pool's
+# workers, in the background right after startup instead
+WARMUP = os.environ.get("WARMUP", "0") == "1"
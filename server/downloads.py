@@ -0,0 +1,78 @@
+import asyncio
+import mimetypes
+import os
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+from starlette.concurrency import run_in_threadpool
+
+# Content types of outputs mimetypes does not know
+MEDIA_TYPES = {
+    ".csv.gz": "application/gzip",
+    ".csv.zst": "application/zstd",
+    ".ndjson": "application/x-ndjson",
+    ".parquet": "application/vnd.apache.parquet",
+    ".arrow": "application/vnd.apache.arrow.file",
+}
+# Present next to an output while it is being written; downloads follow the file until it goes
+WRITING_SUFFIX = ".writing"
+
+
+def media_type(path: str) -> str:
+    for suffix, kind in MEDIA_TYPES.items():
+        if path.lower().endswith(suffix):
+            return kind
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def is_writing(path: str) -> bool:
+    return os.path.exists(path + WRITING_SUFFIX)
+
+
+@contextmanager
+def publishing(path: str) -> Iterator[None]:
+    """
+    Marks `path` as being written for the duration of the block, so downloads
+    started meanwhile follow it to the end. An earlier file at `path` is removed
+    first (so it is never served as the new one) and so is a failed write.
+    """
+    marker = path + WRITING_SUFFIX
+    open(marker, "w").close()
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        yield
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        os.remove(marker)
+
+
+async def follow_output(path: str, chunk_size: int = 1024 * 1024, poll_seconds: float = 0.2) -> AsyncIterator[bytes]:
+    """
+    Streams an output file, waiting for more bytes while it is still being
+    written. Raises if the write fails, which aborts the response instead of
+    ending it as if the file were complete.
+    """
+    while not os.path.exists(path):
+        if not is_writing(path):
+            raise FileNotFoundError(path)
+        await asyncio.sleep(poll_seconds)
+    with open(path, "rb") as f:
+        while True:
+            block = await run_in_threadpool(f.read, chunk_size)
+            if block:
+                yield block
+                continue
+            if is_writing(path):
+                await asyncio.sleep(poll_seconds)
+                continue
+            # The writer may have appended its last bytes just before it finished
+            block = await run_in_threadpool(f.read)
+            if not os.path.exists(path):
+                raise IOError(f"Output was removed while streaming: {path}")
+            if block:
+                yield block
+            return
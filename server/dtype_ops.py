@@ -0,0 +1,105 @@
+import datetime
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401  (the engine read_csv(engine="pyarrow") needs)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# pyarrow parses these from text that pandas leaves as strings
+TEMPORAL_TYPES = (pd.Timestamp, datetime.date, datetime.datetime)
+# Signed widths only: unsigned columns would turn differences and negations into wrap-arounds
+INT_WIDTHS = (np.int8, np.int16, np.int32)
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def read_csv(path: str, engine: str = "c") -> pd.DataFrame:
+    """
+    pd.read_csv(path) through the multi-threaded pyarrow parser when `engine` is
+    "pyarrow", with the dtypes the default parser infers.
+
+    pyarrow also recognizes dates and timestamps, which pandas leaves as text
+    unless asked; such columns are read again as strings. Files the pyarrow
+    parser rejects are read by the default one, which raises its usual errors.
+    """
+    if engine != "pyarrow" or not HAS_PYARROW:
+        return pd.read_csv(path)
+    try:
+        df = pd.read_csv(path, engine="pyarrow")
+        temporal = [col for col, dtype in df.dtypes.items()
+                    if pd.api.types.is_datetime64_any_dtype(dtype)
+                    or (dtype == object and df[col].map(type).isin(TEMPORAL_TYPES).any())]
+        if temporal:
+            df = pd.read_csv(path, engine="pyarrow", dtype={col: "str" for col in temporal})
+        return df
+    except Exception as e:
+        logger.warning(f"pyarrow CSV parser failed on {path} ({type(e).__name__}: {str(e)}); using the default parser")
+        return pd.read_csv(path)
+
+
+def _narrowest_int(values: np.ndarray):
+    lo, hi = values.min(), values.max()
+    for width in INT_WIDTHS:
+        info = np.iinfo(width)
+        if info.min <= lo and hi <= info.max:
+            return width
+    return None
+
+
+def optimize_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5,
+                    min_category_rows: int = 64) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Shrinks a parsed frame without changing any value:
+
+    - int64 columns become the narrowest signed width holding their range;
+    - text columns whose distinct values are at most `max_category_ratio` of
+      their rows (and that have `min_category_rows` rows) become categoricals.
+
+    Floats keep float64: float32 would round the means, medians and fences the
+    cleaning steps compute. Returns the frame and {"before_bytes", "after_bytes",
+    "converted": {column: new dtype}}.
+    """
+    before = frame_memory(df)
+    converted = {}
+    columns = {}
+    for col, series in df.items():
+        dtype = series.dtype
+        if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.ArrowDtype) \
+                and dtype.itemsize > 1 and len(series):
+            width = _narrowest_int(series.to_numpy())
+            if width is not None and np.dtype(width).itemsize < dtype.itemsize:
+                columns[col] = series.astype(width)
+        elif (pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+              and len(series) >= min_category_rows):
+            try:
+                distinct = series.nunique(dropna=True)
+            except TypeError:
+                # Unhashable cells (lists, dicts) stay as they are
+                continue
+            if distinct <= max_category_ratio * len(series) and _plain_text(series):
+                columns[col] = series.astype("category")
+        if col in columns:
+            converted[col] = str(columns[col].dtype)
+
+    if columns:
+        df = df.copy(deep=False)
+        for col, series in columns.items():
+            df[col] = series
+    return df, {"before_bytes": before, "after_bytes": frame_memory(df), "converted": converted}
+
+
+def _plain_text(series: pd.Series) -> bool:
+    # Object columns mixing numbers and text would compare differently once categorized
+    if series.dtype != object:
+        return True
+    return bool(series.dropna().map(type).eq(str).all())
+
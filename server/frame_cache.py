@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import pandas as pd
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+
+class FrameCache:
+    """
+    Persists the frame parsed by /analyze as an uncompressed Arrow IPC sidecar,
+    together with its analysis and plan, so /clean can memory-map it instead of
+    parsing the upload again.
+
+    Recency is tracked with the sidecar mtime, which keeps the LRU eviction
+    consistent across several uvicorn workers sharing the same directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _frame_path(self, file_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}.arrow")
+
+    def _meta_path(self, file_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}.json")
+
+    def _write_meta(self, file_id: str, meta: Dict[str, Any]) -> None:
+        # Written aside and renamed over, so readers never see a half-written sidecar
+        tmp_path = self._meta_path(file_id) + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path(file_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, file_id: str, source_path: str, analysis: Dict[str, Any], plan: Dict[str, Any],
+            df: Optional[pd.DataFrame] = None) -> None:
+        stat = os.stat(source_path)
+        meta = {
+            "source_path": source_path,
+            "source_size": stat.st_size,
+            "source_mtime": stat.st_mtime,
+            "analysis": analysis,
+            "plan": plan,
+            "has_frame": False
+        }
+        if df is not None and HAS_ARROW:
+            try:
+                tmp_path = self._frame_path(file_id) + ".tmp"
+                feather.write_feather(df, tmp_path, compression="uncompressed")
+                os.replace(tmp_path, self._frame_path(file_id))
+                meta["has_frame"] = True
+            except (pa.ArrowException, ValueError, TypeError) as e:
+                # Mixed-type object columns or non-string headers can't be stored as Arrow
+                logger.warning(f"Frame cache skipped for {file_id}: {str(e)}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._write_meta(file_id, meta)
+        self.evict()
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached metadata (and the frame under "df" when one was stored),
+        or None if there is no entry or the upload changed or disappeared.
+        """
+        try:
+            with open(self._meta_path(file_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            stat = os.stat(meta["source_path"])
+        except OSError:
+            self.invalidate(file_id)
+            return None
+        if stat.st_size != meta["source_size"] or stat.st_mtime != meta["source_mtime"]:
+            self.invalidate(file_id)
+            return None
+
+        meta["df"] = None
+        if meta["has_frame"] and HAS_ARROW:
+            try:
+                table = feather.read_table(self._frame_path(file_id), memory_map=True)
+                meta["df"] = table.to_pandas()
+                os.utime(self._frame_path(file_id))
+            except (OSError, pa.ArrowException) as e:
+                logger.warning(f"Frame cache entry unreadable for {file_id}: {str(e)}")
+        os.utime(self._meta_path(file_id))
+        return meta
+
+    def set_plan(self, file_id: str, plan: Dict[str, Any]) -> bool:
+        """
+        Attaches a plan chosen after the entry was written (batch planning).
+        Returns False when there is no entry.
+        """
+        try:
+            with open(self._meta_path(file_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        meta["plan"] = plan
+        self._write_meta(file_id, meta)
+        return True
+
+    def invalidate(self, file_id: str) -> None:
+        for path in (self._frame_path(file_id), self._meta_path(file_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self) -> int:
+        """
+        Drops entries whose upload no longer exists. Returns how many were removed.
+        """
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            file_id = name[:-len(".json")]
+            try:
+                with open(self._meta_path(file_id)) as f:
+                    source_path = json.load(f)["source_path"]
+            except (OSError, ValueError, KeyError):
+                source_path = None
+            if not source_path or not os.path.exists(source_path):
+                self.invalidate(file_id)
+                removed += 1
+        return removed
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".arrow"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len(".arrow")]))
+            total += stat.st_size
+
+        for _, size, file_id in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting cached frame: {file_id}")
+            self.invalidate(file_id)
+            total -= size
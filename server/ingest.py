@@ -0,0 +1,139 @@
+import asyncio
+import codecs
+import hashlib
+import os
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Formats the pipeline can process; others are stored and reported as "unknown"
+KNOWN_EXTENSIONS = ('csv', 'xlsx', 'xls', 'zip', 'jpg', 'jpeg', 'png')
+SNIFF_BYTES = 64 * 1024
+
+ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # legacy .xls (Compound File Binary)
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+JPEG_MAGIC = b"\xff\xd8\xff"
+# UTF-16 text (Excel's "Unicode text" export) is recognized by its byte order mark
+UTF16_BOMS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+# Local file headers of an Office Open XML workbook name these parts
+XLSX_MARKERS = (b"[Content_Types].xml", b"xl/")
+
+SampleHandler = Callable[[bytes, str], Awaitable[Any]]
+
+
+class UploadRejected(Exception):
+    """
+    An upload refused before it was stored, with the HTTP status to answer with.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def looks_like_text(head: bytes) -> bool:
+    if head.startswith(UTF16_BOMS):
+        # Judged by its characters; the last one may be cut off by the sniffed block
+        text = head.decode("utf-16", errors="replace")
+        if text.count("\ufffd") > 1:
+            return False
+        head = text.encode("utf-8")
+    # NUL bytes never occur in UTF-8/Latin-1 text; allow a little binary noise otherwise
+    if not head or b"\x00" in head:
+        return False
+    control = sum(head.count(bytes([c])) for c in range(32) if c not in (9, 10, 12, 13))
+    return control <= len(head) // 100
+
+
+def sniff_format(head: bytes, claimed: str) -> Optional[str]:
+    """
+    The extension the content really has, judged from its leading bytes.
+    `claimed` (from the filename) only settles what the bytes cannot: zip vs xlsx,
+    jpg vs jpeg, and formats the pipeline does not handle anyway.
+    Returns None for content that cannot be what a known extension claims.
+    """
+    if head.startswith(ZIP_MAGIC):
+        if claimed in ('xlsx', 'zip'):
+            return claimed
+        return 'xlsx' if any(marker in head for marker in XLSX_MARKERS) else 'zip'
+    if head.startswith(OLE2_MAGIC):
+        return 'xls'
+    if head.startswith(PNG_MAGIC):
+        return 'png'
+    if head.startswith(JPEG_MAGIC):
+        return claimed if claimed in ('jpg', 'jpeg') else 'jpg'
+    if looks_like_text(head):
+        return 'csv' if claimed in KNOWN_EXTENSIONS or claimed == 'txt' else claimed
+    return None if claimed in KNOWN_EXTENSIONS else claimed
+
+
+def _write(target: BinaryIO, digest, block: bytes) -> None:
+    digest.update(block)
+    target.write(block)
+
+
+async def receive_upload(upload: UploadFile, upload_dir: str, file_id: str, max_bytes: int = 0,
+                         chunk_size: int = 8 * 1024 * 1024, sample_bytes: int = 1024 * 1024,
+                         on_sample: Optional[SampleHandler] = None) -> Dict[str, Any]:
+    """
+    Streams an upload to `upload_dir` in `chunk_size` blocks, hashing it on the way.
+
+    The format is sniffed from the first block and names the stored file; UTF-16
+    text is stored as UTF-8, which the parsers read. Uploads over `max_bytes`
+    (0: unlimited) are refused up front when their size is known, and otherwise
+    as soon as the limit is crossed; the partial file is removed.
+    Once `sample_bytes` have arrived (or the upload ends), `on_sample(sample, ext)`
+    starts concurrently with the rest of the copy.
+
+    Returns {"path", "ext", "size", "content_hash", "sample_result"}.
+    """
+    claimed = upload.filename.split('.')[-1].lower()
+    if max_bytes and upload.size is not None and upload.size > max_bytes:
+        raise UploadRejected(413, f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+    block = await upload.read(chunk_size)
+    ext = sniff_format(block[:SNIFF_BYTES], claimed)
+    if ext is None:
+        raise UploadRejected(415, f"File content does not match its .{claimed} extension")
+    path = os.path.join(upload_dir, f"{file_id}.{ext}")
+    decoder = codecs.getincrementaldecoder("utf-16")("replace") if ext == 'csv' and block.startswith(UTF16_BOMS) else None
+
+    digest = hashlib.sha256()
+    size = 0
+    sample = bytearray()
+    sample_task = None
+    target = await run_in_threadpool(open, path, "wb")
+    try:
+        while block:
+            size += len(block)
+            if max_bytes and size > max_bytes:
+                raise UploadRejected(413, f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+            data = decoder.decode(block).encode("utf-8") if decoder else block
+            await run_in_threadpool(_write, target, digest, data)
+            if on_sample and sample_task is None:
+                sample += data[:sample_bytes - len(sample)]
+                if len(sample) >= sample_bytes:
+                    sample_task = asyncio.create_task(on_sample(bytes(sample), ext))
+            block = await upload.read(chunk_size)
+        if decoder:
+            await run_in_threadpool(_write, target, digest, decoder.decode(b"", final=True).encode("utf-8"))
+    except BaseException:
+        target.close()
+        os.remove(path)
+        if sample_task:
+            sample_task.cancel()
+        raise
+    target.close()
+
+    if on_sample and sample_task is None:
+        sample_task = asyncio.create_task(on_sample(bytes(sample), ext))
+    return {
+        "path": path,
+        "ext": ext,
+        "size": size,
+        "content_hash": digest.hexdigest(),
+        "sample_result": await sample_task if sample_task else None,
+    }
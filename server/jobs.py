@@ -0,0 +1,245 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker-side handles, set by _init_worker in every pool process (or thread)
+_events = None
+_cancelled = None
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(BaseException):
+    """
+    Raised at a progress checkpoint of a cancelled job. Derives from BaseException,
+    like asyncio.CancelledError, so pipeline-level `except Exception` handlers let it through.
+    """
+
+
+def _init_worker(events, cancelled) -> None:
+    global _events, _cancelled
+    _events = events
+    _cancelled = cancelled
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def _execute(job_id: str, task: str, kwargs: dict, profile: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Runs inside the pool. Progress is reported through the shared events queue and
+    cancellation is checked cooperatively at every progress checkpoint. With
+    `profile` (profiling.run_profiled's arguments) the task runs under the profilers.
+    """
+    import pipeline
+
+    def progress(stage: str, percent: int, update: Optional[Dict[str, Any]] = None) -> None:
+        if _cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        payload = {"stage": stage, "percent": percent}
+        if update is not None:
+            payload["update"] = update
+        _events.put((job_id, "progress", payload))
+
+    _events.put((job_id, "running", {}))
+    run = lambda: getattr(pipeline, task)(progress=progress, **kwargs)
+    if profile:
+        from profiling import run_profiled
+        return run_profiled(task=task, fn=run, **profile)
+    return run()
+
+
+def _warm() -> None:
+    import pipeline
+    pipeline.warmup()
+
+
+class Job:
+    def __init__(self, job_id: str, task: str):
+        self.id = job_id
+        self.task = task
+        self.status = "queued"
+        self.stage = "queued"
+        self.percent = 0
+        self.result = None
+        # Latest partial result a task pushed with its progress (e.g. refining analysis)
+        self.refinement: Optional[Dict[str, Any]] = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = [{"status": "queued", "stage": "queued", "percent": 0}]
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "task": self.task,
+            "status": self.status,
+            "stage": self.stage,
+            "percent": self.percent,
+            "result": self.result,
+            "refinement": self.refinement,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Runs pipeline tasks on a process (or thread) pool so request handlers never
+    block the event loop. Job state lives in the API process; workers only send
+    progress events back through a queue (a manager queue for the process pool,
+    an in-process one for threads).
+    """
+
+    def __init__(self, executor: str = "process", max_workers: int = 2, max_queue: int = 16,
+                 retention_seconds: int = 3600, on_result: Optional[Callable[[Job], None]] = None):
+        self.executor_kind = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, Job] = {}
+        # Called in the API process with every job that succeeds, e.g. to aggregate its metrics
+        self.on_result = on_result
+        self._lock = threading.Lock()
+        self._pool = None
+        self._manager = None
+
+    def _ensure_pool(self) -> None:
+        if self._pool is not None:
+            return
+        if self.executor_kind == "thread":
+            # Workers share the API process: no manager server, no IPC per event
+            self._events = queue.Queue()
+            self._cancelled = {}
+            _init_worker(self._events, self._cancelled)
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            self._manager = ctx.Manager()
+            self._events = self._manager.Queue()
+            self._cancelled = self._manager.dict()
+            initargs = (self._events, self._cancelled)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=ctx,
+                initializer=_init_worker, initargs=initargs
+            )
+        threading.Thread(target=self._drain_events, daemon=True).start()
+
+    def _drain_events(self) -> None:
+        while True:
+            try:
+                item = self._events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, kind, payload = item
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                continue
+            event = {}
+            if kind == "running":
+                job.status = "running"
+            elif kind == "progress":
+                job.stage = payload["stage"]
+                job.percent = payload["percent"]
+                if "update" in payload:
+                    job.refinement = event["update"] = payload["update"]
+            job.events.append({"status": job.status, "stage": job.stage, "percent": job.percent, **event})
+
+    def warmup(self) -> None:
+        """
+        Starts the pool and has its workers import the pipeline ahead of the first
+        job (best effort: a process pool may hand several of these to one worker).
+        """
+        with self._lock:
+            self._ensure_pool()
+            futures = [self._pool.submit(_warm) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def active_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, task: str, profile: Optional[Dict[str, Any]] = None, **kwargs) -> Job:
+        with self._lock:
+            self._prune()
+            if self.active_count() >= self.max_queue:
+                raise JobQueueFull(f"Job queue is full ({self.max_queue} active jobs)")
+            self._ensure_pool()
+            job = Job(str(uuid.uuid4()), task)
+            self.jobs[job.id] = job
+            job.future = self._pool.submit(_execute, job.id, task, kwargs, profile)
+        job.future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        logger.info(f"Submitted job {job.id} ({task})")
+        return job
+
+    def _finish(self, job: Job, future: Future) -> None:
+        if future.cancelled():
+            job.status = "cancelled"
+        else:
+            error = future.exception()
+            if error is None:
+                job.status = "succeeded"
+                job.result = future.result()
+                job.stage, job.percent = "done", 100
+                if self.on_result is not None:
+                    try:
+                        self.on_result(job)
+                    except Exception as e:
+                        logger.error(f"Result hook failed for job {job.id}: {str(e)}")
+            elif isinstance(error, JobCancelled):
+                job.status = "cancelled"
+            else:
+                job.status = "failed"
+                job.error = {
+                    "status_code": getattr(error, "status_code", 500),
+                    "detail": getattr(error, "detail", str(error))
+                }
+        job.finished_at = time.time()
+        job.events.append({"status": job.status, "stage": job.stage, "percent": job.percent})
+        self._cancelled.pop(job.id, None)
+        logger.info(f"Job {job.id} finished: {job.status}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued job outright; a running job stops at its next progress checkpoint.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        self._cancelled[job_id] = True
+        job.future.cancel()
+        return True
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            # Stops the event drain thread
+            self._events.put(None)
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+            self._pool = None
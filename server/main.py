@@ -1,17 +1,24 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-import uvicorn
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
 import os
-import shutil
-import pandas as pd
+import random
+import time
 import uuid
-from typing import List
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
-import zipfile
-from agent import agent
-from cleaning_ops import CleaningOps
+from lazy import LazyModule
+from jobs import JobManager, JobQueueFull, JobCancelled
+from metadata_store import collect_garbage
+from metrics import MetricsRegistry
+from profiling import new_profile_id, profile_paths
+from ingest import receive_upload, UploadRejected
+from downloads import follow_output, is_writing, media_type
+import config
 
 # Configure Logging
 logging.basicConfig(
@@ -24,6 +31,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# pandas and the rest of the pipeline load on first use (or WARMUP), not before the server can answer
+pipeline = LazyModule("pipeline")
+
 app = FastAPI(title="Intelligent Data Cleaning Agent")
 
 # CORS
@@ -35,213 +45,436 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-CLEANED_DIR = "cleaned"
+UPLOAD_DIR = config.UPLOAD_DIR
+CLEANED_DIR = config.CLEANED_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(CLEANED_DIR, exist_ok=True)
 
+MAX_UPLOAD_BYTES = int(config.MAX_UPLOAD_MB * 1024 * 1024)
+# Room for the multipart boundary and part headers around a single file
+MULTIPART_SLACK_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    """
+    Refuses a single-file upload whose declared body is already over the limit,
+    before any of it is read. Undeclared (chunked) bodies are capped while stored.
+    """
+    if MAX_UPLOAD_BYTES and request.method == "POST" and request.url.path == "/analyze":
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > MAX_UPLOAD_BYTES + MULTIPART_SLACK_BYTES:
+            return JSONResponse(status_code=413, content={
+                "detail": f"Upload exceeds the {config.MAX_UPLOAD_MB:g} MB limit"
+            })
+    return await call_next(request)
+
 # Mount uploads for serving images
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 app.mount("/cleaned", StaticFiles(directory=CLEANED_DIR), name="cleaned")
 
+def run_garbage_collection() -> None:
+    if config.UPLOAD_TTL_SECONDS <= 0:
+        return
+    removed = collect_garbage(pipeline.metadata, UPLOAD_DIR, CLEANED_DIR, config.UPLOAD_TTL_SECONDS,
+                              int(config.UPLOAD_STORE_MAX_MB * 1024 * 1024),
+                              int(config.OUTPUT_CACHE_MAX_MB * 1024 * 1024))
+    if removed:
+        logger.info(f"Garbage collection removed {removed} expired files")
+    pipeline.frame_cache.sweep()
+
+job_metrics = MetricsRegistry()
+
+def record_job_metrics(job) -> None:
+    # Results carry the phase/step timings measured in the worker; cache hits carry none
+    timings = job.result.get("timings") if isinstance(job.result, dict) else None
+    if timings:
+        job_metrics.observe(job.task.replace("run_", "", 1), timings)
+
+jobs = JobManager(
+    executor=config.JOB_EXECUTOR,
+    max_workers=config.JOB_WORKERS,
+    max_queue=config.JOB_MAX_QUEUE,
+    retention_seconds=config.JOB_RETENTION_SECONDS,
+    on_result=record_job_metrics
+)
+
+@app.on_event("startup")
+async def schedule_garbage_collection():
+    async def collect_periodically():
+        # The first pass runs right after startup, in the background rather than before it
+        while True:
+            try:
+                await run_in_threadpool(run_garbage_collection)
+            except Exception as e:
+                logger.error(f"Garbage collection failed: {str(e)}")
+            await asyncio.sleep(config.GC_INTERVAL_SECONDS)
+    if config.UPLOAD_TTL_SECONDS > 0:
+        app.state.gc_task = asyncio.create_task(collect_periodically())
+
+def warm_up() -> None:
+    start = time.perf_counter()
+    pipeline.warmup()
+    jobs.warmup()
+    logger.info(f"Warmup finished in {time.perf_counter() - start:.2f} s")
+
+@app.on_event("startup")
+async def schedule_warmup():
+    """
+    With WARMUP, the pipeline, the modules it loads lazily and the job pool's
+    workers are readied in the background, so the first request does not wait for them.
+    """
+    if config.WARMUP:
+        app.state.warmup_task = asyncio.create_task(run_in_threadpool(warm_up))
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    jobs.shutdown()
+
+def profile_request(asked: bool, header: Optional[str]) -> Optional[dict]:
+    """
+    Profiling arguments for a job (see profiling.run_profiled) when PROFILING_ENABLED
+    and the request asked for it (?profile=true or an X-Profile header) or was
+    sampled at PROFILE_SAMPLE_RATE; None otherwise.
+    """
+    if not config.PROFILING_ENABLED:
+        return None
+    asked = asked or (header or "").lower() in ("1", "true", "yes")
+    if not asked and random.random() >= config.PROFILE_SAMPLE_RATE:
+        return None
+    return {"profile_id": new_profile_id(), "profiles_dir": config.PROFILES_DIR,
+            "top_n": config.PROFILE_TOP_N, "keep": config.PROFILE_KEEP}
+
+def profile_url(profile: Optional[dict]) -> Optional[str]:
+    return f"/profiles/{profile['profile_id']}" if profile else None
+
+def submit_job(task: str, profile: Optional[dict] = None, **kwargs):
+    try:
+        return jobs.submit(task, profile=profile, **kwargs)
+    except JobQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=429, detail=str(e))
+
+def job_accepted(job, **extra) -> JSONResponse:
+    """
+    202 response pointing at the job's status and SSE URLs; `extra` fields are added.
+    """
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        **{key: value for key, value in extra.items() if value is not None}
+    })
+
+async def run_job(task: str, async_job: bool, preview: Optional[dict] = None, profile: Optional[dict] = None,
+                  **kwargs):
+    """
+    Submits a pipeline task to the job pool. With async_job the job id is returned
+    straight away (202), along with any provisional `preview`; otherwise the handler
+    awaits the result without blocking the loop. A `profile`d job's response links
+    its profile.
+    """
+    job = submit_job(task, profile, **kwargs)
+    if async_job:
+        return job_accepted(job, preview=preview, profile_url=profile_url(profile))
+
+    try:
+        result = await asyncio.wrap_future(job.future)
+        return {**result, "profile_url": profile_url(profile)} if profile else result
+    except pipeline.PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except JobCancelled:
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def stream_batch(tasks: List[Tuple[str, str, Dict[str, Any]]],
+                       finish: Callable[[str, dict], Awaitable[dict]]):
+    """
+    Runs (key, task, kwargs) triples on the shared job pool, keeping at most
+    BATCH_MAX_IN_FLIGHT of them submitted, and yields one NDJSON line per task
+    in completion order. A full queue just delays submission.
+    """
+    queue = list(tasks)
+    pending: Dict[asyncio.Future, str] = {}
+    while queue or pending:
+        while queue and len(pending) < config.BATCH_MAX_IN_FLIGHT:
+            key, task, kwargs = queue[0]
+            try:
+                job = jobs.submit(task, **kwargs)
+            except JobQueueFull:
+                break
+            queue.pop(0)
+            pending[asyncio.wrap_future(job.future)] = key
+        if not pending:
+            # Other requests hold the whole queue; retry shortly
+            await asyncio.sleep(config.JOB_EVENTS_POLL_SECONDS)
+            continue
+
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            try:
+                line = await finish(key, future.result())
+                line.setdefault("status", "success")
+            except pipeline.PipelineError as e:
+                line = {"file_id": key, "status": "error", "status_code": e.status_code, "detail": e.detail}
+            except JobCancelled:
+                line = {"file_id": key, "status": "error", "status_code": 409, "detail": "Job was cancelled"}
+            except Exception as e:
+                line = {"file_id": key, "status": "error", "status_code": 500, "detail": str(e)}
+            yield json.dumps(line, default=str) + "\n"
+
+async def preview_sample(sample: bytes, ext: str) -> Optional[dict]:
+    return await run_in_threadpool(pipeline.preview_analysis, sample, ext)
+
+async def store_upload(file: UploadFile, file_id: str, preview: bool = False) -> Dict[str, Any]:
+    """
+    Streams an upload into UPLOAD_DIR (see ingest.receive_upload); with `preview`,
+    a provisional plan is computed from its first UPLOAD_SAMPLE_KB meanwhile.
+    """
+    return await receive_upload(file, UPLOAD_DIR, file_id, MAX_UPLOAD_BYTES,
+                                chunk_size=int(config.UPLOAD_CHUNK_MB * 1024 * 1024),
+                                sample_bytes=config.UPLOAD_SAMPLE_KB * 1024,
+                                on_sample=preview_sample if preview else None)
+
 @app.get("/")
 def read_root():
     return {"message": "Agentic Data Cleaner API is running"}
 
 @app.post("/analyze")
-async def analyze_data(file: UploadFile = File(...)):
+async def analyze_data(file: UploadFile = File(...), async_job: bool = False, progressive: bool = False,
+                       profile: bool = False, x_profile: Optional[str] = Header(None)):
     """
     1. Save file
-    2. Analyze (Tabular/Image)
-    3. Generate Cleaning Plan
+    2. Analyze (Tabular/Image) and generate the cleaning plan on the job pool
+
+    With `progressive`, the 202 response carries a provisional analysis and plan from
+    a row sample read within ANALYSIS_PREVIEW_BUDGET_MS, while the exact analysis job
+    pushes refined counts over its SSE stream and ends with the final plan.
+    With PROFILING_ENABLED, `profile` (or an X-Profile header) profiles the analysis job.
     """
     file_id = str(uuid.uuid4())
-    ext = file.filename.split('.')[-1].lower()
-    file_path = f"{UPLOAD_DIR}/{file_id}.{ext}"
-    
     logger.info(f"Received file upload: {file.filename} (ID: {file_id})")
 
-    with open(file_path, "wb+") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    response = {
-        "file_id": file_id,
-        "original_filename": file.filename,
-        "type": "unknown",
-        "analysis": {},
-        "plan": {}
-    }
-    
     try:
-        if ext in ['csv', 'xlsx', 'xls']:
-            response["type"] = "tabular"
-            logger.info(f"Analyzing tabular data: {file_id} (format: {ext})")
-            try:
-                if ext == 'csv':
-                    df = pd.read_csv(file_path)
-                elif ext in ['xlsx', 'xls']:
-                    # Check if openpyxl is available
-                    try:
-                        df = pd.read_excel(file_path, engine='openpyxl' if ext == 'xlsx' else None)
-                        logger.info(f"Successfully read Excel file: {file.filename}")
-                    except ImportError:
-                        logger.error("openpyxl not installed - cannot read Excel files")
-                        raise HTTPException(status_code=500, detail="Excel support not available. Please install openpyxl.")
-            except Exception as e:
-                logger.error(f"Error reading {ext.upper()} file: {str(e)}")
-                raise HTTPException(status_code=400, detail=f"Error reading {ext.upper()} file: {str(e)}")
-            
-            analysis = agent.analyze_tabular(df)
-            plan = agent.generate_cleaning_plan(analysis, "tabular")
-            response["analysis"] = analysis
-            response["plan"] = plan
-            
-        elif ext == 'zip':
-            # Extract and process first CSV/Excel file found
-            response["type"] = "tabular"
-            logger.info(f"Processing ZIP file: {file_id}")
-            
-            try:
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    # Find first CSV or Excel file
-                    tabular_file = None
-                    for filename in zip_ref.namelist():
-                        # Skip directories and hidden files
-                        if filename.endswith('/') or filename.startswith('__MACOSX'):
-                            continue
-                        file_ext = filename.split('.')[-1].lower()
-                        if file_ext in ['csv', 'xlsx', 'xls']:
-                            tabular_file = filename
-                            break
-                    
-                    if not tabular_file:
-                        raise HTTPException(status_code=400, detail="No CSV or Excel file found in ZIP archive")
-                    
-                    # Extract to temp location
-                    extracted_ext = tabular_file.split('.')[-1].lower()
-                    extracted_path = f"{UPLOAD_DIR}/{file_id}_extracted.{extracted_ext}"
-                    with zip_ref.open(tabular_file) as source, open(extracted_path, 'wb') as target:
-                        target.write(source.read())
-                    
-                    # Read and analyze
-                    df = pd.read_csv(extracted_path) if extracted_ext == 'csv' else pd.read_excel(extracted_path)
-                    analysis = agent.analyze_tabular(df)
-                    plan = agent.generate_cleaning_plan(analysis, "tabular")
-                    response["analysis"] = analysis
-                    response["plan"] = plan
-                    response["extracted_file"] = tabular_file
-                    logger.info(f"Extracted and analyzed: {tabular_file}")
-            except zipfile.BadZipFile:
-                logger.error(f"Invalid ZIP file: {file_id}")
-                raise HTTPException(status_code=400, detail="Invalid ZIP file")
-            
-        elif ext in ['jpg', 'jpeg', 'png']:
-            response["type"] = "image"
-            logger.info(f"Analyzing image data: {file_id}")
-            analysis = agent.analyze_image(file_path)
-            plan = agent.generate_cleaning_plan(analysis, "image")
-            response["analysis"] = analysis
-            response["plan"] = plan
-            
-    except Exception as e:
-        logger.error(f"Error analyzing file {file_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-        
-    return response
+        upload = await store_upload(file, file_id, preview=async_job and not progressive)
+    except UploadRejected as e:
+        logger.warning(f"Rejected upload {file.filename}: {e.detail}")
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    file_path, ext = upload["path"], upload["ext"]
+
+    duplicate = await run_in_threadpool(pipeline.find_duplicate_upload, upload["content_hash"], ext, file.filename)
+    if duplicate:
+        await run_in_threadpool(os.remove, file_path)
+        return duplicate
+    await run_in_threadpool(pipeline.metadata.register, file_id, file_path, ext, file.filename,
+                            upload["size"], upload["content_hash"])
+
+    profile = profile_request(profile, x_profile)
+    if progressive:
+        job = submit_job("run_analysis", profile, file_id=file_id, file_path=file_path, ext=ext,
+                         original_filename=file.filename, refine=True)
+        provisional = await run_in_threadpool(pipeline.sample_analysis, file_path, ext,
+                                              config.ANALYSIS_PREVIEW_BUDGET_MS / 1000, config.ANALYSIS_SAMPLE_ROWS)
+        if provisional is None:
+            return job_accepted(job, file_id=file_id, profile_url=profile_url(profile))
+        await run_in_threadpool(pipeline.metadata.set_provisional_plan, file_id, provisional["plan"])
+        return job_accepted(job, file_id=file_id, profile_url=profile_url(profile), **provisional)
+
+    return await run_job("run_analysis", async_job, preview=upload["sample_result"], profile=profile,
+                         file_id=file_id, file_path=file_path, ext=ext, original_filename=file.filename)
+
+@app.post("/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """
+    Analyzes many files concurrently. Files with identical schemas share one
+    planner pass. Streams one NDJSON line per file as it finishes.
+    """
+    if len(files) > config.BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {config.BATCH_MAX_FILES} files per batch")
+
+    tasks = []
+    settled = []
+    for file in files:
+        file_id = str(uuid.uuid4())
+        try:
+            upload = await store_upload(file, file_id)
+        except UploadRejected as e:
+            settled.append({"file_id": file_id, "original_filename": file.filename, "status": "error",
+                            "status_code": e.status_code, "detail": e.detail})
+            continue
+        file_path, ext = upload["path"], upload["ext"]
+
+        duplicate = await run_in_threadpool(pipeline.find_duplicate_upload, upload["content_hash"], ext, file.filename)
+        if duplicate:
+            await run_in_threadpool(os.remove, file_path)
+            settled.append({**duplicate, "status": "success"})
+            continue
+        await run_in_threadpool(pipeline.metadata.register, file_id, file_path, ext, file.filename,
+                                upload["size"], upload["content_hash"])
+        tasks.append((file_id, "run_analysis", {
+            "file_id": file_id, "file_path": file_path, "ext": ext,
+            "original_filename": file.filename, "defer_plan": ext in ['csv', 'xlsx', 'xls']
+        }))
+    logger.info(f"Received batch upload of {len(tasks)} files")
+
+    shared_plans: Dict[str, tuple] = {}
+
+    async def finish(file_id: str, response: dict) -> dict:
+        if response["type"] == "tabular" and not response["plan"]:
+            return await run_in_threadpool(pipeline.attach_shared_plan, response, shared_plans)
+        return response
+
+    async def stream():
+        # Rejected uploads and known content answer first, straight from the store
+        for line in settled:
+            yield json.dumps(line, default=str) + "\n"
+        async for line in stream_batch(tasks, finish):
+            yield line
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/clean/batch")
+async def clean_batch(batch: dict):
+    """
+    Cleans many analyzed files concurrently:
+    {"file_ids": [...], "plan_overrides": {file_id: plan}, "backend": "pandas" | "polars",
+     "sheet_format": "xlsx" | "parquet", "output_format": "parquet" | "csv.gz" | ...}.
+    Streams one NDJSON line per file as it finishes.
+    """
+    file_ids = batch.get("file_ids", [])
+    if len(file_ids) > config.BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {config.BATCH_MAX_FILES} files per batch")
+    overrides = batch.get("plan_overrides", {})
+    tasks = [(file_id, "run_clean", {"file_id": file_id, "plan_override": overrides.get(file_id),
+                                     "backend": batch.get("backend"), "sheet_format": batch.get("sheet_format"),
+                                     "output_format": batch.get("output_format")})
+             for file_id in file_ids]
+
+    async def finish(file_id: str, result: dict) -> dict:
+        return {"file_id": file_id, **result}
+
+    return StreamingResponse(stream_batch(tasks, finish), media_type="application/x-ndjson")
 
 @app.post("/clean/{file_id}")
-async def clean_data(file_id: str, plan_override: dict = None):
-    """
-    Executes the cleaning plan.
-    """
-    # Find file
-    files = os.listdir(UPLOAD_DIR)
-    target_file = next((f for f in files if f.startswith(file_id)), None)
-    if not target_file:
-        logger.warning(f"File not found for cleaning: {file_id}")
-        raise HTTPException(status_code=404, detail="File not found")
-        
-    input_path = f"{UPLOAD_DIR}/{target_file}"
-    ext = target_file.split('.')[-1].lower()
-    output_filename = f"cleaned_{target_file}"
-    output_path = f"{CLEANED_DIR}/{output_filename}"
-    
-    logger.info(f"Starting cleaning process for: {target_file}")
-    result = {"status": "success", "download_url": f"/download/{output_filename}"}
-    
-    try:
-        # Handle different file types
-        if ext == 'zip':
-            # Find the extracted file
-            extracted_files = [f for f in os.listdir(UPLOAD_DIR) if f.startswith(f"{file_id}_extracted")]
-            if extracted_files:
-                extracted_path = f"{UPLOAD_DIR}/{extracted_files[0]}"
-                extracted_ext = extracted_files[0].split('.')[-1].lower()
-                df = pd.read_csv(extracted_path) if extracted_ext == 'csv' else pd.read_excel(extracted_path)
-                logger.info(f"Processing extracted file from ZIP: {extracted_files[0]}")
-            else:
-                raise HTTPException(status_code=404, detail="Extracted file not found. Please re-upload the ZIP file.")
-        elif ext in ['csv', 'xlsx', 'xls']:
-            df = pd.read_csv(input_path) if ext == 'csv' else pd.read_excel(input_path)
-            logger.info(f"Processing {ext.upper()} file")
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
-        
-        
-        if ext in ['csv', 'xlsx', 'xls', 'zip']:
-            # Re-generate plan if not provided (or retrieve from state - simplifying here)
-            # ideally we pass the plan from frontend, but for now re-gen or use default
-            analysis = agent.analyze_tabular(df)
-            plan = plan_override if plan_override else agent.generate_cleaning_plan(analysis, "tabular")
-            
-            # Clean with detailed feedback
-            cleaned_df, report = CleaningOps.clean_tabular(df, plan['plan'])
-            
-            # Save in appropriate format based on input type
-            if ext == 'zip':
-                # For ZIP files, save as CSV (simplest for download)
-                cleaned_df.to_csv(output_path, index=False)
-            elif ext in ['xlsx', 'xls']:
-                # Save Excel files as Excel
-                cleaned_df.to_excel(output_path, index=False)
-            else:
-                # Save CSV files as CSV
-                cleaned_df.to_csv(output_path, index=False)
-            
-            result["stats"] = {
-                "original_rows": len(df),
-                "original_columns": len(df.columns),
-                "cleaned_rows": len(cleaned_df),
-                "cleaned_columns": len(cleaned_df.columns),
-                "removed_rows": len(df) - len(cleaned_df),
-                "removed_columns": len(df.columns) - len(cleaned_df.columns)
-            }
-            result["report"] = report
-            result["plan"] = plan  # Include plan for frontend reasoning display
-            logger.info(f"Tabular cleaning complete. Removed {result['stats']['removed_rows']} rows.")
-            
-        elif ext in ['jpg', 'jpeg', 'png']:
-            # Re-gen plan logic same as above
-            analysis = agent.analyze_image(input_path)
-            plan = plan_override if plan_override else agent.generate_cleaning_plan(analysis, "image")
-            
-            CleaningOps.clean_image(input_path, output_path, plan['plan'])
-            logger.info(f"Image cleaning complete.")
-            
-    except Exception as e:
-        logger.error(f"Error cleaning file {file_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-        
-    return result
+async def clean_data(file_id: str, plan_override: dict = None, async_job: bool = False,
+                     use_provisional: bool = False, backend: Optional[str] = None,
+                     sheet_format: Optional[str] = None, output_format: Optional[str] = None,
+                     profile: bool = False, x_profile: Optional[str] = Header(None)):
+    """
+    Executes the cleaning plan on the job pool. While a progressive analysis is
+    still running, `use_provisional` cleans with its sample-based plan instead of
+    re-planning on the exact analysis. `backend` picks the tabular executor
+    ("pandas" or "polars"), overriding CLEAN_BACKEND; `sheet_format` ("xlsx" or
+    "parquet") how multi-sheet workbooks are written, overriding EXCEL_SHEET_FORMAT;
+    `output_format` (csv, csv.gz, csv.zst, ndjson, parquet, arrow or xlsx) the
+    file a single table is written to, overriding OUTPUT_FORMAT. With
+    PROFILING_ENABLED, `profile` (or an X-Profile header) profiles the clean job.
+    """
+    return await run_job("run_clean", async_job, profile=profile_request(profile, x_profile),
+                         file_id=file_id, plan_override=plan_override,
+                         use_provisional=use_provisional, backend=backend, sheet_format=sheet_format,
+                         output_format=output_format)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events stream of job progress; closes once the job finishes.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                yield f"data: {json.dumps(job.events[sent])}\n\n"
+                sent += 1
+            if job.finished and sent >= len(job.events):
+                yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            await asyncio.sleep(config.JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return {"job_id": job_id, "status": "cancelling"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters and sizes of the upload store and the cleaned-output cache.
+    """
+    return await run_in_threadpool(pipeline.metadata.stats)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus histograms of phase and plan-step timings, by action and file type.
+    """
+    return PlainTextResponse(job_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, limit: Optional[int] = None):
+    """
+    Summary of a profiled request: its top functions by own and cumulative time
+    and its top allocation sites, `limit` of each at most.
+    """
+    paths = profile_paths(config.PROFILES_DIR, profile_id)
+    if paths is None or not os.path.exists(paths["summary"]):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(paths["summary"]) as f:
+        summary = json.load(f)
+    if limit is not None:
+        for key in ("top_functions", "top_cumulative", "top_allocations"):
+            if summary.get(key):
+                summary[key] = summary[key][:limit]
+    return {**summary, "pstats_url": f"/profiles/{profile_id}/pstats"}
+
+@app.get("/profiles/{profile_id}/pstats")
+async def get_profile_pstats(profile_id: str):
+    """
+    The raw cProfile dump, for pstats, snakeviz and similar viewers.
+    """
+    paths = profile_paths(config.PROFILES_DIR, profile_id)
+    if paths is None or not os.path.exists(paths["pstats"]):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(paths["pstats"], "rb") as f:
+        return Response(f.read(), media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'})
 
 @app.get("/download/{filename}")
 async def download_file(filename: str):
+    """
+    Streams a cleaned output. An output still being written (its URL is pushed
+    with the clean job's "writing" progress) is followed until it is complete.
+    """
     file_path = f"{CLEANED_DIR}/{filename}"
-    if os.path.exists(file_path):
-        logger.info(f"Downloading file: {filename}")
-        return FileResponse(file_path)
+    writing = is_writing(file_path)
+    if writing or os.path.exists(file_path):
+        logger.info(f"Downloading file: {filename}" + (" (still being written)" if writing else ""))
+        headers = {} if writing else {"Content-Length": str(os.path.getsize(file_path))}
+        return StreamingResponse(
+            follow_output(file_path, config.DOWNLOAD_CHUNK_KB * 1024, config.DOWNLOAD_POLL_SECONDS),
+            media_type=media_type(file_path), headers=headers
+        )
     logger.warning(f"Download failed - file not found: {filename}")
     raise HTTPException(status_code=404, detail="File not found")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    file_id TEXT PRIMARY KEY,
+    original_filename TEXT,
+    upload_path TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER,
+    content_hash TEXT,
+    type TEXT,
+    analysis TEXT,
+    plan TEXT,
+    response TEXT,
+    output_path TEXT,
+    last_plan TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_content_hash ON uploads (content_hash);
+CREATE INDEX IF NOT EXISTS uploads_accessed_at ON uploads (accessed_at);
+CREATE TABLE IF NOT EXISTS outputs (
+    cache_key TEXT PRIMARY KEY,
+    file_id TEXT,
+    output_path TEXT NOT NULL,
+    size INTEGER,
+    result TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_accessed_at ON outputs (accessed_at);
+CREATE INDEX IF NOT EXISTS outputs_output_path ON outputs (output_path);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+JSON_FIELDS = ("analysis", "plan", "response", "result", "last_plan")
+UPDATABLE = {"original_filename", "upload_path", "ext", "size", "content_hash", "type",
+             "analysis", "plan", "response", "output_path", "last_plan"}
+# Columns added after the first release, created on older databases at startup
+MIGRATIONS = {"uploads": {"response": "TEXT", "last_plan": "TEXT"}}
+# Primary key of each table that takes part in LRU eviction
+EVICTABLE = {"uploads": "file_id", "outputs": "cache_key"}
+
+
+class MetadataStore:
+    """
+    SQLite index of uploads: file_id -> paths, format, size, content hash,
+    analysis, plan and timestamps. `plan` is the one /analyze (or batch planning)
+    chose and what a plain /clean runs; `last_plan` is whatever the last clean ran,
+    override or not.
+
+    Every call opens its own connection, and the database runs in WAL mode with a
+    busy timeout, so several uvicorn workers and job processes can share one file.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for table, columns in MIGRATIONS.items():
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, kind in columns.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        record = dict(row)
+        for field in JSON_FIELDS:
+            if record.get(field) is not None:
+                record[field] = json.loads(record[field])
+        return record
+
+    def register(self, file_id: str, upload_path: str, ext: str, original_filename: str = None,
+                 size: int = None, content_hash: str = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (file_id, original_filename, upload_path, ext, size, content_hash,"
+                " created_at, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_id, original_filename, upload_path, ext, size, content_hash, now, now, now)
+            )
+
+    def get(self, file_id: str, touch: bool = True) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            if touch:
+                conn.execute("UPDATE uploads SET accessed_at = ? WHERE file_id = ?", (time.time(), file_id))
+            return self._row(conn.execute("SELECT * FROM uploads WHERE file_id = ?", (file_id,)).fetchone())
+
+    def find_by_hash(self, content_hash: str, ext: str) -> Optional[Dict[str, Any]]:
+        """
+        The most recently used analyzed upload with this content and extension.
+        """
+        with self._connect() as conn:
+            return self._row(conn.execute(
+                "SELECT * FROM uploads WHERE content_hash = ? AND ext = ? AND response IS NOT NULL "
+                "ORDER BY accessed_at DESC LIMIT 1", (content_hash, ext)
+            ).fetchone())
+
+    def update(self, file_id: str, **fields) -> bool:
+        unknown = set(fields) - UPDATABLE
+        if unknown:
+            raise ValueError(f"Unknown upload fields: {sorted(unknown)}")
+        if not fields:
+            return False
+        values = [json.dumps(v, default=str) if k in JSON_FIELDS and v is not None else v
+                  for k, v in fields.items()]
+        now = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE uploads SET {assignments}, updated_at = ?, accessed_at = ? WHERE file_id = ?",
+                (*values, now, now, file_id)
+            )
+            return cursor.rowcount > 0
+
+    def set_provisional_plan(self, file_id: str, plan: Dict[str, Any]) -> bool:
+        """
+        Stores a sample-based plan unless the exact analysis has already stored its own.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE uploads SET plan = ?, updated_at = ? WHERE file_id = ? AND plan IS NULL",
+                (json.dumps(plan, default=str), time.time(), file_id)
+            )
+            return cursor.rowcount > 0
+
+    def claim_expired(self, ttl_seconds: float, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Removes and returns up to `limit` records not accessed for `ttl_seconds`.
+        DELETE ... RETURNING is atomic, so two workers collecting at once never
+        both get the same record.
+        """
+        cutoff = time.time() - ttl_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                "DELETE FROM uploads WHERE file_id IN "
+                "(SELECT file_id FROM uploads WHERE accessed_at < ? ORDER BY accessed_at LIMIT ?) RETURNING *",
+                (cutoff, limit)
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def claim_over_budget(self, table: str, max_bytes: int) -> List[Dict[str, Any]]:
+        """
+        Removes and returns the least recently used rows of `table` ("uploads" or
+        "outputs") beyond the first `max_bytes` of most recently used content.
+        """
+        key = EVICTABLE[table]
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM "
+                f"(SELECT {key}, SUM(COALESCE(size, 0)) OVER (ORDER BY accessed_at DESC) AS running FROM {table}) "
+                f"WHERE running > ?) RETURNING *", (max_bytes,)
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def delete(self, file_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM uploads WHERE file_id = ?", (file_id,))
+
+    # --- cleaned outputs -------------------------------------------------------------
+
+    def get_output(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.execute("UPDATE outputs SET accessed_at = ? WHERE cache_key = ?", (time.time(), cache_key))
+            return self._row(conn.execute("SELECT * FROM outputs WHERE cache_key = ?", (cache_key,)).fetchone())
+
+    def put_output(self, cache_key: str, file_id: str, output_path: str, size: int, result: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO outputs (cache_key, file_id, output_path, size, result, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, file_id, output_path, size, json.dumps(result, default=str), now, now)
+            )
+
+    def output_referenced(self, output_path: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM outputs WHERE output_path = ? LIMIT 1", (output_path,)).fetchone() is not None
+
+    def claim_expired_outputs(self, ttl_seconds: float) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("DELETE FROM outputs WHERE accessed_at < ? RETURNING *",
+                                (time.time() - ttl_seconds,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    # --- hit/miss counters -----------------------------------------------------------
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            counters = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+            stats = {"counters": counters}
+            for table in EVICTABLE:
+                row = conn.execute(f"SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM {table}").fetchone()
+                stats[table] = {"entries": row["entries"], "bytes": row["bytes"]}
+        return stats
+
+
+def _remove(path: str) -> bool:
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def collect_garbage(store: MetadataStore, upload_dir: str, cleaned_dir: str, ttl_seconds: float,
+                    max_upload_bytes: int = 0, max_output_bytes: int = 0) -> int:
+    """
+    Deletes uploads (with their ZIP members) and cleaned outputs not accessed for
+    `ttl_seconds` or beyond their LRU size budgets (0 means unbounded), then any
+    file in either directory that is older than the TTL and unknown to the store
+    (left over from before it existed or from a crash).
+    Returns how many paths were removed.
+    """
+    removed = 0
+    uploads = []
+    while True:
+        expired = store.claim_expired(ttl_seconds)
+        if not expired:
+            break
+        uploads.extend(expired)
+    if max_upload_bytes > 0:
+        uploads.extend(store.claim_over_budget("uploads", max_upload_bytes))
+    for record in uploads:
+        file_id = record["file_id"]
+        paths = [record["upload_path"], os.path.join(upload_dir, f"{file_id}_members")]
+        # Outputs still listed in the output cache are evicted through it instead
+        if record["output_path"] and not store.output_referenced(record["output_path"]):
+            paths.append(record["output_path"])
+        removed += sum(_remove(path) for path in paths)
+        logger.info(f"Expired upload: {file_id}")
+
+    outputs = store.claim_expired_outputs(ttl_seconds)
+    if max_output_bytes > 0:
+        outputs.extend(store.claim_over_budget("outputs", max_output_bytes))
+    for record in outputs:
+        if not store.output_referenced(record["output_path"]) and _remove(record["output_path"]):
+            removed += 1
+
+    cutoff = time.time() - ttl_seconds
+    for directory, prefix in ((upload_dir, ""), (cleaned_dir, "cleaned_")):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            file_id = name[len(prefix):] if name.startswith(prefix) else name
+            file_id = file_id.split(".")[0].split("_")[0]
+            if store.get(file_id, touch=False) is None and not store.output_referenced(path) and _remove(path):
+                removed += 1
+    return removed
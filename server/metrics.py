@@ -0,0 +1,185 @@
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Windows: no peak RSS; memory is then only measured under TRACE_MEMORY
+    resource = None
+
+logger = logging.getLogger(__name__)
+# One JSON object per message, for log pipelines that index fields
+events_logger = logging.getLogger("metrics.events")
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(2 ** power for power in range(20, 35, 2))  # 1 MiB .. 16 GiB
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Timings:
+    """
+    Records wall time, process CPU time, peak memory and row counts of a task's
+    phases (parsing, cleaning, writing, ...) and of every plan step within them.
+
+    Peak memory is how far a block raised the process's peak RSS, which misses
+    allocations below an earlier peak; while tracemalloc is tracing (TRACE_MEMORY)
+    it is the exact peak of Python and NumPy allocations above the block's start.
+    """
+
+    def __init__(self, trace_memory: Optional[bool] = None):
+        # By default traced whenever tracemalloc is on; False leaves its peak to whoever started it
+        if trace_memory is None:
+            trace_memory = tracemalloc.is_tracing()
+        self.entries: List[Dict[str, Any]] = []
+        self.memory_source = "tracemalloc" if trace_memory and tracemalloc.is_tracing() else "peak_rss"
+        # Open blocks' [entry, start bytes, highest traced bytes], innermost last
+        self._open: List[list] = []
+
+    def _fold_traced_peak(self) -> None:
+        # reset_peak is global: carry the peak so far into every enclosing block first
+        peak = tracemalloc.get_traced_memory()[1]
+        for block in self._open:
+            block[2] = max(block[2], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def measure(self, name: str, kind: str = "phase", rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Measures the block as a "phase" or a "step". The yielded entry takes
+        `rows_out` (and any other fields) from the caller.
+        """
+        entry = {"name": name, "kind": kind}
+        if rows_in is not None:
+            entry["rows_in"] = rows_in
+        tracing = self.memory_source == "tracemalloc" and tracemalloc.is_tracing()
+        if tracing:
+            self._fold_traced_peak()
+            block = [entry, tracemalloc.get_traced_memory()[0], 0]
+            self._open.append(block)
+        else:
+            start_peak = _peak_rss_bytes()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry["wall_ms"] = round((time.perf_counter() - wall) * 1000, 3)
+            entry["cpu_ms"] = round((time.process_time() - cpu) * 1000, 3)
+            if tracing:
+                self._fold_traced_peak()
+                self._open.remove(block)
+                entry["peak_bytes"] = max(0, block[2] - block[1])
+            elif start_peak is not None:
+                entry["peak_bytes"] = _peak_rss_bytes() - start_peak
+            self.entries.append(entry)
+
+    def to_dict(self, file_type: str) -> Dict[str, Any]:
+        return {
+            "file_type": file_type,
+            "memory_source": self.memory_source,
+            "phases": [e for e in self.entries if e["kind"] == "phase"],
+            "steps": [e for e in self.entries if e["kind"] == "step"],
+        }
+
+
+@contextmanager
+def measure(timings: Optional[Timings], name: str, kind: str = "phase",
+            rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Timings.measure when a recorder is given; otherwise a no-op with the same entry.
+    """
+    if timings is None:
+        yield {}
+        return
+    with timings.measure(name, kind, rows_in) as entry:
+        yield entry
+
+
+def log_timings(task: str, file_id: str, timings: Dict[str, Any]) -> None:
+    for entry in timings["phases"] + timings["steps"]:
+        events_logger.info(json.dumps({"event": f"{task}_{entry['kind']}", "file_id": file_id,
+                                       "file_type": timings["file_type"], **entry}))
+
+
+class Histogram:
+    """
+    Cumulative Prometheus histogram, one series per label set.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts = self._series.setdefault(labels, [[0] * len(self.buckets), 0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+            counts[1] += 1
+            counts[2] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (buckets, count, total) in series:
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = base + "," if base else ""
+            for bound, bucket_count in zip(self.buckets, buckets):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6g}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    Histograms of the phase and step timings that finished tasks report. Lives in
+    the API process, which receives every job's result whatever the executor.
+    """
+
+    def __init__(self):
+        self.phase_seconds = Histogram("datasanct_phase_seconds", "Wall time of task phases.",
+                                       ("task", "phase", "file_type"), SECONDS_BUCKETS)
+        self.step_seconds = Histogram("datasanct_step_seconds", "Wall time of cleaning plan steps.",
+                                      ("action", "file_type"), SECONDS_BUCKETS)
+        self.step_cpu_seconds = Histogram("datasanct_step_cpu_seconds", "Process CPU time of cleaning plan steps.",
+                                          ("action", "file_type"), SECONDS_BUCKETS)
+        self.step_peak_bytes = Histogram("datasanct_step_peak_bytes", "Peak memory growth of cleaning plan steps.",
+                                         ("action", "file_type"), BYTES_BUCKETS)
+
+    def observe(self, task: str, timings: Dict[str, Any]) -> None:
+        file_type = timings["file_type"]
+        for entry in timings["phases"]:
+            self.phase_seconds.observe(entry["wall_ms"] / 1000, task, entry["name"], file_type)
+        for entry in timings["steps"]:
+            self.step_seconds.observe(entry["wall_ms"] / 1000, entry["name"], file_type)
+            self.step_cpu_seconds.observe(entry["cpu_ms"] / 1000, entry["name"], file_type)
+            if "peak_bytes" in entry:
+                self.step_peak_bytes.observe(entry["peak_bytes"], entry["name"], file_type)
+
+    def render(self) -> str:
+        histograms = (self.phase_seconds, self.step_seconds, self.step_cpu_seconds, self.step_peak_bytes)
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+from sketches import KLLSketch
+
+Bounds = Dict[str, Tuple[float, float]]
+
+DETECTORS = ("iqr", "mad", "approx_iqr")
+DEFAULT_IQR_K = 1.5
+DEFAULT_MAD_THRESHOLD = 3.5
+# Scales the MAD to a standard deviation for normally distributed data
+MAD_TO_SIGMA = 1.4826
+
+
+def iqr_bounds(df: pd.DataFrame, columns: List[str], k: float = DEFAULT_IQR_K) -> Bounds:
+    """
+    Tukey fences for all columns from one vectorized quantile call.
+    """
+    if not columns:
+        return {}
+    quartiles = df[columns].quantile([0.25, 0.75])
+    q1 = quartiles.loc[0.25]
+    q3 = quartiles.loc[0.75]
+    iqr = q3 - q1
+    lower = q1 - k * iqr
+    upper = q3 + k * iqr
+    return {col: (float(lower[col]), float(upper[col])) for col in columns}
+
+
+def mad_bounds(df: pd.DataFrame, columns: List[str], threshold: float = DEFAULT_MAD_THRESHOLD) -> Bounds:
+    """
+    Robust z-score fences: |x - median| / (1.4826 * MAD) <= threshold.
+    Columns with zero MAD fall back to the mean absolute deviation.
+    """
+    if not columns:
+        return {}
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(all="ignore"):
+        median = np.nanmedian(values, axis=0)
+        deviation = np.abs(values - median)
+        scale = MAD_TO_SIGMA * np.nanmedian(deviation, axis=0)
+        # sqrt(pi/2) scales the mean absolute deviation to a standard deviation
+        fallback = np.sqrt(np.pi / 2) * np.nanmean(deviation, axis=0)
+    scale = np.where(scale > 0, scale, fallback)
+    return {col: (float(median[i] - threshold * scale[i]), float(median[i] + threshold * scale[i]))
+            for i, col in enumerate(columns)}
+
+
+def sketch_bounds(sketches: Dict[str, KLLSketch], k: float = DEFAULT_IQR_K) -> Bounds:
+    """
+    Tukey fences from approximate quartiles, for streaming and very tall columns.
+    """
+    bounds = {}
+    for col, sketch in sketches.items():
+        q1, q3 = sketch.quantiles([0.25, 0.75])
+        iqr = q3 - q1
+        bounds[col] = (float(q1 - k * iqr), float(q3 + k * iqr))
+    return bounds
+
+
+def approx_iqr_bounds(df: pd.DataFrame, columns: List[str], k: float = DEFAULT_IQR_K,
+                      sketch_k: int = 200) -> Bounds:
+    sketches = {}
+    for col in columns:
+        sketches[col] = KLLSketch(sketch_k)
+        sketches[col].update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+    return sketch_bounds(sketches, k)
+
+
+def compute_bounds(df: pd.DataFrame, columns: List[str], method: str = "iqr", **params) -> Bounds:
+    columns = [c for c in columns if c in df.columns]
+    if method == "iqr":
+        return iqr_bounds(df, columns, params.get("k", DEFAULT_IQR_K))
+    if method == "mad":
+        return mad_bounds(df, columns, params.get("threshold", DEFAULT_MAD_THRESHOLD))
+    if method == "approx_iqr":
+        return approx_iqr_bounds(df, columns, params.get("k", DEFAULT_IQR_K))
+    raise ValueError(f"Unknown outlier detector: {method}. Expected one of {DETECTORS}")
+
+
+def outlier_mask(df: pd.DataFrame, bounds: Bounds) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Returns (keep, flagged): one combined row mask and, per column, how many rows
+    fall outside that column's bounds. Missing values never satisfy a bound, as in
+    the original per-column filter.
+    """
+    columns = [c for c in bounds if c in df.columns]
+    if not columns:
+        return np.ones(len(df), dtype=bool), {}
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    lower = np.array([bounds[c][0] for c in columns])
+    upper = np.array([bounds[c][1] for c in columns])
+    inside = (values >= lower) & (values <= upper)
+    flagged = (~inside).sum(axis=0)
+    return inside.all(axis=1), {c: int(n) for c, n in zip(columns, flagged)}
+
+
+def filter_outliers(df: pd.DataFrame, step: dict) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Applies an `iqr_filter` plan step. The step may pick a detector with
+    "method" (iqr, mad, approx_iqr) and tune it with "k" or "threshold".
+
+    Every column's fences are fitted on `df` as the step receives it, and a row
+    is dropped when any column falls outside its own; fences are not re-fitted
+    on what an earlier column of the same step left.
+    """
+    params = {key: step[key] for key in ("k", "threshold") if key in step}
+    bounds = compute_bounds(df, step.get("columns", []), step.get("method", "iqr"), **params)
+    keep, flagged = outlier_mask(df, bounds)
+    return df[keep], flagged
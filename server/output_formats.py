@@ -0,0 +1,127 @@
+import gzip
+import io
+import pandas as pd
+
+# Output files being written and their downloads; re-exported for the writers' callers
+from downloads import WRITING_SUFFIX, follow_output, is_writing, media_type, publishing  # noqa: F401
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Format name -> file suffix; the suffix of an output path decides how it is written
+OUTPUT_FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "csv.zst": ".csv.zst",
+    "ndjson": ".ndjson",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "xlsx": ".xlsx",
+}
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+def format_of(path: str) -> str:
+    """
+    The output format a path's suffix names; .xls is written as xlsx and
+    anything unknown as CSV.
+    """
+    name = path.lower()
+    for fmt, suffix in sorted(OUTPUT_FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(suffix):
+            return fmt
+    return "xlsx" if name.endswith(".xls") else "csv"
+
+
+class FrameWriter:
+    """
+    Appends frame chunks to one output file in the format its suffix names.
+    Every chunk is flushed as it is written, so a download following the file
+    receives it right away. Columnar formats take their schema from the first
+    chunk; later chunks are cast to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = format_of(path)
+        if self.format in COLUMNAR_FORMATS and not HAS_ARROW:
+            raise ValueError(f"Writing {self.format} needs pyarrow")
+        if self.format == "xlsx":
+            raise ValueError("Excel output is written whole; use write_frame")
+        self._text = None
+        self._sink = None
+        self._writer = None
+        self._schema = None
+        self._header = True
+        if self.format == "csv" or self.format == "ndjson":
+            self._text = open(path, "w", newline="", encoding="utf-8")
+        elif self.format == "csv.gz":
+            self._text = gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+        elif self.format == "csv.zst":
+            self._sink = pa.CompressedOutputStream(path, "zstd")
+            self._text = io.TextIOWrapper(self._sink, encoding="utf-8", newline="")
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._text is not None:
+            if self.format == "ndjson":
+                if len(chunk):
+                    chunk.to_json(self._text, orient="records", lines=True, date_format="iso")
+            else:
+                chunk.to_csv(self._text, index=False, header=self._header)
+                self._header = False
+            self._text.flush()
+            return
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._sink = pa.OSFile(self.path, "wb")
+                self._writer = ipc.new_file(self._sink, self._schema)
+        elif not table.schema.equals(self._schema):
+            try:
+                table = table.cast(self._schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Column types changed between chunks, which {self.format} cannot hold "
+                                 f"({str(e)}); use a row format such as csv or ndjson") from e
+        self._writer.write_table(table)
+        if self._sink is not None:
+            self._sink.flush()
+
+    def close(self) -> None:
+        if self._writer is None and self.format in COLUMNAR_FORMATS:
+            # No chunk at all: still leave a valid, empty file
+            self.write(pd.DataFrame())
+        if self._writer is not None:
+            self._writer.close()
+        if self._text is not None:
+            self._text.close()
+        if self._sink is not None and not self._sink.closed:
+            self._sink.close()
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_frame(df: pd.DataFrame, path: str, chunk_rows: int = 100000) -> None:
+    """
+    Writes a cleaned frame to `path` in the format its suffix names, `chunk_rows` rows at a time.
+    """
+    if format_of(path) == "xlsx":
+        df.to_excel(path, index=False)
+        return
+    with FrameWriter(path) as writer:
+        if len(df) == 0:
+            writer.write(df)
+        for start in range(0, len(df), max(1, chunk_rows)):
+            writer.write(df.iloc[start:start + chunk_rows])
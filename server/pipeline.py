@@ -0,0 +1,828 @@
+import io
+import os
+import json
+import hashlib
+import importlib.util
+import logging
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zipfile
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from agent import agent
+from cleaning_ops import CleaningOps
+from streaming_ops import StreamingCleaner
+from frame_cache import FrameCache
+from step_cache import StepCache
+from backends import get_backend
+from dtype_ops import optimize_dtypes, read_csv
+from output_formats import OUTPUT_FORMATS, publishing, write_frame
+from workbook import SHEET_FORMATS, excel_engine, read_sheet, read_workbook, sheet_names, write_parquet_sheets, write_workbook
+from archive import extract_members, read_manifest, write_archive
+from metadata_store import MetadataStore
+from metrics import Timings, log_timings, measure
+from sketches import ReservoirSample
+import config
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = config.UPLOAD_DIR
+CLEANED_DIR = config.CLEANED_DIR
+
+if config.TRACE_MEMORY and not tracemalloc.is_tracing():
+    # Exact per-step peak memory in clean timings (see metrics.Timings)
+    tracemalloc.start()
+
+frame_cache = FrameCache(config.FRAME_CACHE_DIR, int(config.FRAME_CACHE_MAX_MB * 1024 * 1024))
+step_cache = StepCache(int(config.STEP_CACHE_MAX_MB * 1024 * 1024))
+metadata = MetadataStore(config.METADATA_DB)
+
+# progress(stage, percent, update=None); `update` carries partial results such as refining analysis
+Progress = Callable[..., None]
+# Rows per read while sampling, small enough to notice the latency budget running out
+SAMPLE_CHUNK_ROWS = 20000
+# OpenCV is only imported by image work; tabular-only installs leave it out
+HAS_OPENCV = importlib.util.find_spec("cv2") is not None
+
+
+class PipelineError(Exception):
+    """
+    A client-facing failure carrying the HTTP status the API should answer with.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _no_progress(stage: str, percent: int, update: Optional[dict] = None) -> None:
+    pass
+
+
+def warmup() -> None:
+    """
+    Imports what the pipeline otherwise loads on first use: OpenCV for images,
+    polars for its backend (each only when installed).
+    """
+    for module in ("image_ops", "polars_ops"):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def require_opencv() -> None:
+    if not HAS_OPENCV:
+        logger.error("opencv-python not installed - cannot process images")
+        raise PipelineError(500, "Image support not available. Please install opencv-python.")
+
+
+def should_stream(path: str, ext: str) -> bool:
+    """
+    Large CSVs are profiled out-of-core so the worker never holds the whole frame.
+    """
+    return ext == 'csv' and os.path.getsize(path) > config.STREAMING_THRESHOLD_MB * 1024 * 1024
+
+def refinement(profiler) -> dict:
+    """
+    The counts an exact analysis refines as it reads: rows so far, nulls, duplicates, quantiles.
+    """
+    partial = profiler.to_analysis()
+    return {key: partial[key] for key in ("rows", "missing_values", "duplicates", "stats") if key in partial}
+
+def profile_csv(path: str, progress: Progress, keep: Optional[List[pd.DataFrame]] = None) -> dict:
+    """
+    Chunked profile of a CSV that reports its refining counts through `progress` at
+    most every ANALYSIS_REFINE_INTERVAL_SECONDS. Chunks are also appended to `keep`.
+    """
+    size = max(os.path.getsize(path), 1)
+    last = time.monotonic()
+    with open(path, 'rb') as f, pd.read_csv(f, chunksize=config.CHUNK_ROWS) as reader:
+        def chunks():
+            for chunk in reader:
+                if keep is not None:
+                    keep.append(chunk)
+                yield chunk
+
+        def report(profiler) -> None:
+            nonlocal last
+            if time.monotonic() - last >= config.ANALYSIS_REFINE_INTERVAL_SECONDS:
+                last = time.monotonic()
+                progress("refining", 10 + int(40 * min(1.0, f.tell() / size)), refinement(profiler))
+
+        return agent.analyze_tabular_chunks(chunks(), on_update=report)
+
+def combine_chunks(chunks: List[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    # Chunks parsed with differing dtypes would not equal one read_csv of the file
+    if not chunks or any(not c.dtypes.equals(chunks[0].dtypes) for c in chunks[1:]):
+        return None
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+def analyze_tabular_file(path: str, ext: str, progress: Optional[Progress] = None, refine: bool = False) -> tuple:
+    """
+    Returns (df, analysis). df is None when the file was profiled in chunks.
+    With `refine`, a CSV is read in chunks and the counts refined so far are pushed
+    through `progress` until the exact analysis is done.
+    """
+    progress = progress or _no_progress
+    if should_stream(path, ext):
+        logger.info(f"Streaming profile of large file: {path} (chunk size: {config.CHUNK_ROWS} rows)")
+        if refine:
+            return None, profile_csv(path, progress)
+        return None, agent.analyze_tabular_chunks(pd.read_csv(path, chunksize=config.CHUNK_ROWS))
+    if ext == 'csv' and refine:
+        chunks: List[pd.DataFrame] = []
+        profile_csv(path, progress, keep=chunks)
+        df = combine_chunks(chunks)
+        if df is None:
+            df = read_tabular(path, ext)
+    else:
+        df = read_tabular(path, ext)
+    return analyze_frame(df)
+
+def shrink_frame(df: pd.DataFrame) -> tuple:
+    """
+    The OPTIMIZE_DTYPES load stage: returns (df, memory) with memory None when it is off.
+    """
+    if not config.OPTIMIZE_DTYPES:
+        return df, None
+    df, memory = optimize_dtypes(df, config.CATEGORY_MAX_RATIO)
+    logger.info(f"Load stage: {memory['before_bytes']} -> {memory['after_bytes']} bytes "
+                f"({len(memory['converted'])} columns converted)")
+    return df, memory
+
+def analyze_frame(df: pd.DataFrame) -> tuple:
+    """
+    Returns (df, analysis) for a parsed frame, after the load stage; the analysis
+    reports the frame's memory before and after it under "memory".
+    """
+    df, memory = shrink_frame(df)
+    analysis = agent.analyze_tabular(df)
+    if memory:
+        analysis["memory"] = memory
+    return df, analysis
+
+def provisional_result(sample: pd.DataFrame, rows_estimate: int, rows_scanned: int, complete: bool) -> dict:
+    """
+    Analysis and plan of a row sample, the plan marked "provisional". Null and
+    duplicate counts are scaled to `rows_estimate` rows so their ratios carry over.
+    """
+    analysis = agent.analyze_tabular(sample)
+    factor = rows_estimate / len(sample) if len(sample) else 1.0
+    analysis["missing_values"] = {col: int(round(n * factor)) for col, n in analysis["missing_values"].items()}
+    analysis["duplicates"] = int(round(analysis["duplicates"] * factor))
+    analysis["rows"] = int(rows_estimate)
+    analysis["profile_mode"] = "sample"
+    plan = agent.generate_cleaning_plan(analysis, "tabular")
+    plan["status"] = "provisional"
+    return {
+        "analysis": analysis,
+        "plan": plan,
+        "sample": {"rows": len(sample), "rows_scanned": int(rows_scanned), "complete": complete},
+    }
+
+def sample_analysis(path: str, ext: str, budget_seconds: float, sample_rows: int) -> Optional[dict]:
+    """
+    First phase of progressive analysis: a provisional result from a reservoir sample
+    of the CSV rows read within `budget_seconds` (the first rows of an Excel sheet).
+    The row total is extrapolated from how far into the file the read got.
+    """
+    if ext == 'csv':
+        deadline = time.monotonic() + budget_seconds
+        reservoir = ReservoirSample(sample_rows, seed=0)
+        finished = True
+        with open(path, 'rb') as f, pd.read_csv(f, chunksize=SAMPLE_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                reservoir.update(chunk)
+                if time.monotonic() >= deadline:
+                    finished = False
+                    break
+            consumed = max(f.tell(), 1)
+        rows = reservoir.rows_seen
+        rows_estimate = rows if finished else int(rows * os.path.getsize(path) / consumed)
+        return provisional_result(reservoir.frame(), rows_estimate, rows, finished and reservoir.complete)
+    if ext in ['xlsx', 'xls']:
+        df = pd.read_excel(path, nrows=sample_rows, engine=excel_engine(ext))
+        return provisional_result(df, len(df), len(df), len(df) < sample_rows)
+    return None
+
+def preview_analysis(sample: bytes, ext: str) -> Optional[dict]:
+    """
+    Provisional result from the leading bytes of a CSV upload, computed while the
+    rest is still being stored. The incomplete last line is dropped.
+    """
+    end = sample.rfind(b"\n")
+    if ext != 'csv' or end <= 0:
+        return None
+    try:
+        df = pd.read_csv(io.BytesIO(sample[:end + 1]))
+    except Exception as e:
+        logger.info(f"No preview for upload sample: {str(e)}")
+        return None
+    return provisional_result(df, len(df), len(df), False)
+
+def clean_tabular_streaming(path: str, plan_override: dict, output_path: str) -> dict:
+    """
+    Two-pass chunked clean for files too large to hold in memory. The second pass
+    writes chunk by chunk, so Excel is not available as its output format.
+    """
+    read_chunks = lambda: pd.read_csv(path, chunksize=config.CHUNK_ROWS)
+    plan = plan_override if plan_override else agent.generate_cleaning_plan(
+        agent.analyze_tabular_chunks(read_chunks()), "tabular")
+    cleaner = StreamingCleaner(
+        read_chunks, plan['plan'],
+        quantile_k=config.QUANTILE_SKETCH_K,
+        hash_memory_limit=config.DEDUPE_MEMORY_LIMIT
+    )
+    stats, report = cleaner.run(output_path)
+    logger.info(f"Streaming cleaning complete. Removed {stats['removed_rows']} rows.")
+    return {"stats": stats, "report": report, "plan": plan}
+
+def read_tabular(path: str, ext: str, sheet=0) -> pd.DataFrame:
+    return read_csv(path, config.CSV_ENGINE) if ext == 'csv' else read_sheet(path, ext, sheet)
+
+def step_key(cache_key: str, path: str) -> str:
+    # The frame cache key plus the source's identity, so a replaced file starts over
+    stat = os.stat(path)
+    return f"{cache_key}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def clean_frame(df: pd.DataFrame, cached: Optional[dict], plan_override: Optional[dict],
+                progress: Progress, backend: Optional[str] = None, timings: Optional[Timings] = None,
+                memo_key: Optional[str] = None) -> tuple:
+    """
+    Cleans a parsed frame with the named execution backend (see backends.py),
+    recording its phases and plan steps in `timings` when given. With a `memo_key`
+    (see step_key), plan steps shared with an earlier clean of the frame are reused.
+    Returns (cleaned_df, {"stats", "report", "plan"}).
+    """
+    # Prefer the caller's plan, then the one cached by /analyze, then re-plan
+    analysis = cached["analysis"] if cached else None
+    if plan_override:
+        plan = plan_override
+    elif cached and cached["plan"]:
+        plan = cached["plan"]
+    else:
+        progress("analyzing", 20)
+        with measure(timings, "analyzing", rows_in=len(df)):
+            analysis = agent.analyze_tabular(df)
+        with measure(timings, "planning"):
+            plan = agent.generate_cleaning_plan(analysis, "tabular")
+
+    # Clean with detailed feedback
+    progress("cleaning", 40)
+    memo = step_cache.memo(memo_key, df) if memo_key and step_cache.enabled else None
+    with measure(timings, "cleaning", rows_in=len(df)) as entry:
+        cleaned_df, report = get_backend(backend).clean(df, plan['plan'], analysis, timings, memo)
+        entry["rows_out"] = len(cleaned_df)
+        if memo:
+            entry["steps_reused"] = memo.reused
+
+    stats = {
+        "original_rows": len(df),
+        "original_columns": len(df.columns),
+        "cleaned_rows": len(cleaned_df),
+        "cleaned_columns": len(cleaned_df.columns),
+        "removed_rows": len(df) - len(cleaned_df),
+        "removed_columns": len(df.columns) - len(cleaned_df.columns)
+    }
+    return cleaned_df, {"stats": stats, "report": report, "plan": plan}
+
+def clean_tabular_file(cache_key: str, path: str, ext: str, plan_override: Optional[dict],
+                       output_path: str, progress: Optional[Progress] = None, backend: Optional[str] = None,
+                       timings: Optional[Timings] = None) -> dict:
+    """
+    Cleans one CSV/Excel file into `output_path`, in the format its suffix names
+    (Excel, CSV, compressed CSV, NDJSON, Parquet or Arrow), and returns
+    {"stats", "report", "plan"}. Parsing, cleaning and writing are recorded in `timings`.
+    """
+    progress = progress or _no_progress
+    # Reuse the frame and plan persisted by /analyze when they are still valid
+    cached = frame_cache.get(cache_key)
+    # Published with the progress update, so a download can start while the output is written
+    download = {"download_url": f"/download/{os.path.basename(output_path)}"}
+
+    if should_stream(path, ext):
+        with publishing(output_path), measure(timings, "streaming"):
+            progress("cleaning", 30, download)
+            return clean_tabular_streaming(path, plan_override or (cached["plan"] if cached else None), output_path)
+    if cached and cached.get("df") is not None:
+        logger.info(f"Using cached parsed frame for: {cache_key}")
+        df = cached["df"]
+    else:
+        with measure(timings, "parsing") as entry:
+            df, _ = shrink_frame(read_tabular(path, ext))
+            entry["rows_out"] = len(df)
+
+    cleaned_df, result = clean_frame(df, cached, plan_override, progress, backend, timings,
+                                     step_key(cache_key, path))
+
+    # Save in the format the output name asks for (see output_formats)
+    with publishing(output_path), measure(timings, "writing", rows_in=len(cleaned_df)):
+        progress("writing", 80, download)
+        write_frame(cleaned_df, output_path, config.OUTPUT_CHUNK_ROWS)
+    return result
+
+
+def schema_key(analysis: dict) -> str:
+    return json.dumps([[col, analysis["dtypes"].get(col)] for col in analysis["columns_list"]])
+
+def attach_shared_plan(response: dict, shared_plans: Dict[str, tuple]) -> dict:
+    """
+    Batch planning for a run_analysis(defer_plan=True) response: the first file of
+    each schema (same columns and dtypes) is planned, later files reuse that plan,
+    so every shard of one export is cleaned the same way.
+    """
+    key = schema_key(response["analysis"])
+    if key in shared_plans:
+        source_id, plan = shared_plans[key]
+        response["plan_reused_from"] = source_id
+    else:
+        plan = agent.generate_cleaning_plan(response["analysis"], "tabular")
+        shared_plans[key] = (response["file_id"], plan)
+    frame_cache.set_plan(response["file_id"], plan)
+    response["plan"] = plan
+    metadata.update(response["file_id"], plan=plan, response=response)
+    return response
+
+
+# --- ZIP archives ----------------------------------------------------------------------
+
+def members_dir(file_id: str) -> str:
+    return f"{UPLOAD_DIR}/{file_id}_members"
+
+def member_key(file_id: str, index: int) -> str:
+    return f"{file_id}_m{index:03d}"
+
+def _member_workers(count: int) -> int:
+    return max(1, min(config.ZIP_WORKERS, count))
+
+def analyze_member(file_id: str, index: int, member: Dict[str, str]) -> dict:
+    try:
+        df, analysis = analyze_tabular_file(member["path"], member["ext"])
+        plan = agent.generate_cleaning_plan(analysis, "tabular")
+    except Exception as e:
+        logger.error(f"Error reading ZIP member {member['name']}: {str(e)}")
+        return {"name": member["name"], "error": str(e)}
+    frame_cache.put(member_key(file_id, index), member["path"], analysis, plan, df)
+    return {"name": member["name"], "analysis": analysis, "plan": plan}
+
+def clean_member(file_id: str, index: int, member: Dict[str, str], plan_override: Optional[dict],
+                 out_dir: str, backend: Optional[str] = None) -> dict:
+    # Excel members stay Excel (.xls is written as .xlsx); everything else is CSV
+    ext = 'xlsx' if member["ext"] in ('xlsx', 'xls') else 'csv'
+    arcname = f"{os.path.splitext(member['name'])[0]}.{ext}"
+    output_path = os.path.join(out_dir, f"{index:03d}.{ext}")
+    try:
+        result = clean_tabular_file(member_key(file_id, index), member["path"], member["ext"],
+                                    plan_override, output_path, backend=backend)
+    except Exception as e:
+        logger.error(f"Error cleaning ZIP member {member['name']}: {str(e)}")
+        return {"name": member["name"], "error": str(e)}
+    return {"name": member["name"], "output": arcname, "path": output_path, **result}
+
+def member_plan(plan_override: Optional[dict], index: int, name: str, key: str = "members") -> Optional[dict]:
+    """
+    A plain plan override targets the first member (the one /analyze shows);
+    {"members": {name: plan}} targets members by their archive name (and
+    {"sheets": {name: plan}} workbook sheets by theirs).
+    """
+    if not plan_override:
+        return None
+    if key in plan_override:
+        return plan_override[key].get(name)
+    return plan_override if index == 0 else None
+
+def merge_member_results(members: List[dict]) -> tuple:
+    """
+    Sums stats and reports across members. With several members, report entries
+    are prefixed with the member name.
+    """
+    stats: Dict[str, int] = {}
+    report: Dict[str, object] = {
+        "removed_columns": [],
+        "imputed_columns": [],
+        "outliers_removed": 0,
+        "duplicates_removed": 0,
+        "dropped_rows": 0
+    }
+    for member in members:
+        if "error" in member:
+            continue
+        prefix = f"{member['name']}: " if len(members) > 1 else ""
+        for key, value in member["stats"].items():
+            stats[key] = stats.get(key, 0) + value
+        for key, value in member["report"].items():
+            if isinstance(value, list):
+                report.setdefault(key, []).extend(f"{prefix}{v}" for v in value)
+            elif isinstance(value, dict):
+                report.setdefault(key, {}).update({f"{prefix}{k}": v for k, v in value.items()})
+            else:
+                report[key] = report.get(key, 0) + value
+    return stats, report
+
+def clean_zip(file_id: str, plan_override: Optional[dict], output_path: str, progress: Progress,
+              backend: Optional[str] = None) -> dict:
+    """
+    Cleans every extracted member in parallel and packs the results, plus a
+    report.json, into one archive at `output_path`.
+    """
+    try:
+        members = read_manifest(members_dir(file_id))
+    except FileNotFoundError:
+        raise PipelineError(404, "Extracted files not found. Please re-upload the ZIP file.")
+
+    out_dir = tempfile.mkdtemp(prefix=f"{file_id}_", dir=CLEANED_DIR)
+    try:
+        results = [None] * len(members)
+        with ThreadPoolExecutor(max_workers=_member_workers(len(members))) as pool:
+            futures = {
+                pool.submit(clean_member, file_id, i, m, member_plan(plan_override, i, m["name"]), out_dir, backend): i
+                for i, m in enumerate(members)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                progress("cleaning", 10 + int(80 * done / len(members)))
+
+        if all("error" in r for r in results):
+            raise PipelineError(400, "None of the files in the ZIP archive could be cleaned")
+        progress("writing", 90)
+        entries = [{k: v for k, v in r.items() if k != "path"} for r in results]
+        write_archive(output_path, [(r["output"], r["path"]) for r in results if "error" not in r],
+                      {"report.json": json.dumps(entries, indent=2, default=str)})
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    stats, report = merge_member_results(results)
+    return {"stats": stats, "report": report, "members": entries,
+            "plan": next((r["plan"] for r in results if "plan" in r), None)}
+
+
+# --- Excel workbooks -------------------------------------------------------------------
+
+def sheet_key(file_id: str, index: int) -> str:
+    return f"{file_id}_s{index:03d}"
+
+def workbook_sheets(record: dict) -> List[str]:
+    """
+    Sheet names of an uploaded workbook, as /analyze recorded them.
+    """
+    response = record.get("response")
+    if response is None:
+        return sheet_names(record["upload_path"], record["ext"])
+    return [sheet["name"] for sheet in response.get("sheets", [])]
+
+def analyze_sheet(file_id: str, index: int, name: str, path: str, df: pd.DataFrame) -> dict:
+    try:
+        df, analysis = analyze_frame(df)
+        plan = agent.generate_cleaning_plan(analysis, "tabular")
+    except Exception as e:
+        logger.error(f"Error analyzing sheet {name}: {str(e)}")
+        return {"name": name, "error": str(e)}
+    frame_cache.put(sheet_key(file_id, index), path, analysis, plan, df)
+    return {"name": name, "analysis": analysis, "plan": plan}
+
+def analyze_workbook(file_id: str, path: str, sheets: Dict[str, pd.DataFrame], progress: Progress) -> List[dict]:
+    """
+    Analyzes and plans every sheet in parallel; each gets its own frame cache entry.
+    """
+    results = [None] * len(sheets)
+    with ThreadPoolExecutor(max_workers=_member_workers(len(sheets))) as pool:
+        futures = {pool.submit(analyze_sheet, file_id, i, name, path, df): i
+                   for i, (name, df) in enumerate(sheets.items())}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            progress("analyzing", 20 + int(60 * done / len(sheets)))
+    return results
+
+def clean_workbook(file_id: str, path: str, ext: str, names: List[str], plan_override: Optional[dict],
+                   output_path: str, progress: Progress, backend: Optional[str] = None,
+                   sheet_format: str = "xlsx") -> dict:
+    """
+    Cleans every sheet in parallel into one workbook at `output_path`, or with
+    `sheet_format` "parquet" into an archive of one Parquet file per sheet plus
+    a report.json. The workbook is parsed (once, for all sheets) only when a
+    sheet's frame is no longer cached.
+    """
+    cached = [frame_cache.get(sheet_key(file_id, i)) for i in range(len(names))]
+    parsed: Dict[str, pd.DataFrame] = {}
+    if any(entry is None or entry["df"] is None for entry in cached):
+        progress("parsing", 15)
+        parsed = read_workbook(path, ext, config.EXCEL_WORKERS)
+
+    def clean_sheet(index: int, name: str) -> dict:
+        entry = cached[index]
+        try:
+            df = entry["df"] if entry and entry["df"] is not None else shrink_frame(parsed[name])[0]
+            cleaned_df, result = clean_frame(df, entry, member_plan(plan_override, index, name, "sheets"),
+                                             _no_progress, backend, memo_key=step_key(sheet_key(file_id, index), path))
+        except Exception as e:
+            logger.error(f"Error cleaning sheet {name}: {str(e)}")
+            return {"name": name, "error": str(e)}
+        return {"name": name, "df": cleaned_df, **result}
+
+    results = [None] * len(names)
+    with ThreadPoolExecutor(max_workers=_member_workers(len(names))) as pool:
+        futures = {pool.submit(clean_sheet, i, name): i for i, name in enumerate(names)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            progress("cleaning", 20 + int(60 * done / len(names)))
+
+    if all("error" in r for r in results):
+        raise PipelineError(400, "None of the sheets in the workbook could be cleaned")
+    progress("writing", 85)
+    frames = {r["name"]: r.pop("df") for r in results if "error" not in r}
+    if sheet_format == "parquet":
+        out_dir = tempfile.mkdtemp(prefix=f"{file_id}_", dir=CLEANED_DIR)
+        try:
+            write_archive(output_path, write_parquet_sheets(out_dir, frames),
+                          {"report.json": json.dumps(results, indent=2, default=str)})
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    else:
+        write_workbook(output_path, frames)
+
+    stats, report = merge_member_results(results)
+    return {"stats": stats, "report": report, "sheets": results,
+            "plan": next((r["plan"] for r in results if "plan" in r), None)}
+
+
+def run_analysis(file_id: str, file_path: str, ext: str, original_filename: str,
+                 progress: Optional[Progress] = None, defer_plan: bool = False, refine: bool = False) -> dict:
+    """
+    1. Analyze (Tabular/Image); with refine, CSV counts are pushed as they firm up
+    2. Generate Cleaning Plan (for CSV/Excel, left to the caller with defer_plan;
+       see attach_shared_plan)
+    """
+    progress = progress or _no_progress
+    response = {
+        "file_id": file_id,
+        "original_filename": original_filename,
+        "type": "unknown",
+        "analysis": {},
+        "plan": {}
+    }
+
+    try:
+        if ext in ['csv', 'xlsx', 'xls']:
+            response["type"] = "tabular"
+            logger.info(f"Analyzing tabular data: {file_id} (format: {ext})")
+            progress("parsing", 10)
+            sheets = {}
+            try:
+                if ext == 'csv':
+                    df, analysis = analyze_tabular_file(file_path, ext, progress, refine)
+                elif ext in ['xlsx', 'xls']:
+                    # Check if openpyxl is available
+                    try:
+                        sheets = read_workbook(file_path, ext, config.EXCEL_WORKERS)
+                        logger.info(f"Successfully read Excel file: {original_filename} ({len(sheets)} sheets)")
+                    except ImportError:
+                        logger.error("openpyxl not installed - cannot read Excel files")
+                        raise PipelineError(500, "Excel support not available. Please install openpyxl.")
+                    if len(sheets) == 1:
+                        progress("analyzing", 50)
+                        df, analysis = analyze_frame(next(iter(sheets.values())))
+            except PipelineError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading {ext.upper()} file: {str(e)}")
+                raise PipelineError(400, f"Error reading {ext.upper()} file: {str(e)}")
+
+            if len(sheets) > 1:
+                # Every sheet is analyzed and planned; the first readable one fills the single-file fields
+                results = analyze_workbook(file_id, file_path, sheets, progress)
+                analyzed = [r for r in results if "error" not in r]
+                if not analyzed:
+                    raise PipelineError(400, f"Error reading {ext.upper()} sheets: {results[0]['error']}")
+                response["analysis"] = analyzed[0]["analysis"]
+                response["plan"] = analyzed[0]["plan"]
+                response["sheets"] = results
+            else:
+                progress("planning", 80)
+                plan = None if defer_plan else agent.generate_cleaning_plan(analysis, "tabular")
+                frame_cache.put(file_id, file_path, analysis, plan, df)
+                response["analysis"] = analysis
+                response["plan"] = plan or {}
+
+        elif ext == 'zip':
+            # Extract every CSV/Excel member and analyze them in parallel
+            response["type"] = "tabular"
+            logger.info(f"Processing ZIP file: {file_id}")
+            progress("extracting", 10)
+
+            try:
+                members = extract_members(file_path, members_dir(file_id), config.ZIP_COPY_BUFFER_KB * 1024)
+            except zipfile.BadZipFile:
+                logger.error(f"Invalid ZIP file: {file_id}")
+                raise PipelineError(400, "Invalid ZIP file")
+            if not members:
+                raise PipelineError(400, "No CSV or Excel file found in ZIP archive")
+
+            results = [None] * len(members)
+            with ThreadPoolExecutor(max_workers=_member_workers(len(members))) as pool:
+                futures = {pool.submit(analyze_member, file_id, i, m): i for i, m in enumerate(members)}
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    progress("analyzing", 20 + int(60 * done / len(members)))
+
+            analyzed = [r for r in results if "error" not in r]
+            if not analyzed:
+                raise PipelineError(400, f"Error reading ZIP members: {results[0]['error']}")
+            # The first readable member fills the single-file fields the client shows
+            response["analysis"] = analyzed[0]["analysis"]
+            response["plan"] = analyzed[0]["plan"]
+            response["extracted_file"] = analyzed[0]["name"]
+            response["members"] = results
+            logger.info(f"Extracted and analyzed {len(analyzed)} of {len(members)} ZIP members")
+
+        elif ext in ['jpg', 'jpeg', 'png']:
+            response["type"] = "image"
+            logger.info(f"Analyzing image data: {file_id}")
+            require_opencv()
+            progress("analyzing", 30)
+            analysis = agent.analyze_image(file_path)
+            plan = agent.generate_cleaning_plan(analysis, "image")
+            response["analysis"] = analysis
+            response["plan"] = plan
+
+    except PipelineError:
+        raise
+    except Exception as e:
+        logger.error(f"Error analyzing file {file_id}: {str(e)}")
+        raise PipelineError(500, str(e))
+
+    metadata.update(file_id, type=response["type"], analysis=response["analysis"], plan=response["plan"] or None,
+                    response=response)
+    progress("done", 100)
+    return response
+
+
+def find_duplicate_upload(content_hash: str, ext: str, original_filename: str) -> Optional[dict]:
+    """
+    The stored /analyze response for an earlier upload with identical bytes, or None.
+    The response keeps the earlier file_id, whose upload and frame cache entry are reused.
+    """
+    if not config.CONTENT_DEDUPE:
+        return None
+    record = metadata.find_by_hash(content_hash, ext)
+    if record is None or not os.path.exists(record["upload_path"]):
+        metadata.count("upload_misses")
+        return None
+    metadata.count("upload_hits")
+    metadata.get(record["file_id"])  # refresh its LRU position
+    logger.info(f"Upload {original_filename} matches stored content of {record['file_id']}")
+    return {**record["response"], "original_filename": original_filename, "cache": "hit"}
+
+def output_cache_key(record: dict, plan: Optional[dict], backend: str, *options) -> Optional[str]:
+    # `options` are further output settings, such as a workbook's sheet format
+    if not config.CONTENT_DEDUPE or not record.get("content_hash") or not plan:
+        return None
+    payload = json.dumps([record["content_hash"], record["ext"], plan, backend, *options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def output_tag(plan: Optional[dict], backend: str, *options) -> str:
+    # Names each plan's output apart, so no clean overwrites a file another one served
+    payload = json.dumps([plan, backend, *options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+def run_clean(file_id: str, plan_override: dict = None, progress: Optional[Progress] = None,
+              use_provisional: bool = False, backend: Optional[str] = None,
+              sheet_format: Optional[str] = None, output_format: Optional[str] = None) -> dict:
+    """
+    Executes the cleaning plan on `backend` ("pandas" or "polars"; CLEAN_BACKEND by
+    default). A provisional (sample-based) stored plan is only used with
+    `use_provisional`; otherwise the plan comes from the exact analysis.
+    Workbooks with several sheets are written as one workbook, or with
+    `sheet_format` "parquet" as an archive of per-sheet Parquet files. A single
+    table is written in `output_format` (see OUTPUT_FORMATS; by default the
+    input's: Excel for Excel, CSV otherwise).
+    """
+    progress = progress or _no_progress
+    # Indexed lookup of the upload registered by /analyze
+    record = metadata.get(file_id)
+    if record is None or not os.path.exists(record["upload_path"]):
+        logger.warning(f"File not found for cleaning: {file_id}")
+        raise PipelineError(404, "File not found")
+
+    input_path = record["upload_path"]
+    target_file = os.path.basename(input_path)
+    ext = record["ext"]
+
+    try:
+        backend = get_backend(backend).name
+    except ValueError as e:
+        raise PipelineError(400, str(e))
+    sheet_format = sheet_format or config.EXCEL_SHEET_FORMAT
+    if sheet_format not in SHEET_FORMATS:
+        raise PipelineError(400, f"Unknown sheet format: {sheet_format}. Expected one of {SHEET_FORMATS}")
+    sheets = workbook_sheets(record) if ext in ['xlsx', 'xls'] else []
+    options = [sheet_format] if len(sheets) > 1 else []
+    # OUTPUT_FORMAT applies where a format can; one asked for explicitly must apply
+    single_table = ext in ['csv', 'xlsx', 'xls'] and len(sheets) <= 1
+    if output_format and not single_table:
+        raise PipelineError(400, "Output formats apply to single tables (CSV or single-sheet Excel uploads)")
+    output_format = (output_format or config.OUTPUT_FORMAT or None) if single_table else None
+    if output_format:
+        if output_format not in OUTPUT_FORMATS:
+            raise PipelineError(400, f"Unknown output format: {output_format}. Expected one of {tuple(OUTPUT_FORMATS)}")
+        if output_format == 'xlsx' and should_stream(input_path, ext):
+            raise PipelineError(400, "Files this large are cleaned in chunks and cannot be written as Excel")
+        options.append(output_format)
+
+    stored_plan = record["plan"]
+    if stored_plan and stored_plan.get("status") == "provisional":
+        if use_provisional and not plan_override:
+            plan_override = stored_plan
+        stored_plan = None
+    # The plan that runs for a single table or image, which keys (and names) its output
+    plan = plan_override or stored_plan
+
+    # Same content cleaned with the same plan: serve the stored output
+    cache_key = output_cache_key(record, plan, backend, *options)
+    if cache_key:
+        cached = metadata.get_output(cache_key)
+        if cached and os.path.exists(cached["output_path"]):
+            metadata.count("output_hits")
+            os.utime(cached["output_path"])
+            logger.info(f"Serving cached output for: {file_id}")
+            progress("done", 100)
+            return {**cached["result"], "cache": "hit"}
+        metadata.count("output_misses")
+
+    # Every plan, backend and format gets its own file, so a clean never overwrites an output cached for another
+    stem, suffix = os.path.splitext(target_file)
+    if len(sheets) > 1 and sheet_format == "parquet":
+        suffix = ".zip"
+    elif output_format:
+        suffix = OUTPUT_FORMATS[output_format]
+    target_file = f"{stem}{suffix}"
+    output_filename = f"cleaned_{stem}_{output_tag(plan, backend, *options)}{suffix}"
+    output_path = f"{CLEANED_DIR}/{output_filename}"
+
+    logger.info(f"Starting cleaning process for: {target_file}")
+    result = {"status": "success", "download_url": f"/download/{output_filename}"}
+    # Phase and step timings; members and sheets run concurrently, so those are timed as a whole
+    timings = Timings(config.TRACE_MEMORY)
+    progress("loading", 10)
+
+    try:
+        if ext == 'zip':
+            with timings.measure("cleaning"):
+                result.update(clean_zip(file_id, plan_override, output_path, progress, backend))
+            logger.info(f"ZIP cleaning complete. Removed {result['stats'].get('removed_rows', 0)} rows.")
+
+        elif len(sheets) > 1:
+            logger.info(f"Processing {ext.upper()} workbook with {len(sheets)} sheets")
+            with timings.measure("cleaning"):
+                result.update(clean_workbook(file_id, input_path, ext, sheets, plan_override, output_path,
+                                             progress, backend, sheet_format))
+            logger.info(f"Workbook cleaning complete. Removed {result['stats'].get('removed_rows', 0)} rows.")
+
+        elif ext in ['csv', 'xlsx', 'xls']:
+            logger.info(f"Processing {ext.upper()} file")
+            result.update(clean_tabular_file(file_id, input_path, ext, plan, output_path, progress, backend, timings))
+            logger.info(f"Tabular cleaning complete. Removed {result['stats']['removed_rows']} rows.")
+
+        elif ext in ['jpg', 'jpeg', 'png']:
+            require_opencv()
+            # Plan stored by /analyze, else re-plan
+            if not plan:
+                with timings.measure("analyzing"):
+                    plan = agent.generate_cleaning_plan(agent.analyze_image(input_path), "image")
+
+            progress("denoising", 30)
+            with timings.measure("denoising"):
+                CleaningOps.clean_image(input_path, output_path, plan['plan'],
+                                        tile_size=config.IMAGE_TILE_SIZE,
+                                        overlap=config.IMAGE_TILE_OVERLAP,
+                                        workers=config.IMAGE_WORKERS)
+            logger.info(f"Image cleaning complete.")
+
+        else:
+            raise PipelineError(400, f"Unsupported file type: {ext}")
+
+    except PipelineError:
+        raise
+    except Exception as e:
+        logger.error(f"Error cleaning file {file_id}: {str(e)}")
+        raise PipelineError(500, str(e))
+
+    if "plan" in result:
+        # The stored plan stays the analysis plan; overrides are one-off
+        metadata.update(file_id, output_path=output_path, last_plan=result["plan"])
+    else:
+        metadata.update(file_id, output_path=output_path)
+    if cache_key:
+        metadata.put_output(cache_key, file_id, output_path, os.path.getsize(output_path), result)
+    # Not stored with the cached output: a cache hit is not timed again
+    result["timings"] = timings.to_dict(ext)
+    log_timings("clean", file_id, result["timings"])
+    progress("done", 100)
+    return result
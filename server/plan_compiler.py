@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+from metrics import Timings, measure
+from outliers import filter_outliers
+from profiler import _hashable_frame
+from step_cache import PlanMemo
+from text_ops import clean_text_step
+
+# Steps that transform each row independently and never look at other rows
+COLUMN_LOCAL = {"clean_text", "impute_or_drop", "drop_columns"}
+
+
+def compile_plan(plan: List[Dict[str, Any]], analysis: Optional[Dict[str, Any]] = None,
+                 min_duplicate_ratio: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    Rewrites a cleaning plan into an equivalent, cheaper sequence of steps.
+
+    1. drop_columns is hoisted over preceding column-local steps, and every step
+       stops touching columns that are dropped (they were dead work).
+    2. When the analysis reports enough duplicates, exact duplicate rows are collapsed
+       (keeping a multiplicity weight) before the column-local steps that precede
+       drop_duplicates, so text cleaning and imputation only see distinct rows.
+    3. iqr_filter runs on the single-mask outlier engine (see outliers.py), so the
+       frame is materialized once per step instead of once per column.
+
+    The compiled plan produces the same frame and row counts as
+    CleaningOps.clean_tabular; the report just no longer lists work on dropped columns.
+    """
+    steps = [dict(step) for step in plan]
+    steps = _hoist_drops(steps)
+    steps = _prune_dropped_columns(steps)
+    if analysis and analysis.get("rows"):
+        if analysis.get("duplicates", 0) / analysis["rows"] >= min_duplicate_ratio:
+            steps = _collapse_duplicates_early(steps)
+    return steps
+
+
+def _hoist_drops(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for step in steps:
+        if step.get("action") != "drop_columns":
+            out.append(step)
+            continue
+        pos = len(out)
+        while pos > 0 and out[pos - 1].get("action") in ("clean_text", "impute_or_drop"):
+            pos -= 1
+        if pos > 0 and out[pos - 1].get("action") == "drop_columns":
+            merged = dict(out[pos - 1])
+            merged["columns"] = list(merged.get("columns", [])) + list(step.get("columns", []))
+            out[pos - 1] = merged
+        else:
+            out.insert(pos, step)
+    return out
+
+
+def _prune_dropped_columns(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    dropped = set()
+    out = []
+    for step in steps:
+        action = step.get("action")
+        if action == "drop_columns":
+            dropped.update(step.get("columns", []))
+        elif action in ("clean_text", "iqr_filter") and dropped:
+            step["report_columns"] = step.get("report_columns", step.get("columns", []))
+            step["columns"] = [c for c in step.get("columns", []) if c not in dropped]
+        elif action == "impute_or_drop" and dropped:
+            step["details"] = {c: m for c, m in step.get("details", {}).items() if c not in dropped}
+        out.append(step)
+    return out
+
+
+def _collapse_duplicates_early(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = list(steps)
+    for i, step in enumerate(steps):
+        if step.get("action") != "drop_duplicates":
+            continue
+        # Walk back over the row-wise maps feeding this dedupe
+        start = i
+        while start > 0 and steps[start - 1].get("action") in COLUMN_LOCAL:
+            start -= 1
+        # Collapse after leading drops (fewer columns to hash), before the real work
+        pos = start
+        while pos < i and steps[pos].get("action") == "drop_columns":
+            pos += 1
+        if pos < i:
+            out.insert(pos, {"step": "collapse_duplicates", "action": "collapse_duplicates",
+                             "reason": "Compiled: dedupe exact rows before row-wise steps."})
+        break
+    return out
+
+
+def _weighted_fill_value(series: pd.Series, weights: Optional[np.ndarray], method: str):
+    """
+    mean/median/mode of `series` as if each row appeared `weights[i]` times.
+    """
+    if weights is None:
+        if method == "mean":
+            return series.mean()
+        if method == "median":
+            return series.median()
+        mode = series.mode()
+        return None if mode.empty else mode[0]
+
+    valid = series.notna().to_numpy()
+    values = series[valid]
+    w = weights[valid]
+    if method == "mode":
+        if values.empty:
+            return None
+        totals = pd.Series(w, index=values.to_numpy()).groupby(level=0, sort=True).sum()
+        # Ties go to the smallest value, like Series.mode()[0]
+        return totals.index[int(np.argmax(totals.to_numpy()))]
+    if values.empty:
+        return np.nan
+    numbers = values.to_numpy(dtype=np.float64)
+    if method == "mean":
+        return float(np.average(numbers, weights=w))
+    order = np.argsort(numbers, kind="mergesort")
+    numbers, cum = numbers[order], np.cumsum(w[order])
+    total = int(cum[-1])
+    lower = numbers[np.searchsorted(cum, (total - 1) // 2, side="right")]
+    upper = numbers[np.searchsorted(cum, total // 2, side="right")]
+    return (lower + upper) / 2.0
+
+
+def duplicate_groups(df: pd.DataFrame) -> np.ndarray:
+    """
+    A group number per row, numbered in order of first appearance and equal for
+    rows DataFrame.duplicated() treats as equal. Rows are grouped by a 64-bit hash
+    of profiler._hashable_frame, then every row is compared with the first row of
+    its group; should two different rows share a hash, pandas groups them instead.
+    """
+    keys = _hashable_frame(df)
+    group = pd.factorize(pd.util.hash_pandas_object(keys, index=False).to_numpy())[0]
+    if len(keys.columns) == 0 or len(keys) == 0:
+        return group
+    first = np.unique(group, return_index=True)[1][group]
+    for _, column in keys.items():
+        values = column.to_numpy()
+        same = (values == values[first]) | (pd.isna(values) & pd.isna(values[first]))
+        if not same.all():
+            return keys.groupby(list(keys.columns), dropna=False, sort=False).ngroup().to_numpy()
+    return group
+
+
+def execute_compiled(df: pd.DataFrame, plan: List[Dict[str, Any]], timings: Optional[Timings] = None,
+                     memo: Optional[PlanMemo] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Runs a plan produced by compile_plan. Accepts uncompiled plans as well.
+    Steps are recorded in `timings` when given. With a `memo` (see step_cache),
+    the plan resumes after its longest memoized prefix and every step's result is memoized.
+    """
+    df_clean = df.copy()
+    weights: Optional[np.ndarray] = None
+    report = {
+        "removed_columns": [],
+        "imputed_columns": [],
+        "outliers_removed": 0,
+        "duplicates_removed": 0,
+        "dropped_rows": 0,
+        "outliers_by_column": {}
+    }
+    start = 0
+    resumed = memo.resume("compiled", plan) if memo else None
+    if resumed:
+        start, df_clean, weights, report = resumed
+
+    for done, step in enumerate(plan[start:], start + 1):
+        action = step.get("action")
+        with measure(timings, action, "step", len(df_clean)) as entry:
+            if action == "drop_columns":
+                cols = step.get("columns", [])
+                df_clean.drop(columns=cols, inplace=True, errors='ignore')
+                report["removed_columns"].extend(cols)
+
+            elif action == "collapse_duplicates":
+                group = duplicate_groups(df_clean)
+                first = np.zeros(len(group), dtype=bool)
+                first[np.unique(group, return_index=True)[1]] = True
+                prior = weights if weights is not None else np.ones(len(df_clean), dtype=np.int64)
+                counts = np.bincount(group, weights=prior).astype(np.int64)
+                weights = counts[group[first]]
+                df_clean = df_clean[first]
+
+            elif action == "drop_duplicates":
+                before = len(df_clean) if weights is None else int(weights.sum())
+                df_clean = df_clean.drop_duplicates()
+                weights = None
+                report["duplicates_removed"] = before - len(df_clean)
+                report["dropped_rows"] += (before - len(df_clean))
+
+            elif action == "impute_or_drop":
+                for col, method in step.get("details", {}).items():
+                    if col not in df_clean.columns: continue
+                    if method not in ("mean", "median", "mode"): continue
+                    value = _weighted_fill_value(df_clean[col], weights, method)
+                    if method == "mode" and value is None:
+                        continue
+                    df_clean[col] = df_clean[col].fillna(value)
+                    report["imputed_columns"].append(f"{col} ({method})")
+
+            elif action == "iqr_filter":
+                initial_rows = len(df_clean)
+                if weights is not None:
+                    # Weighted quantiles are not needed: collapse never precedes an iqr_filter
+                    raise ValueError("iqr_filter cannot run on collapsed rows")
+                df_clean, flagged = filter_outliers(df_clean, step)
+                for col, count in flagged.items():
+                    report["outliers_by_column"][col] = report["outliers_by_column"].get(col, 0) + count
+                removed = initial_rows - len(df_clean)
+                report["outliers_removed"] += removed
+                report["dropped_rows"] += removed
+
+            elif action == "clean_text":
+                # Collapsed rows count once per original row they stand for
+                df_clean, changed = clean_text_step(df_clean, step, weights)
+                if changed:
+                    report["standardized_columns"] = report.get("standardized_columns", [])
+                    report["standardized_columns"].extend(step.get("report_columns", step.get("columns", [])))
+                    report["standardized_cells"] = report.get("standardized_cells", {})
+                    for col, count in changed.items():
+                        report["standardized_cells"][col] = report["standardized_cells"].get(col, 0) + count
+            entry["rows_out"] = len(df_clean)
+        if memo:
+            memo.store(done, df_clean, weights, report)
+
+    return df_clean, report
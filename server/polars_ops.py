@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+
+from outliers import DEFAULT_IQR_K, DEFAULT_MAD_THRESHOLD, DETECTORS, MAD_TO_SIGMA
+
+try:
+    import polars as pl
+    HAS_POLARS = True
+except ImportError:
+    pl = None
+    HAS_POLARS = False
+
+
+def _bounds(col: "pl.Expr", step: dict) -> Tuple["pl.Expr", "pl.Expr"]:
+    """
+    Lower/upper fence expressions of one column, evaluated over the frame they run on
+    (the same statistics outliers.compute_bounds takes from the pandas frame).
+    """
+    method = step.get("method", "iqr")
+    if method in ("iqr", "approx_iqr"):
+        # Exact quartiles: polars computes them in parallel, no sketch needed
+        k = step.get("k", DEFAULT_IQR_K)
+        q1 = col.quantile(0.25, interpolation="linear")
+        q3 = col.quantile(0.75, interpolation="linear")
+        return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    if method == "mad":
+        threshold = step.get("threshold", DEFAULT_MAD_THRESHOLD)
+        values = col.cast(pl.Float64)
+        median = values.median()
+        deviation = (values - median).abs()
+        scale = MAD_TO_SIGMA * deviation.median()
+        scale = pl.when(scale > 0).then(scale).otherwise(np.sqrt(np.pi / 2) * deviation.mean())
+        return median - threshold * scale, median + threshold * scale
+    raise ValueError(f"Unknown outlier detector: {method}. Expected one of {DETECTORS}")
+
+
+def _step(lf: "pl.LazyFrame", step: dict) -> Tuple["pl.LazyFrame", List["pl.Expr"], "pl.LazyFrame"]:
+    """
+    Translates one plan step. Returns the transformed frame, the aggregate
+    expressions its report entry needs, and the frame they are evaluated over
+    (the input, with any helper columns the step added).
+    """
+    action = step.get("action")
+    schema = lf.collect_schema()
+
+    if action == "drop_columns":
+        return lf.drop(step.get("columns", []), strict=False), [], lf
+
+    if action == "drop_duplicates":
+        return lf.unique(maintain_order=True, keep="first"), [], lf
+
+    if action == "impute_or_drop":
+        fills, stats = [], []
+        for col, method in step.get("details", {}).items():
+            if col not in schema:
+                continue
+            c = pl.col(col)
+            if method == "mean":
+                value, imputed = c.mean(), pl.lit(True)
+            elif method == "median":
+                value, imputed = c.median(), pl.lit(True)
+            elif method == "mode":
+                # pandas' mode()[0]: the smallest of the most frequent values; none if all missing
+                value, imputed = c.drop_nulls().mode().min(), c.is_not_null().any()
+            else:
+                continue
+            stats.append(imputed.alias(f"imputed:{col}"))
+            filled = c.fill_null(value)
+            # Integer columns (numpy-backed, so without nulls) keep their dtype, as fillna does
+            fills.append(filled.cast(schema[col]) if schema[col].is_integer() else filled)
+        return (lf.with_columns(fills) if fills else lf), stats, lf
+
+    if action == "iqr_filter":
+        columns = [col for col in step.get("columns", []) if col in schema]
+        if not columns:
+            return lf, [], lf
+        # Missing values never satisfy a bound, as in outliers.outlier_mask. The masks are
+        # materialized once so the filter and the flagged counts share the quantiles.
+        masks = {col: f"__inside_{i}" for i, col in enumerate(columns)}
+        marked = lf.with_columns(
+            pl.col(col).is_between(*_bounds(pl.col(col), step)).fill_null(False).alias(mask)
+            for col, mask in masks.items()
+        )
+        stats = [(~pl.col(mask)).sum().alias(f"flagged:{col}") for col, mask in masks.items()]
+        kept = marked.filter(pl.all_horizontal(list(masks.values()))).drop(list(masks.values()))
+        return kept, stats, marked
+
+    if action == "clean_text":
+        cleaned, stats = [], []
+        for col in step.get("columns", []):
+            dtype = schema.get(col)
+            if dtype is None or not (dtype == pl.String or dtype == pl.Categorical):
+                continue
+            c = pl.col(col).cast(pl.String)
+            stripped = c.str.strip_chars()
+            stats.append(((stripped != c) & c.is_not_null()).sum().alias(f"changed:{col}"))
+            as_category = step.get("as_category", False) or dtype == pl.Categorical
+            cleaned.append((stripped.cast(pl.Categorical) if as_category else stripped).alias(col))
+        return (lf.with_columns(cleaned) if cleaned else lf), stats, lf
+
+    return lf, [], lf
+
+
+def clean_tabular_polars(df: pd.DataFrame, plan: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Runs a cleaning plan as one lazy polars query, multi-threaded and without the
+    per-step copies of the pandas executor. Produces the frame and report of
+    CleaningOps.clean_tabular.
+
+    Every step becomes a lazy frame; the row counts and statistics the report needs
+    are aggregate queries over those frames, and all of them are collected together
+    so polars evaluates the shared sub-plans once.
+    """
+    frames = [pl.from_pandas(df).lazy()]
+    queries = []
+    for step in plan:
+        lf, stats, source = _step(frames[-1], step)
+        queries.append(source.select(pl.len().alias("rows"), *stats))
+        frames.append(lf)
+    queries.append(frames[-1].select(pl.len().alias("rows")))
+    results = pl.collect_all([frames[-1], *queries])
+    cleaned, counts = results[0], [r.row(0, named=True) for r in results[1:]]
+
+    report = {
+        "removed_columns": [],
+        "imputed_columns": [],
+        "outliers_removed": 0,
+        "duplicates_removed": 0,
+        "dropped_rows": 0,
+        "outliers_by_column": {}
+    }
+    for i, step in enumerate(plan):
+        action = step.get("action")
+        before, after, stats = counts[i]["rows"], counts[i + 1]["rows"], counts[i]
+        if action == "drop_columns":
+            report["removed_columns"].extend(step.get("columns", []))
+        elif action == "drop_duplicates":
+            report["duplicates_removed"] = before - after
+            report["dropped_rows"] += before - after
+        elif action == "impute_or_drop":
+            for col, method in step.get("details", {}).items():
+                if stats.get(f"imputed:{col}"):
+                    report["imputed_columns"].append(f"{col} ({method})")
+        elif action == "iqr_filter":
+            for key, count in stats.items():
+                if key.startswith("flagged:"):
+                    col = key[len("flagged:"):]
+                    report["outliers_by_column"][col] = report["outliers_by_column"].get(col, 0) + count
+            report["outliers_removed"] += before - after
+            report["dropped_rows"] += before - after
+        elif action == "clean_text":
+            changed = {key[len("changed:"):]: n for key, n in stats.items() if key.startswith("changed:")}
+            if changed:
+                report.setdefault("standardized_columns", []).extend(step.get("columns", []))
+                report.setdefault("standardized_cells", {})
+                for col, n in changed.items():
+                    report["standardized_cells"][col] = report["standardized_cells"].get(col, 0) + n
+
+    return cleaned.to_pandas(), report
@@ -0,0 +1,266 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, Any, Iterable, Optional
+
+from sketches import KLLSketch, RowHashSketch
+
+CATEGORICAL_DTYPES = {"object", "category", "str", "string"}
+QUARTILES = (0.25, 0.75)
+
+
+def is_profiled_numeric(dtype) -> bool:
+    # Same selection as select_dtypes(include=[np.number]): numbers, but not booleans
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def is_profiled_categorical(dtype) -> bool:
+    return (pd.api.types.is_object_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype)
+            or pd.api.types.is_string_dtype(dtype))
+
+
+def numeric_stats(valid: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    describe()-equivalent stats for a float64 array without NaNs. The array is
+    partitioned in place, so callers must pass a buffer they own.
+    """
+    n = valid.size
+    if n == 0:
+        return {"mean": None, "std": None, "min": None, "max": None, "25%": None, "75%": None}
+    mean = valid.mean()
+    std = float(np.sqrt(np.square(valid - mean).sum() / (n - 1))) if n > 1 else None
+    lo_hi = []
+    for q in QUARTILES:
+        pos = q * (n - 1)
+        lo = int(np.floor(pos))
+        lo_hi.append((lo, min(lo + 1, n - 1), pos - lo))
+    # One partition places both quartile neighbourhoods; min/max are cheap reductions
+    valid.partition(sorted({k for lo, hi, _ in lo_hi for k in (lo, hi)}))
+    q1, q3 = [valid[lo] + (valid[hi] - valid[lo]) * frac for lo, hi, frac in lo_hi]
+    return {
+        "mean": float(mean),
+        "std": std,
+        "min": float(valid.min()),
+        "max": float(valid.max()),
+        "25%": float(q1),
+        "75%": float(q3)
+    }
+
+
+def _hashable_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    `df` with its columns rewritten so that values DataFrame.duplicated() treats as
+    equal hash alike: object columns become their factorize codes (1, 1.0 and "1"
+    are told apart by equality, not by repr; None and NaN are one missing value),
+    and float columns fold -0.0 into 0.0.
+    """
+    columns = {}
+    for i, (_, series) in enumerate(df.items()):
+        if pd.api.types.is_object_dtype(series.dtype):
+            series = pd.Series(pd.factorize(series)[0], index=series.index)
+        elif pd.api.types.is_float_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+            series = series + 0.0
+        columns[i] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def count_duplicate_rows(df: pd.DataFrame) -> int:
+    """
+    Counts rows equal to an earlier row through one 64-bit hash per row, which is
+    several times cheaper than DataFrame.duplicated() on tall frames and counts the
+    same rows (see _hashable_frame). A false positive needs a full 64-bit collision.
+    """
+    if len(df) < 2 or len(df.columns) == 0:
+        return int(df.duplicated().sum())
+    if len(df.columns) == 1:
+        # DataFrame.duplicated() compares a single column as a Series, which is already one hash pass
+        return int(df.iloc[:, 0].duplicated().sum())
+    try:
+        hashes = pd.util.hash_pandas_object(_hashable_frame(df), index=False)
+    except TypeError:
+        # Unhashable cells (lists, dicts) - fall back to pandas' own comparison
+        return int(df.duplicated().sum())
+    return int(hashes.duplicated().sum())
+
+
+def profile_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Single-pass in-memory profile with the analyze_tabular shape.
+
+    Each column buffer is visited once for its null mask and statistics instead
+    of separate isnull/select_dtypes/describe passes over the whole frame.
+    """
+    missing_values = {}
+    dtypes = {}
+    numeric_columns = []
+    categorical_columns = []
+    stats = {}
+
+    for col, series in df.items():
+        dtype = series.dtype
+        dtypes[col] = str(dtype)
+        if is_profiled_numeric(dtype):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            null_mask = np.isnan(values)
+            nulls = int(null_mask.sum())
+            # Boolean indexing already copies; otherwise copy before partitioning
+            valid = values[~null_mask] if nulls else values.copy()
+            numeric_columns.append(col)
+            stats[col] = numeric_stats(valid)
+        else:
+            nulls = int(series.isna().sum())
+            if is_profiled_categorical(dtype):
+                categorical_columns.append(col)
+        missing_values[col] = nulls
+
+    analysis = {
+        "rows": int(len(df)),
+        "columns": int(len(df.columns)),
+        "columns_list": list(df.columns),
+        "missing_values": missing_values,
+        "duplicates": count_duplicate_rows(df),
+        "dtypes": dtypes,
+        "numeric_columns": numeric_columns,
+        "categorical_columns": categorical_columns
+    }
+    if numeric_columns:
+        analysis["stats"] = stats
+    return analysis
+
+
+def resolve_dtype(votes: Counter) -> str:
+    """
+    Picks the dtype pandas would have inferred for the whole file from per-chunk votes.
+    """
+    if not votes:
+        # A column that is empty in every chunk is read as float64 by pandas
+        return "float64"
+    kinds = set(votes)
+    if len(kinds) == 1:
+        return next(iter(kinds))
+    if all(k.startswith(("int", "uint", "float")) for k in kinds):
+        return "float64" if any(k.startswith("float") for k in kinds) else "int64"
+    return "object"
+
+
+class ColumnSummary:
+    """
+    Mergeable per-column statistics: null count, dtype votes, min/max,
+    Welford mean/variance and a KLL quantile sketch.
+    """
+
+    def __init__(self, quantile_k: int = 200):
+        self.nulls = 0
+        self.dtype_votes: Counter = Counter()
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = KLLSketch(k=quantile_k)
+
+    def update(self, series: pd.Series) -> None:
+        null_mask = series.isnull().to_numpy()
+        nulls = int(null_mask.sum())
+        self.nulls += nulls
+        if nulls < len(series):
+            self.dtype_votes[str(series.dtype)] += len(series) - nulls
+
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            return
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)[~null_mask]
+        if values.size == 0:
+            return
+        self._merge_moments(int(values.size), float(values.mean()), float(((values - values.mean()) ** 2).sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sketch.update(values)
+
+    def _merge_moments(self, n_b: int, mean_b: float, m2_b: float) -> None:
+        # Chan et al. parallel form of Welford's update
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+
+    def merge(self, other: "ColumnSummary") -> "ColumnSummary":
+        self.nulls += other.nulls
+        self.dtype_votes.update(other.dtype_votes)
+        if other.n:
+            self._merge_moments(other.n, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        if self.n == 0:
+            return {"mean": None, "std": None, "min": None, "max": None, "25%": None, "75%": None}
+        q1, q3 = self.sketch.quantiles(QUARTILES)
+        return {
+            "mean": float(self.mean),
+            "std": float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None,
+            "min": float(self.min),
+            "max": float(self.max),
+            "25%": float(q1),
+            "75%": float(q3)
+        }
+
+
+class StreamingProfiler:
+    """
+    Builds the `analyze_tabular` result from a stream of DataFrame chunks
+    while holding only per-column summaries in memory.
+    """
+
+    def __init__(self, quantile_k: int = 200, exact_duplicate_limit: int = 1_000_000):
+        self.quantile_k = quantile_k
+        self.rows = 0
+        self.columns: Dict[str, ColumnSummary] = {}
+        self.row_hashes = RowHashSketch(exact_limit=exact_duplicate_limit)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnSummary(self.quantile_k)
+            self.columns[col].update(chunk[col])
+        self.row_hashes.update(chunk)
+
+    def merge(self, other: "StreamingProfiler") -> "StreamingProfiler":
+        self.rows += other.rows
+        for col, summary in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(summary)
+            else:
+                self.columns[col] = summary
+        self.row_hashes.merge(other.row_hashes)
+        return self
+
+    def to_analysis(self) -> Dict[str, Any]:
+        dtypes = {col: resolve_dtype(s.dtype_votes) for col, s in self.columns.items()}
+        numeric_columns = [c for c, d in dtypes.items() if d.startswith(("int", "uint", "float"))]
+        analysis = {
+            "rows": int(self.rows),
+            "columns": int(len(self.columns)),
+            "columns_list": list(self.columns),
+            "missing_values": {c: int(s.nulls) for c, s in self.columns.items()},
+            "duplicates": int(self.row_hashes.duplicates()),
+            "dtypes": dtypes,
+            "numeric_columns": numeric_columns,
+            "categorical_columns": [c for c, d in dtypes.items() if d in CATEGORICAL_DTYPES]
+        }
+        if numeric_columns:
+            analysis["stats"] = {c: self.columns[c].stats() for c in numeric_columns}
+        analysis["profile_mode"] = "streaming"
+        analysis["duplicates_exact"] = self.row_hashes.is_exact
+        return analysis
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], **kwargs) -> Dict[str, Any]:
+    profiler = StreamingProfiler(**kwargs)
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.to_analysis()
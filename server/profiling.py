@@ -0,0 +1,168 @@
+import cProfile
+import contextlib
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process-wide: one profiled task per process records allocations at a time
+_tracing_lock = threading.Lock()
+TRACEMALLOC_FRAMES = 10
+# How often traced memory is checked for a new high, and how much higher it must be for a new snapshot
+PEAK_POLL_SECONDS = 0.05
+PEAK_SNAPSHOT_GROWTH = 1.1
+
+
+def new_profile_id() -> str:
+    return str(uuid.uuid4())
+
+
+def profile_paths(profiles_dir: str, profile_id: str) -> Optional[Dict[str, str]]:
+    """
+    The summary (.json) and raw cProfile (.prof) paths of a profile, or None for
+    an id that is not one (ids are UUIDs; anything else could name a path).
+    """
+    try:
+        profile_id = str(uuid.UUID(profile_id))
+    except ValueError:
+        return None
+    base = os.path.join(profiles_dir, profile_id)
+    return {"summary": base + ".json", "pstats": base + ".prof"}
+
+
+def _short_path(path: str) -> str:
+    parts = path.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def top_functions(stats: pstats.Stats, key: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    The `limit` functions with the highest "tottime" (own time) or "cumtime" (including callees).
+    """
+    index = {"tottime": 2, "cumtime": 3}[key]
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][index], reverse=True)[:limit]
+    return [{
+        "function": name,
+        "location": f"{_short_path(filename)}:{line}",
+        "calls": calls,
+        "own_seconds": round(own, 6),
+        "cumulative_seconds": round(cumulative, 6),
+    } for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+              tracemalloc.Filter(False, "<frozen importlib._bootstrap*")]
+    return [{
+        "site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    } for stat in snapshot.filter_traces(ignore).statistics("lineno")[:limit]]
+
+
+class PeakSnapshots:
+    """
+    Keeps a tracemalloc snapshot from near the traced-memory peak, taken by a
+    watcher thread whenever traced memory grows PEAK_SNAPSHOT_GROWTH over the last
+    one. A snapshot at the end would only show what the task still held then.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _check(self) -> None:
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.size * PEAK_SNAPSHOT_GROWTH:
+            self.size, self.snapshot = current, tracemalloc.take_snapshot()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(PEAK_POLL_SECONDS):
+            self._check()
+
+    def __enter__(self) -> "PeakSnapshots":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._check()
+
+
+def prune_profiles(profiles_dir: str, keep: int) -> None:
+    summaries = sorted((entry for entry in os.scandir(profiles_dir) if entry.name.endswith(".json")),
+                       key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in summaries[:max(0, len(summaries) - keep)]:
+        for path in profile_paths(profiles_dir, entry.name[:-len(".json")]).values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_profiled(profile_id: str, profiles_dir: str, task: str, fn: Callable[[], Any],
+                 top_n: int = 30, keep: int = 200) -> Any:
+    """
+    Runs `fn` under cProfile and, unless another profiled task in this process is
+    already tracing, tracemalloc. Writes the raw cProfile stats and a summary of the
+    top functions and allocation sites under `profiles_dir`, also when `fn` fails,
+    and keeps only the newest `keep` profiles.
+
+    cProfile only sees the calling thread: work a task fans out to thread pools
+    (ZIP members, workbook sheets, image tiles) shows as time waiting on them.
+    Allocation sites are those holding the most memory near the traced peak (see
+    PeakSnapshots); with TRACE_MEMORY on, tracemalloc is not ours and none are recorded.
+    """
+    paths = profile_paths(profiles_dir, profile_id)
+    tracing = not tracemalloc.is_tracing() and _tracing_lock.acquire(blocking=False)
+    if tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    peaks = PeakSnapshots()
+    profiler = cProfile.Profile()
+    error = None
+    start = time.perf_counter()
+    try:
+        with peaks if tracing else contextlib.nullcontext():
+            profiler.enable()
+            try:
+                return fn()
+            finally:
+                profiler.disable()
+    except BaseException as e:
+        error = f"{type(e).__name__}: {str(e)}"
+        raise
+    finally:
+        wall = time.perf_counter() - start
+        summary = {"profile_id": profile_id, "task": task, "created_at": time.time(),
+                   "wall_seconds": round(wall, 6), "error": error}
+        try:
+            if tracing:
+                summary["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                summary["snapshot_traced_bytes"] = peaks.size
+                summary["top_allocations"] = top_allocations(peaks.snapshot, top_n)
+            else:
+                summary["top_allocations"] = None
+        finally:
+            if tracing:
+                tracemalloc.stop()
+                _tracing_lock.release()
+        try:
+            os.makedirs(profiles_dir, exist_ok=True)
+            profiler.dump_stats(paths["pstats"])
+            stats = pstats.Stats(profiler)
+            summary["top_functions"] = top_functions(stats, "tottime", top_n)
+            summary["top_cumulative"] = top_functions(stats, "cumtime", top_n)
+            with open(paths["summary"], "w") as f:
+                json.dump(summary, f, indent=2)
+            prune_profiles(profiles_dir, keep)
+            logger.info(f"Profile {profile_id} of {task} written ({wall:.2f} s)")
+        except OSError as e:
+            logger.error(f"Could not write profile {profile_id}: {str(e)}")
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+class KLLSketch:
+    """
+    Mergeable approximate quantile sketch (KLL compactor hierarchy).
+
+    Memory is O(k * log(n / k)) no matter how many values are pushed through it.
+    Items on level ``h`` carry a weight of ``2 ** h``.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # Keep an odd item behind so the compaction is exact in weight
+                leftover = items[:1] if items.size % 2 else items[:0]
+                pairs = items[leftover.size:]
+                offset = int(self._rng.integers(0, 2))
+                promoted = pairs[offset::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(lvl.size, 2 ** h, dtype=np.float64) for h, lvl in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="mergesort")
+        items = items[order]
+        cum = np.cumsum(weights[order])
+        # Midpoint ranks interpolate like pandas' linear quantile on small inputs
+        ranks = (cum - weights[order] / 2.0) / cum[-1]
+        return np.interp(qs, ranks, items)
+
+
+def _object_key(value) -> Optional[str]:
+    """
+    A string that is equal for values DataFrame.duplicated() treats as equal and
+    the same in every chunk: numbers (1, 1.0, True, -0.0 and 0.0) by value,
+    strings apart from numbers, and None/NaN as one missing value.
+    """
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, (bool, int, float, np.number)):
+        number = float(value) + 0.0
+        return f"n:{number!r}" if number == value else f"i:{value}"
+    if isinstance(value, str):
+        return "s:" + value
+    return f"{type(value).__name__}:{value}"
+
+
+class RowHashSketch:
+    """
+    Estimates how many rows are exact duplicates of an earlier row.
+
+    Row hashes are kept exactly (sorted unique uint64s) until ``exact_limit`` distinct
+    hashes have been seen, after which the sketch degrades to HyperLogLog registers
+    so memory stays bounded at ``2 ** precision`` bytes.
+    """
+
+    def __init__(self, exact_limit: int = 1_000_000, precision: int = 14):
+        self.exact_limit = exact_limit
+        self.p = precision
+        self.rows = 0
+        self._exact = np.empty(0, dtype=np.uint64)
+        self._registers: Optional[np.ndarray] = None
+
+    @staticmethod
+    def hash_rows(df: pd.DataFrame) -> np.ndarray:
+        # Numeric columns are hashed as float64 so 1 and 1.0 collide the same way
+        # they compare equal in DataFrame.duplicated(), even when chunk dtypes differ.
+        # Other columns are hashed through _object_key rather than str(), which would
+        # make 1 and "1" (or None and "None") collide. Unlike profiler._hashable_frame's
+        # factorize codes, the keys are stable from one chunk to the next.
+        columns = {}
+        for i, (_, series) in enumerate(df.items()):
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                series = series.astype(np.float64) + 0.0
+            elif not pd.api.types.is_numeric_dtype(series):
+                series = series.astype(object).map(_object_key)
+            columns[i] = series
+        normalized = pd.DataFrame(columns, index=df.index)
+        return pd.util.hash_pandas_object(normalized, index=False).to_numpy(dtype=np.uint64)
+
+    def update(self, df: pd.DataFrame) -> None:
+        self.update_hashes(self.hash_rows(df))
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        self.rows += int(hashes.size)
+        if self._registers is None:
+            self._exact = np.union1d(self._exact, hashes)
+            if self._exact.size > self.exact_limit:
+                self._registers = np.zeros(1 << self.p, dtype=np.uint8)
+                self._add_to_registers(self._exact)
+                self._exact = np.empty(0, dtype=np.uint64)
+        else:
+            self._add_to_registers(hashes)
+
+    def _add_to_registers(self, hashes: np.ndarray) -> None:
+        tail_bits = 64 - self.p
+        idx = (hashes >> np.uint64(tail_bits)).astype(np.intp)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        # Position of the leftmost 1-bit in the remaining tail_bits (<= 50 bits, exact in float64)
+        with np.errstate(divide="ignore"):
+            msb = np.floor(np.log2(tail.astype(np.float64)))
+        rank = np.where(tail == 0, tail_bits + 1, tail_bits - msb).astype(np.uint8)
+        np.maximum.at(self._registers, idx, rank)
+
+    def merge(self, other: "RowHashSketch") -> "RowHashSketch":
+        rows = self.rows + other.rows
+        if other._registers is None:
+            self.update_hashes(other._exact)
+        else:
+            if self._registers is None:
+                self._registers = np.zeros(1 << self.p, dtype=np.uint8)
+                self._add_to_registers(self._exact)
+                self._exact = np.empty(0, dtype=np.uint64)
+            np.maximum(self._registers, other._registers, out=self._registers)
+        self.rows = rows
+        return self
+
+    @property
+    def is_exact(self) -> bool:
+        return self._registers is None
+
+    def distinct(self) -> int:
+        if self._registers is None:
+            return int(self._exact.size)
+        m = float(1 << self.p)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self._registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def duplicates(self) -> int:
+        return max(0, self.rows - self.distinct())
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of at most ``size`` rows from a stream of DataFrame chunks.
+
+    Every row draws a random priority and the reservoir keeps the ``size`` lowest,
+    which samples exactly like Algorithm R but takes a chunk at a time. Once the
+    reservoir is full, only rows that beat its worst priority are copied at all.
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        self.size = size
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._frame: Optional[pd.DataFrame] = None
+        self._keys = np.empty(0)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows_seen += len(chunk)
+        keys = self._rng.random(len(chunk))
+        if self._keys.size >= self.size:
+            entering = keys < self._keys.max()
+            chunk, keys = chunk[entering], keys[entering]
+            if not keys.size:
+                return
+        frame = chunk if self._frame is None else pd.concat([self._frame, chunk], ignore_index=True)
+        keys = np.concatenate([self._keys, keys])
+        if keys.size > self.size:
+            keep = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            frame, keys = frame.iloc[keep], keys[keep]
+        self._frame, self._keys = frame.reset_index(drop=True), keys
+
+    @property
+    def complete(self) -> bool:
+        # Every row seen so far is in the sample
+        return self.rows_seen <= self.size
+
+    def frame(self) -> pd.DataFrame:
+        return self._frame if self._frame is not None else pd.DataFrame()
@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Object columns are sized from this many values instead of a deep scan of every cell
+SIZE_SAMPLE = 1000
+
+
+def column_storage(column: pd.Series) -> Tuple[Optional[tuple], int]:
+    """
+    (identity, bytes) of a column's storage, without scanning it. Columns sharing
+    storage, as shallow copies do under copy-on-write, share the identity; storage
+    that cannot be identified without a copy (masked, categorical) gets None.
+    """
+    values = column.array
+    if isinstance(column.dtype, pd.ArrowDtype) or getattr(column.dtype, "storage", None) == "pyarrow":
+        chunks = values.__arrow_array__().chunks
+        buffers = tuple(b.address for chunk in chunks for b in chunk.buffers() if b is not None)
+        return ("arrow", buffers, values.nbytes), int(values.nbytes)
+    if not isinstance(column.dtype, np.dtype):
+        return None, int(values.nbytes)
+    data = column.to_numpy()
+    size = data.nbytes
+    if data.dtype == object and len(data):
+        sample = data[::max(1, len(data) // SIZE_SAMPLE)]
+        size += int(sum(sys.getsizeof(v) for v in sample) * len(data) / len(sample))
+    return ("numpy", data.__array_interface__["data"][0], data.nbytes), size
+
+
+def frame_columns(df: pd.DataFrame) -> List[Tuple[Optional[tuple], int]]:
+    return [column_storage(column) for _, column in df.items()]
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    # Object columns are estimated from a sample (see column_storage)
+    return int(df.index.nbytes) + sum(size for _, size in frame_columns(df))
+
+
+class StepCache:
+    """
+    In-memory LRU of the frames a plan leaves after each of its steps, keyed by a
+    fingerprint of the input frame and of every step up to that point. A plan that
+    only changes its last steps resumes from the longest prefix it shares with one
+    cleaned before, instead of replaying the whole plan on a fresh copy.
+
+    Entries are shallow copies, so under copy-on-write they only hold the columns a
+    later step replaced; the budget counts each shared column once. Each process has
+    its own cache: with the process job executor a re-clean hits when it runs on a
+    worker that cleaned the file before.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._entries: "OrderedDict[str, Tuple[pd.DataFrame, Optional[np.ndarray], Dict[str, Any], int, list]]" = OrderedDict()
+        # Column storage held by the entries: identity -> [bytes, number of columns using it]
+        self._storage: Dict[tuple, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def memo(self, key: str, df: pd.DataFrame) -> "PlanMemo":
+        """
+        A PlanMemo for cleaning `df`, the frame of `key` (an upload, ZIP member or
+        sheet, including its size and mtime so a replaced upload never matches).
+        """
+        shape = [key, len(df), [[str(c), str(t)] for c, t in df.dtypes.items()]]
+        return PlanMemo(self, hashlib.sha1(json.dumps(shape).encode()).hexdigest())
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, Optional[np.ndarray], Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        df, weights, report, _, _ = entry
+        return df.copy(deep=False), weights, copy.deepcopy(report)
+
+    def put(self, key: str, df: pd.DataFrame, weights: Optional[np.ndarray], report: Dict[str, Any]) -> None:
+        columns = frame_columns(df)
+        # Storage of its own: the index, the weights and columns that cannot be shared
+        own = int(df.index.nbytes) + (weights.nbytes if weights is not None else 0)
+        own += sum(size for identity, size in columns if identity is None)
+        shared = [(identity, size) for identity, size in columns if identity is not None]
+        if own + sum(size for _, size in shared) > self.max_bytes:
+            return
+        entry = (df.copy(deep=False), weights, copy.deepcopy(report), own, shared)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._release(old)
+            self._entries[key] = entry
+            self.total += own
+            for identity, size in shared:
+                held = self._storage.setdefault(identity, [size, 0])
+                if held[1] == 0:
+                    self.total += size
+                held[1] += 1
+            while self.total > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._release(evicted)
+
+    def _release(self, entry: tuple) -> None:
+        self.total -= entry[3]
+        for identity, _ in entry[4]:
+            held = self._storage[identity]
+            held[1] -= 1
+            if held[1] == 0:
+                self.total -= held[0]
+                del self._storage[identity]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._storage.clear()
+            self.total = 0
+
+
+class PlanMemo:
+    """
+    Binds a StepCache to one input frame for the executors (plan_compiler.execute_compiled,
+    CleaningOps.clean_tabular): `resume` finds the longest cached prefix of their steps,
+    `store` keeps the state after each step. `reused` counts the steps skipped.
+    """
+
+    def __init__(self, cache: StepCache, base: str):
+        self.cache = cache
+        self.base = base
+        self.keys: List[str] = []
+        self.reused = 0
+
+    def resume(self, executor: str, steps: List[Dict[str, Any]]) -> Optional[tuple]:
+        """
+        (steps done, frame, weights, report) after the longest cached prefix of
+        `steps` as run by `executor`, or None when no prefix is cached.
+        """
+        key = hashlib.sha1(f"{self.base}:{executor}".encode())
+        self.keys = []
+        for step in steps:
+            key.update(json.dumps(step, sort_keys=True, default=str).encode())
+            self.keys.append(key.hexdigest())
+        for done in range(len(steps), 0, -1):
+            state = self.cache.get(self.keys[done - 1])
+            if state is not None:
+                self.reused = done
+                logger.info(f"Resuming plan after {done} of {len(steps)} memoized steps")
+                return (done, *state)
+        return None
+
+    def store(self, done: int, df: pd.DataFrame, weights: Optional[np.ndarray], report: Dict[str, Any]) -> None:
+        self.cache.put(self.keys[done - 1], df, weights, report)
@@ -0,0 +1,358 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from sketches import KLLSketch, RowHashSketch
+from text_ops import clean_text_step
+from outliers import DEFAULT_IQR_K, DEFAULT_MAD_THRESHOLD, MAD_TO_SIGMA, outlier_mask
+from output_formats import FrameWriter
+
+ChunkSource = Callable[[], Iterable[pd.DataFrame]]
+# Steps that need no statistics from pass one
+STATELESS = {"drop_columns", "clean_text"}
+
+
+def empty_report() -> Dict[str, Any]:
+    return {
+        "removed_columns": [],
+        "imputed_columns": [],
+        "outliers_removed": 0,
+        "duplicates_removed": 0,
+        "dropped_rows": 0,
+        "outliers_by_column": {}
+    }
+
+
+class ExternalDeduper:
+    """
+    Finds the rows that repeat an earlier row, in time and I/O linear in the row count.
+
+    Row hashes are buffered with their row numbers and, past `memory_limit` entries,
+    appended to run files partitioned by the hash's top bits. `finish` then loads
+    each partition once, keeps the first occurrence of every hash and stores the
+    other row numbers (sorted) for `duplicates`. Only one partition is in memory
+    at a time.
+    """
+
+    def __init__(self, spill_dir: str, memory_limit: int = 2_000_000, partition_bits: int = 8):
+        self.spill_dir = spill_dir
+        self.memory_limit = memory_limit
+        self.shift = np.uint64(64 - partition_bits)
+        self.buffers: Tuple[list, list] = ([], [])
+        self.buffered = 0
+        self.spilled = False
+        # Sorted duplicate row numbers, per partition once spilled, and a read cursor into each
+        self.runs: list = []
+        self.cursors: list = []
+
+    def _path(self, partition: int, kind: str) -> str:
+        return os.path.join(self.spill_dir, f"{kind}_{partition:03d}.bin")
+
+    def add(self, hashes: np.ndarray, rows: np.ndarray) -> None:
+        """
+        Records the hashes of rows `rows`. Row numbers must increase across calls.
+        """
+        self.buffers[0].append(np.asarray(hashes, dtype=np.uint64))
+        self.buffers[1].append(np.asarray(rows, dtype=np.int64))
+        self.buffered += len(hashes)
+        if self.buffered > self.memory_limit:
+            self.spill()
+
+    def spill(self) -> None:
+        hashes, rows = np.concatenate(self.buffers[0]), np.concatenate(self.buffers[1])
+        partitions = (hashes >> self.shift).astype(np.intp)
+        # Stable: rows stay in increasing order within every partition
+        order = np.argsort(partitions, kind="stable")
+        bounds = np.flatnonzero(np.diff(partitions[order])) + 1
+        for group in np.split(order, bounds):
+            if group.size == 0:
+                continue
+            partition = int(partitions[group[0]])
+            with open(self._path(partition, "hashes"), "ab") as f:
+                hashes[group].tofile(f)
+            with open(self._path(partition, "rows"), "ab") as f:
+                rows[group].tofile(f)
+        self.buffers = ([], [])
+        self.buffered = 0
+        self.spilled = True
+
+    @staticmethod
+    def _repeats(hashes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        repeat = np.ones(len(hashes), dtype=bool)
+        # return_index gives the first occurrence, and rows are in increasing order
+        repeat[np.unique(hashes, return_index=True)[1]] = False
+        return rows[repeat]
+
+    def finish(self) -> None:
+        if not self.spilled:
+            hashes = np.concatenate(self.buffers[0]) if self.buffers[0] else np.empty(0, dtype=np.uint64)
+            rows = np.concatenate(self.buffers[1]) if self.buffers[1] else np.empty(0, dtype=np.int64)
+            self.runs = [np.sort(self._repeats(hashes, rows))]
+        else:
+            if self.buffered:
+                self.spill()
+            for partition in range(int(1 << (64 - int(self.shift)))):
+                if not os.path.exists(self._path(partition, "hashes")):
+                    continue
+                repeats = self._repeats(np.fromfile(self._path(partition, "hashes"), dtype=np.uint64),
+                                        np.fromfile(self._path(partition, "rows"), dtype=np.int64))
+                os.remove(self._path(partition, "hashes"))
+                os.remove(self._path(partition, "rows"))
+                if repeats.size:
+                    path = self._path(partition, "repeats")
+                    repeats.tofile(path)
+                    self.runs.append(np.memmap(path, dtype=np.int64, mode="r"))
+        self.cursors = [0] * len(self.runs)
+
+    def duplicates(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Mask of the rows in `rows` that repeat an earlier row. Calls must cover
+        increasing row numbers, as they were added.
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=bool)
+        last = rows[-1]
+        found = []
+        for i, run in enumerate(self.runs):
+            end = int(np.searchsorted(run, last, side="right"))
+            if end > self.cursors[i]:
+                found.append(np.asarray(run[self.cursors[i]:end]))
+                self.cursors[i] = end
+        if not found:
+            return np.zeros(len(rows), dtype=bool)
+        return np.isin(rows, np.concatenate(found))
+
+
+class StreamingCleaner:
+    """
+    Two-pass, constant-memory executor for tabular cleaning plans.
+
+    Pass one collects the global statistics the plan depends on (fill values for
+    `impute_or_drop`, quartiles for `iqr_filter`). Pass two re-reads the source and
+    applies every step chunk by chunk, appending the result to the output CSV.
+
+    `drop_duplicates` needs to know which rows repeat an earlier one before pass
+    two writes them: the rows are hashed as they reach that step (see
+    ExternalDeduper), in pass one when only drop_columns and clean_text come
+    before it, otherwise in an extra pass between the two.
+
+    Differences from CleaningOps.clean_tabular: medians and quartiles come from a
+    KLL sketch, outlier bounds are computed against the imputed (not yet
+    de-duplicated) data, the "mad" detector estimates the MAD as IQR / 2, and only
+    the first drop_duplicates step of a plan removes rows.
+    """
+
+    def __init__(self, read_chunks: ChunkSource, plan: list, quantile_k: int = 200,
+                 hash_memory_limit: int = 2_000_000, mode_track_limit: int = 10_000):
+        self.read_chunks = read_chunks
+        self.plan = plan
+        self.quantile_k = quantile_k
+        self.hash_memory_limit = hash_memory_limit
+        self.mode_track_limit = mode_track_limit
+        self.fill_values: Dict[str, Any] = {}
+        self.bounds: Dict[str, Tuple[float, float]] = {}
+
+    # --- shared column-local steps -------------------------------------------------
+
+    def _numbered_chunks(self) -> Iterator[pd.DataFrame]:
+        # Rows are numbered across chunks, so every pass names them alike for the deduper
+        start = 0
+        for chunk in self.read_chunks():
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+
+    def _dedupe_at(self) -> Optional[int]:
+        return next((i for i, step in enumerate(self.plan) if step.get("action") == "drop_duplicates"), None)
+
+    def _apply_column_steps(self, chunk: pd.DataFrame, steps: Optional[List[dict]] = None) -> pd.DataFrame:
+        for step in self.plan if steps is None else steps:
+            action = step.get("action")
+            if action == "drop_columns":
+                chunk = chunk.drop(columns=step.get("columns", []), errors='ignore')
+            elif action == "clean_text":
+                chunk, _ = clean_text_step(chunk, step)
+        return chunk
+
+    # --- pass one --------------------------------------------------------------------
+
+    def collect_statistics(self, dedupe: Optional[ExternalDeduper] = None) -> None:
+        """
+        Pass one. With `dedupe`, also hashes the rows for the plan's drop_duplicates
+        step, which only drop_columns and clean_text may precede.
+        """
+        impute = {}
+        iqr_cols = []
+        detectors = {}
+        for step in self.plan:
+            if step.get("action") == "impute_or_drop":
+                impute.update(step.get("details", {}))
+            elif step.get("action") == "iqr_filter":
+                iqr_cols.extend(c for c in step.get("columns", []) if c not in iqr_cols)
+                for col in step.get("columns", []):
+                    detectors[col] = step
+
+        sketches = {c: KLLSketch(self.quantile_k) for c in set(iqr_cols) | {c for c, m in impute.items() if m == "median"}}
+        sums = {c: [0.0, 0] for c, m in impute.items() if m == "mean"}
+        modes = {c: Counter() for c, m in impute.items() if m == "mode"}
+        nulls = Counter()
+
+        stop = self._dedupe_at()
+        for chunk in self._numbered_chunks():
+            if dedupe is not None:
+                chunk = self._apply_column_steps(chunk, self.plan[:stop])
+                dedupe.add(RowHashSketch.hash_rows(chunk), chunk.index.to_numpy())
+                chunk = self._apply_column_steps(chunk, self.plan[stop:])
+            else:
+                chunk = self._apply_column_steps(chunk)
+            for col in chunk.columns:
+                if col in sketches or col in sums:
+                    values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                    if col in sketches:
+                        sketches[col].update(values)
+                    if col in sums:
+                        valid = values[~np.isnan(values)]
+                        sums[col][0] += float(valid.sum())
+                        sums[col][1] += int(valid.size)
+                if col in modes:
+                    modes[col].update(chunk[col].dropna().value_counts().to_dict())
+                    if len(modes[col]) > self.mode_track_limit:
+                        modes[col] = Counter(dict(modes[col].most_common(self.mode_track_limit)))
+                if col in impute:
+                    nulls[col] += int(chunk[col].isnull().sum())
+
+        for col, method in impute.items():
+            if method == "median" and sketches[col].count:
+                self.fill_values[col] = float(sketches[col].quantiles(0.5)[0])
+            elif method == "mean" and sums[col][1]:
+                self.fill_values[col] = sums[col][0] / sums[col][1]
+            elif method == "mode" and modes[col]:
+                # Ties resolve to the smallest value, matching Series.mode()[0]
+                top = max(modes[col].values())
+                self.fill_values[col] = min(v for v, n in modes[col].items() if n == top)
+
+        for col in iqr_cols:
+            if col not in sketches:
+                continue
+            # Imputed cells take part in the quartiles just like in the in-memory path
+            if col in self.fill_values and nulls[col]:
+                remaining = nulls[col]
+                while remaining:
+                    batch = min(remaining, 1_000_000)
+                    sketches[col].update(np.full(batch, self.fill_values[col]))
+                    remaining -= batch
+            q1, median, q3 = sketches[col].quantiles([0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            step = detectors[col]
+            if step.get("method") == "mad":
+                spread = step.get("threshold", DEFAULT_MAD_THRESHOLD) * MAD_TO_SIGMA * iqr / 2.0
+                self.bounds[col] = (median - spread, median + spread)
+            else:
+                k = step.get("k", DEFAULT_IQR_K)
+                self.bounds[col] = (q1 - k * iqr, q3 + k * iqr)
+
+    def collect_duplicates(self, dedupe: ExternalDeduper) -> None:
+        """
+        The extra pass for plans whose drop_duplicates follows steps that need pass
+        one's statistics: hashes the rows as they reach it.
+        """
+        stop = self._dedupe_at()
+        for chunk in self._numbered_chunks():
+            chunk = self._apply_steps(chunk, self.plan[:stop], None, empty_report(), set())
+            dedupe.add(RowHashSketch.hash_rows(chunk), chunk.index.to_numpy())
+
+    # --- pass two --------------------------------------------------------------------
+
+    def run(self, output_path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Second pass: cleans chunk by chunk into `output_path`, in the format its
+        suffix names (see output_formats), and returns (stats, report).
+        """
+        spill_dir = tempfile.mkdtemp(prefix="dedupe_")
+        try:
+            return self._run(output_path, spill_dir)
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def _run(self, output_path: str, spill_dir: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        stop = self._dedupe_at()
+        dedupe = ExternalDeduper(spill_dir, memory_limit=self.hash_memory_limit) if stop is not None else None
+        hash_early = dedupe is not None and all(s.get("action") in STATELESS for s in self.plan[:stop])
+        self.collect_statistics(dedupe if hash_early else None)
+        if dedupe is not None:
+            if not hash_early:
+                self.collect_duplicates(dedupe)
+            dedupe.finish()
+
+        report = empty_report()
+        for step in self.plan:
+            action = step.get("action")
+            if action == "drop_columns":
+                report["removed_columns"].extend(step.get("columns", []))
+            elif action == "impute_or_drop":
+                for col, method in step.get("details", {}).items():
+                    if col in self.fill_values:
+                        report["imputed_columns"].append(f"{col} ({method})")
+
+        stats = {"original_rows": 0, "original_columns": 0, "cleaned_rows": 0, "cleaned_columns": 0}
+        standardized = set()
+        with FrameWriter(output_path) as out:
+            for chunk in self._numbered_chunks():
+                stats["original_rows"] += len(chunk)
+                stats["original_columns"] = max(stats["original_columns"], len(chunk.columns))
+                chunk = self._apply_steps(chunk, self.plan, dedupe, report, standardized)
+                stats["cleaned_rows"] += len(chunk)
+                stats["cleaned_columns"] = len(chunk.columns)
+                out.write(chunk)
+
+        if standardized:
+            report["standardized_columns"] = [c for s in self.plan if s.get("action") == "clean_text"
+                                              for c in s.get("columns", [])]
+        stats["removed_rows"] = stats["original_rows"] - stats["cleaned_rows"]
+        stats["removed_columns"] = stats["original_columns"] - stats["cleaned_columns"]
+        return stats, report
+
+    def _apply_steps(self, chunk: pd.DataFrame, steps: List[dict], dedupe: Optional[ExternalDeduper],
+                     report: dict, standardized: set) -> pd.DataFrame:
+        deduped = False
+        for step in steps:
+            action = step.get("action")
+
+            if action == "drop_columns":
+                chunk = chunk.drop(columns=step.get("columns", []), errors='ignore')
+
+            elif action == "clean_text":
+                chunk, changed = clean_text_step(chunk, step)
+                standardized.update(changed)
+                cells = report.setdefault("standardized_cells", {})
+                for col, count in changed.items():
+                    cells[col] = cells.get(col, 0) + count
+
+            elif action == "impute_or_drop":
+                for col in step.get("details", {}):
+                    if col in chunk.columns and col in self.fill_values:
+                        chunk[col] = chunk[col].fillna(self.fill_values[col])
+
+            elif action == "drop_duplicates" and dedupe is not None and not deduped:
+                deduped = True
+                keep = ~dedupe.duplicates(chunk.index.to_numpy())
+                removed = int((~keep).sum())
+                chunk = chunk[keep]
+                report["duplicates_removed"] += removed
+                report["dropped_rows"] += removed
+
+            elif action == "iqr_filter":
+                bounds = {c: self.bounds[c] for c in step.get("columns", []) if c in self.bounds}
+                mask, flagged = outlier_mask(chunk, bounds)
+                for col, count in flagged.items():
+                    report["outliers_by_column"][col] = report["outliers_by_column"].get(col, 0) + count
+                removed = int((~mask).sum())
+                chunk = chunk[mask]
+                report["outliers_removed"] += removed
+                report["dropped_rows"] += removed
+
+        return chunk
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+
+def is_text_dtype(dtype) -> bool:
+    """
+    Columns clean_text normalizes: object, pandas/Arrow string dtypes and categoricals.
+    """
+    return (pd.api.types.is_object_dtype(dtype)
+            or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype))
+
+
+def _normalize_values(values: pd.Index) -> pd.Index:
+    if _is_arrow_text(values.dtype):
+        return values.str.strip()
+    # object: keep the old "everything becomes text" behaviour, but only for non-null cells
+    return pd.Index([str(v).strip() for v in values], dtype=object)
+
+
+def _is_arrow_text(dtype) -> bool:
+    return pd.api.types.is_string_dtype(dtype) and not pd.api.types.is_object_dtype(dtype) \
+        and not isinstance(dtype, pd.CategoricalDtype)
+
+
+def clean_text_column(series: pd.Series, as_category: bool = False,
+                      weights: Optional[np.ndarray] = None) -> Tuple[pd.Series, int]:
+    """
+    Strips whitespace from text cells. Missing values stay missing.
+
+    object and categorical columns are dictionary-encoded: every distinct value is
+    normalized once and the result is mapped back through the codes. String dtypes
+    (python or pyarrow storage) already strip in a vectorized kernel, so they only
+    take the dictionary route when `as_category` asks for codes anyway.
+
+    Returns (cleaned, changed) where `changed` is the exact number of cells whose
+    value differs, counting each row `weights[i]` times when weights are given.
+    """
+    if _is_arrow_text(series.dtype) and not as_category:
+        stripped = series.str.strip()
+        # NaN-backed "str" columns compare missing cells as unequal, so mask them out
+        differs = ((stripped != series) & series.notna()).to_numpy(dtype=bool, na_value=False)
+        changed = int(differs.sum()) if weights is None else int(weights[differs].sum())
+        return stripped, changed
+
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    except TypeError:
+        # Unhashable cells (lists, dicts) cannot be dictionary-encoded
+        return series, 0
+    if isinstance(uniques, pd.Categorical):
+        uniques = pd.Index(np.asarray(uniques, dtype=object))
+    uniques = pd.Index(uniques)
+    cleaned = _normalize_values(uniques)
+
+    # Exact change count: distinct values that changed, weighted by their row counts
+    differs = np.array([type(a) is not type(b) or a != b for a, b in zip(uniques, cleaned)], dtype=bool)
+    present = codes >= 0
+    counts = np.bincount(codes[present], weights=None if weights is None else weights[present],
+                         minlength=len(uniques))
+    changed = int(counts[differs].sum())
+
+    # Stripping can merge values ("a " and "a"), so re-encode against the cleaned dictionary
+    new_codes, categories = pd.factorize(cleaned)
+    codes = np.where(present, new_codes[np.maximum(codes, 0)], -1) if len(uniques) else codes
+    if as_category or isinstance(series.dtype, pd.CategoricalDtype):
+        result = pd.Categorical.from_codes(codes, categories=categories)
+        try:
+            # Sorted like astype("category"), so mode() ties still resolve to the smallest value
+            result = result.reorder_categories(categories.sort_values())
+        except TypeError:
+            pass
+        return pd.Series(result, index=series.index, name=series.name), changed
+    # Code -1 picks the trailing NaN
+    values = np.append(categories.to_numpy(dtype=object), np.nan)[codes]
+    return pd.Series(values, index=series.index, name=series.name, dtype=object), changed
+
+
+def clean_text_step(df: pd.DataFrame, step: dict,
+                    weights: Optional[np.ndarray] = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Applies a `clean_text` plan step. Set "as_category": true on the step to
+    store the cleaned columns as pandas categoricals. Returns the frame and the
+    changed-cell count for every column that was normalized.
+    """
+    changed = {}
+    for col in step.get("columns", []):
+        if col not in df.columns or not is_text_dtype(df[col].dtype):
+            continue
+        df[col], changed[col] = clean_text_column(df[col], step.get("as_category", False), weights)
+    return df, changed
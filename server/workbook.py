@@ -0,0 +1,97 @@
+import logging
+import os
+import re
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import python_calamine  # noqa: F401  (pandas' "calamine" engine)
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+SHEET_FORMATS = ("xlsx", "parquet")
+
+
+def excel_engine(ext: str) -> Optional[str]:
+    """
+    The Rust calamine reader when installed (xlsx and xls alike, several times
+    faster), else openpyxl in read-only mode for xlsx and pandas' default for xls.
+    """
+    if HAS_CALAMINE:
+        return "calamine"
+    return "openpyxl" if ext == "xlsx" else None
+
+
+def sheet_names(path: str, ext: str) -> List[str]:
+    with pd.ExcelFile(path, engine=excel_engine(ext)) as book:
+        return list(book.sheet_names)
+
+
+def read_sheet(path: str, ext: str, sheet=0) -> pd.DataFrame:
+    return pd.read_excel(path, sheet_name=sheet, engine=excel_engine(ext))
+
+
+def read_workbook(path: str, ext: str, workers: int = 1, engine: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Every sheet of a workbook, in workbook order, read with `engine` (excel_engine's pick by default).
+
+    With one worker the workbook is opened once and its sheets parsed in turn.
+    With several, each worker thread opens its own handle and parses a share of
+    the sheets; that repeats the shared-strings load per worker, so it only pays
+    off for workbooks with several large sheets and an engine that releases the
+    GIL while parsing.
+    """
+    engine = engine or excel_engine(ext)
+    with pd.ExcelFile(path, engine=engine) as book:
+        names = list(book.sheet_names)
+        if workers <= 1 or len(names) <= 1:
+            return {name: book.parse(name) for name in names}
+
+    local = threading.local()
+    handles: List[pd.ExcelFile] = []
+
+    def parse(name: str) -> pd.DataFrame:
+        if not hasattr(local, "book"):
+            local.book = pd.ExcelFile(path, engine=engine)
+            handles.append(local.book)
+        return local.book.parse(name)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(workers, len(names))) as pool:
+            frames = list(pool.map(parse, names))
+    finally:
+        for book in handles:
+            book.close()
+    return dict(zip(names, frames))
+
+
+def safe_sheet_name(index: int, name: str) -> str:
+    # Sheet names may hold characters that are not allowed in archive paths
+    return f"{index:03d}_{re.sub(r'[^A-Za-z0-9._-]', '_', str(name)) or 'sheet'}"
+
+
+def write_workbook(output_path: str, frames: Dict[str, pd.DataFrame]) -> None:
+    """
+    Writes cleaned sheets into one workbook, keeping their names and order.
+    """
+    with pd.ExcelWriter(output_path) as writer:
+        for name, df in frames.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+
+def write_parquet_sheets(out_dir: str, frames: Dict[str, pd.DataFrame]) -> List[tuple]:
+    """
+    One Parquet file per sheet in `out_dir`; returns (arcname, path) pairs for write_archive.
+    """
+    files = []
+    for index, (name, df) in enumerate(frames.items()):
+        arcname = f"{safe_sheet_name(index, name)}.parquet"
+        path = os.path.join(out_dir, arcname)
+        df.to_parquet(path, index=False)
+        files.append((arcname, path))
+    return files
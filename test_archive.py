@@ -0,0 +1,139 @@
+import atexit
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+# Keep uploads/, cleaned/ and the rest of the server's state out of the working directory
+TMP = tempfile.mkdtemp(prefix="datasanct_archive_")
+atexit.register(shutil.rmtree, TMP, True)
+os.environ.update({name: os.path.join(TMP, name.lower()) for name in
+                   ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR")})
+import config  # noqa: E402
+for _name in ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR"):
+    setattr(config, _name, os.environ[_name])
+
+from fastapi.testclient import TestClient  # noqa: E402
+from archive import extract_members, safe_name, tabular_members  # noqa: E402
+from jobs import JobManager  # noqa: E402
+import main  # noqa: E402
+import pipeline  # noqa: E402
+
+# Member name -> rows; the last one tries to escape the extraction directory
+TABLES = {"2023/data.csv": 120, "2024/data.csv": 80, "../evil.csv": 40}
+IGNORED = ("__MACOSX/2023/._data.csv", ".hidden.csv", "2024/.DS_Store", "readme.txt")
+
+
+def messy_csv(rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"value": rng.normal(10, 2, rows), "label": rng.choice([" a", "b ", None], rows)})
+    df.loc[::9, "value"] = np.nan
+    return pd.concat([df, df.head(5)]).to_csv(index=False)
+
+
+def bundle():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for seed, (name, rows) in enumerate(TABLES.items()):
+            zf.writestr(name, messy_csv(rows, seed))
+        for name in IGNORED:
+            zf.writestr(name, "junk")
+    return buffer.getvalue()
+
+
+@contextmanager
+def thread_jobs():
+    """
+    A thread-pool JobManager serving main's routes with the real pipeline. main keeps
+    the directories of whichever test imported it first, so they follow pipeline's.
+    """
+    saved = main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR
+    manager = main.jobs = JobManager("thread", max_workers=2)
+    main.UPLOAD_DIR, main.CLEANED_DIR = pipeline.UPLOAD_DIR, pipeline.CLEANED_DIR
+    os.makedirs(pipeline.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(pipeline.CLEANED_DIR, exist_ok=True)
+    try:
+        yield manager
+    finally:
+        manager.shutdown()
+        main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR = saved
+
+
+def inside(directory, path):
+    directory = os.path.realpath(directory)
+    return os.path.commonpath([directory, os.path.realpath(path)]) == directory
+
+
+def test_safe_names_stay_inside_the_destination():
+    dest = os.path.join(TMP, "members")
+    names = ["../evil.csv", "../../etc/passwd.csv", "/abs/path.csv", "a/../../b.csv", "dir/", "..", "",
+             "C:\\windows\\x.csv", "we ird/na$me.csv"]
+    written = [safe_name(i, name) for i, name in enumerate(names)]
+    assert len(set(written)) == len(written)
+    for name in written:
+        assert os.sep not in name and name not in (".", "..")
+        assert os.path.dirname(os.path.join(dest, name)) == dest and inside(dest, os.path.join(dest, name))
+    # Equal basenames in different folders are kept apart
+    assert safe_name(0, "2023/data.csv") != safe_name(1, "2024/data.csv")
+
+
+def test_only_tabular_members_are_extracted():
+    path = os.path.join(TMP, "bundle.zip")
+    with open(path, "wb") as f:
+        f.write(bundle())
+    with zipfile.ZipFile(path) as zf:
+        assert [info.filename for info in tabular_members(zf)] == list(TABLES)
+    dest = os.path.join(TMP, "extracted")
+    members = extract_members(path, dest, buffer_size=64)
+    assert [m["name"] for m in members] == list(TABLES)
+    assert all(inside(dest, m["path"]) and os.path.exists(m["path"]) for m in members)
+    assert not os.path.exists(os.path.join(TMP, "evil.csv"))
+    for member, rows in zip(members, TABLES.values()):
+        assert len(pd.read_csv(member["path"])) == rows + 5
+
+
+def test_archives_are_analyzed_and_cleaned_member_by_member():
+    with thread_jobs():
+        client = TestClient(main.app)
+        analyzed = client.post("/analyze", files={"file": ("bundle.zip", bundle(), "application/zip")})
+        assert analyzed.status_code == 200, analyzed.text
+        body = analyzed.json()
+        assert [m["name"] for m in body["members"]] == list(TABLES)
+        assert all("error" not in m for m in body["members"])
+        assert body["extracted_file"] == "2023/data.csv" and body["analysis"]["rows"] == 125
+        extracted = os.listdir(pipeline.members_dir(body["file_id"]))
+        assert sorted(extracted) == sorted([safe_name(i, n) for i, n in enumerate(TABLES)] + ["manifest.json"])
+        assert not os.path.exists(os.path.join(os.path.dirname(pipeline.UPLOAD_DIR), "evil.csv"))
+
+        cleaned = client.post(f"/clean/{body['file_id']}")
+        assert cleaned.status_code == 200, cleaned.text
+        result = cleaned.json()
+        assert result["download_url"].endswith(".zip") and [m["name"] for m in result["members"]] == list(TABLES)
+        assert result["report"]["duplicates_removed"] == sum(m["report"]["duplicates_removed"] for m in result["members"])
+        assert result["report"]["duplicates_removed"] >= 15
+        download = client.get(result["download_url"])
+        assert download.status_code == 200
+
+    with zipfile.ZipFile(io.BytesIO(download.content)) as zf:
+        assert sorted(zf.namelist()) == sorted(list(TABLES) + ["report.json"])
+        report = json.loads(zf.read("report.json"))
+        assert [entry["name"] for entry in report] == list(TABLES)
+        assert [entry["output"] for entry in report] == list(TABLES)
+        for name, rows in TABLES.items():
+            assert len(pd.read_csv(zf.open(name))) <= rows
+            assert not pd.read_csv(zf.open(name)).duplicated().any()
+
+
+if __name__ == "__main__":
+    test_safe_names_stay_inside_the_destination()
+    test_only_tabular_members_are_extracted()
+    test_archives_are_analyzed_and_cleaned_member_by_member()
+    print("[SUCCESS] ZIP archives are extracted safely and cleaned member by member.")
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from agent import agent  # noqa: E402
+from backends import get_backend  # noqa: E402
+from polars_ops import HAS_POLARS, clean_tabular_polars  # noqa: E402
+from test_plan_compiler import REPORT_KEYS, random_frame, random_plan  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not HAS_POLARS, reason="polars is not installed")
+
+
+def normalized(df):
+    """Backend-neutral view: fresh index, text as object with None for missing."""
+    out = df.reset_index(drop=True)
+    for col in out.columns:
+        if not pd.api.types.is_numeric_dtype(out[col]) or pd.api.types.is_bool_dtype(out[col]):
+            out[col] = out[col].astype(object).where(out[col].notna(), None)
+    return out
+
+
+def polars_frame(rng):
+    # Arrow cannot hold mixed-type object columns; the backend falls back to pandas for those
+    return random_frame(rng).drop(columns="mixed")
+
+
+def assert_conforms(df, plan):
+    expected, expected_report = CleaningOps.clean_tabular(df, plan)
+    # Called directly: the backend would quietly fall back to pandas on errors
+    actual, actual_report = clean_tabular_polars(df, plan)
+    pd.testing.assert_frame_equal(normalized(actual), normalized(expected),
+                                  check_dtype=False, check_exact=False, rtol=1e-12)
+    for key in REPORT_KEYS:
+        assert (actual_report.get(key) or None) == (expected_report.get(key) or None), (key, plan)
+
+
+def test_polars_backend_matches_pandas_on_random_inputs():
+    rng = np.random.default_rng(4321)
+    for _ in range(200):
+        df = polars_frame(rng)
+        assert_conforms(df, random_plan(rng, list(df.columns)))
+
+
+def test_polars_backend_matches_pandas_on_generated_plans():
+    rng = np.random.default_rng(7)
+    for _ in range(30):
+        df = polars_frame(rng)
+        assert_conforms(df, agent.generate_cleaning_plan(agent.analyze_tabular(df), "tabular")["plan"])
+
+
+def test_polars_backend_matches_pandas_detectors_and_dtypes():
+    rng = np.random.default_rng(11)
+    n = 500
+    df = pd.DataFrame({
+        "x": np.append(rng.normal(0, 1, n - 2), [40.0, np.nan]),
+        "k": rng.integers(0, 4, n),
+        "s": pd.Series(rng.choice([" p", "q ", None], n), dtype="str"),
+        "c": pd.Categorical(rng.choice([" u", "v"], n)),
+    })
+    for method in ("iqr", "mad"):
+        assert_conforms(df, [{"action": "iqr_filter", "columns": ["x", "k"], "method": method}])
+    assert_conforms(df, [{"action": "clean_text", "columns": ["s", "c"]},
+                         {"action": "impute_or_drop", "details": {"x": "mean", "s": "mode", "k": "median"}},
+                         {"action": "drop_duplicates"}])
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend("spark")
+
+
+if __name__ == "__main__":
+    test_polars_backend_matches_pandas_on_random_inputs()
+    test_polars_backend_matches_pandas_on_generated_plans()
+    test_polars_backend_matches_pandas_detectors_and_dtypes()
+    test_unknown_backend_is_rejected()
+    print("[SUCCESS] The polars backend matches the pandas executor.")
@@ -0,0 +1,118 @@
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+# Keep uploads/, cleaned/ and the rest of the server's state out of the working directory
+TMP = tempfile.mkdtemp(prefix="datasanct_batch_")
+atexit.register(shutil.rmtree, TMP, True)
+os.environ.update({name: os.path.join(TMP, name.lower()) for name in
+                   ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR")})
+os.environ["JOB_EXECUTOR"] = "thread"
+import config  # noqa: E402
+for _name in ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR"):
+    setattr(config, _name, os.environ[_name])
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jobs import JobManager  # noqa: E402
+import main  # noqa: E402
+import pipeline  # noqa: E402
+
+
+def shard(seed, rows=200):
+    # One export split into shards: same columns and dtypes, different rows
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"value": rng.normal(10, 2, rows), "label": rng.choice([" a", "b ", None], rows)})
+    df.loc[::11, "value"] = np.nan
+    return pd.concat([df, df.head(10)]).to_csv(index=False)
+
+
+def other_schema(rows=150):
+    rng = np.random.default_rng(99)
+    return pd.DataFrame({"id": np.arange(rows), "score": rng.integers(0, 5, rows)}).to_csv(index=False)
+
+
+@contextmanager
+def thread_jobs():
+    """
+    A thread-pool JobManager serving main's routes with the real pipeline. main keeps
+    the directories of whichever test imported it first, so they follow pipeline's.
+    """
+    saved = main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR
+    manager = main.jobs = JobManager("thread", max_workers=2)
+    main.UPLOAD_DIR, main.CLEANED_DIR = pipeline.UPLOAD_DIR, pipeline.CLEANED_DIR
+    os.makedirs(pipeline.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(pipeline.CLEANED_DIR, exist_ok=True)
+    try:
+        yield TestClient(main.app)
+    finally:
+        manager.shutdown()
+        main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR = saved
+
+
+def ndjson(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batches_stream_one_line_per_file_and_share_plans_by_schema():
+    uploads = [("shard1.csv", shard(1)), ("shard2.csv", shard(2)), ("ids.csv", other_schema()),
+               ("shard3.csv", shard(3))]
+    with thread_jobs() as client:
+        lines = ndjson(client.post("/analyze/batch",
+                                   files=[("files", (name, data, "text/csv")) for name, data in uploads]))
+        assert sorted(line["original_filename"] for line in lines) == sorted(name for name, _ in uploads)
+        assert all(line["status"] == "success" and line["plan"]["plan"] for line in lines)
+
+        by_name = {line["original_filename"]: line for line in lines}
+        shards = [by_name[name] for name in ("shard1.csv", "shard2.csv", "shard3.csv")]
+        # The first shard to finish is planned, the others reuse its plan
+        planned = [line for line in shards if "plan_reused_from" not in line]
+        assert len(planned) == 1
+        for line in shards:
+            assert line.get("plan_reused_from", planned[0]["file_id"]) == planned[0]["file_id"]
+            assert line["plan"] == planned[0]["plan"]
+            assert pipeline.metadata.get(line["file_id"])["plan"] == planned[0]["plan"]
+        assert "plan_reused_from" not in by_name["ids.csv"]
+
+        # Known content answers from the store, and its second copy is not kept
+        stored = len(os.listdir(pipeline.UPLOAD_DIR))
+        again, = ndjson(client.post("/analyze/batch", files=[("files", ("copy.csv", shard(1), "text/csv"))]))
+        assert again["file_id"] == by_name["shard1.csv"]["file_id"] and again["original_filename"] == "copy.csv"
+        assert len(os.listdir(pipeline.UPLOAD_DIR)) == stored
+
+        file_ids = [line["file_id"] for line in lines]
+        cleaned = ndjson(client.post("/clean/batch", json={"file_ids": file_ids + ["missing"]}))
+        assert sorted(line["file_id"] for line in cleaned) == sorted(file_ids + ["missing"])
+        results = {line["file_id"]: line for line in cleaned}
+        assert results["missing"]["status"] == "error" and results["missing"]["status_code"] == 404
+        for file_id in file_ids:
+            assert results[file_id]["status"] == "success"
+            assert client.get(results[file_id]["download_url"]).status_code == 200
+
+
+def test_batches_above_the_limit_are_refused():
+    limit = config.BATCH_MAX_FILES
+    config.BATCH_MAX_FILES = 2
+    try:
+        with thread_jobs() as client:
+            files = [("files", (f"shard{i}.csv", shard(10 + i), "text/csv")) for i in range(3)]
+            assert client.post("/analyze/batch", files=files).status_code == 413
+            assert client.post("/clean/batch", json={"file_ids": ["a", "b", "c"]}).status_code == 413
+            assert len(ndjson(client.post("/clean/batch", json={"file_ids": ["a", "b"]}))) == 2
+    finally:
+        config.BATCH_MAX_FILES = limit
+
+
+if __name__ == "__main__":
+    test_batches_stream_one_line_per_file_and_share_plans_by_schema()
+    test_batches_above_the_limit_are_refused()
+    print("[SUCCESS] Batches stream one line per file and share plans between identical schemas.")
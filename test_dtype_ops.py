@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from plan_compiler import compile_plan, execute_compiled  # noqa: E402
+from agent import agent  # noqa: E402
+from dtype_ops import HAS_PYARROW, optimize_dtypes, read_csv  # noqa: E402
+from test_plan_compiler import REPORT_KEYS, random_frame, random_plan  # noqa: E402
+
+
+def assert_same_output(df, plan):
+    """Cleaning the shrunk frame writes the same file and report as cleaning the original."""
+    small, _ = optimize_dtypes(df, min_category_rows=0)
+    for run in (lambda d: CleaningOps.clean_tabular(d, plan),
+                lambda d: execute_compiled(d, compile_plan(plan, agent.analyze_tabular(d), 0.0))):
+        expected, expected_report = run(df)
+        actual, actual_report = run(small)
+        assert actual.to_csv(index=False) == expected.to_csv(index=False), plan
+        for key in REPORT_KEYS:
+            assert (actual_report.get(key) or None) == (expected_report.get(key) or None), (key, plan)
+
+
+def test_optimized_frames_clean_identically():
+    rng = np.random.default_rng(2024)
+    for _ in range(150):
+        df = random_frame(rng)
+        df["txt3"] = pd.Series(rng.choice([" p", "q", None], len(df)), dtype="str", index=df.index)
+        assert_same_output(df, random_plan(rng, list(df.columns)))
+
+
+def test_optimized_frames_get_the_same_plan():
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        df = random_frame(rng)
+        small, _ = optimize_dtypes(df, min_category_rows=0)
+        plan = agent.generate_cleaning_plan(agent.analyze_tabular(df), "tabular")
+        assert agent.generate_cleaning_plan(agent.analyze_tabular(small), "tabular") == plan
+        assert_same_output(df, plan["plan"])
+
+
+def test_memory_shrinks_and_is_reported():
+    rng = np.random.default_rng(0)
+    n = 10000
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "level": rng.integers(0, 100, n),
+        "city": pd.Series(rng.choice(["Oslo", "Lima", "Pune"], n), dtype="str"),
+        "name": pd.Series([f"user{i}" for i in range(n)], dtype="str"),
+        "score": rng.random(n),
+    })
+    small, memory = optimize_dtypes(df)
+    assert memory["converted"] == {"id": "int16", "level": "int8", "city": "category"}
+    assert memory["after_bytes"] < 0.6 * memory["before_bytes"]
+    assert small["score"].dtype == np.float64 and small["name"].dtype == df["name"].dtype
+    pd.testing.assert_frame_equal(small.astype(df.dtypes.to_dict()), df)
+
+
+def test_pyarrow_parser_keeps_default_dtypes():
+    csv = ("n,x,day,stamp,flag,text\n"
+           "1,2.5,2024-01-01,2024-01-01 10:00:00,True,\"a, b\"\n"
+           ",,2024-01-02,2024-01-02 11:00:00,false, c\n"
+           "3,1e3,bad,,,\n")
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+        f.write(csv)
+    try:
+        expected = pd.read_csv(f.name)
+        actual = read_csv(f.name, "pyarrow" if HAS_PYARROW else "c")
+        pd.testing.assert_frame_equal(actual, expected)
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == "__main__":
+    test_optimized_frames_clean_identically()
+    test_optimized_frames_get_the_same_plan()
+    test_memory_shrinks_and_is_reported()
+    test_pyarrow_parser_keeps_default_dtypes()
+    print("[SUCCESS] The load stage leaves cleaning results unchanged.")
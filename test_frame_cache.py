@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from frame_cache import FrameCache  # noqa: E402
+
+ANALYSIS = {"rows": 1000, "columns_list": ["value", "label"]}
+PLAN = {"plan": [{"action": "drop_duplicates"}]}
+
+
+def frame(rows=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"value": rng.normal(size=rows), "label": rng.choice(["a", "b", None], rows)})
+
+
+def upload(directory, name, content="value,label\n1,a\n"):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def test_round_trip_and_staleness():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FrameCache(os.path.join(tmp, "cache"), 64 * 1024 * 1024)
+        source = upload(tmp, "a.csv")
+        df = frame()
+        cache.put("a", source, ANALYSIS, PLAN, df)
+        entry = cache.get("a")
+        assert entry["analysis"] == ANALYSIS and entry["plan"] == PLAN
+        pd.testing.assert_frame_equal(entry["df"], df, check_dtype=False)
+
+        # Plans chosen later (batch planning) replace the stored one
+        assert cache.set_plan("a", {"plan": []})
+        assert cache.get("a")["plan"] == {"plan": []}
+        assert not cache.set_plan("missing", PLAN)
+
+        # A changed upload invalidates the entry and its sidecar
+        upload(tmp, "a.csv", "value,label\n1,a\n2,b\n")
+        assert cache.get("a") is None
+        assert os.listdir(os.path.join(tmp, "cache")) == []
+
+
+def test_entries_without_a_frame_keep_analysis_and_plan():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FrameCache(os.path.join(tmp, "cache"), 64 * 1024 * 1024)
+        cache.put("a", upload(tmp, "a.csv"), ANALYSIS, PLAN)
+        entry = cache.get("a")
+        assert entry["df"] is None and entry["plan"] == PLAN
+
+
+def test_a_failed_write_leaves_the_previous_entry_intact():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        cache = FrameCache(cache_dir, 64 * 1024 * 1024)
+        source = upload(tmp, "a.csv")
+        cache.put("a", source, ANALYSIS, PLAN)
+        # Fails halfway through serializing the sidecar
+        for write in (lambda: cache.put("a", source, {"rows": object()}, PLAN),
+                      lambda: cache.set_plan("a", {"plan": object()})):
+            try:
+                write()
+                assert False, "expected TypeError"
+            except TypeError:
+                pass
+            assert cache.get("a")["plan"] == PLAN
+        assert sorted(os.listdir(cache_dir)) == ["a.json"]
+
+
+def test_least_recently_used_frames_are_evicted_past_the_size_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        cache = FrameCache(cache_dir, 64 * 1024 * 1024)
+        for i, file_id in enumerate(("a", "b")):
+            cache.put(file_id, upload(tmp, f"{file_id}.csv"), ANALYSIS, PLAN, frame())
+            # mtime is the recency; make it unambiguous
+            os.utime(os.path.join(cache_dir, f"{file_id}.arrow"), (1000 + i, 1000 + i))
+        size = os.path.getsize(os.path.join(cache_dir, "a.arrow"))
+        cache.max_bytes = int(size * 2.5)
+        cache.get("a")  # "a" is now the most recently used
+        cache.put("c", upload(tmp, "c.csv"), ANALYSIS, PLAN, frame())
+        assert cache.get("b") is None
+        assert cache.get("a")["df"] is not None and cache.get("c")["df"] is not None
+
+
+def test_sweep_drops_entries_whose_upload_is_gone():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FrameCache(os.path.join(tmp, "cache"), 64 * 1024 * 1024)
+        kept, gone = upload(tmp, "kept.csv"), upload(tmp, "gone.csv")
+        cache.put("kept", kept, ANALYSIS, PLAN, frame())
+        cache.put("gone", gone, ANALYSIS, PLAN, frame())
+        os.remove(gone)
+        assert cache.sweep() == 1
+        assert sorted(os.listdir(os.path.join(tmp, "cache"))) == ["kept.arrow", "kept.json"]
+
+
+if __name__ == "__main__":
+    test_round_trip_and_staleness()
+    test_entries_without_a_frame_keep_analysis_and_plan()
+    test_a_failed_write_leaves_the_previous_entry_intact()
+    test_least_recently_used_frames_are_evicted_past_the_size_budget()
+    test_sweep_drops_entries_whose_upload_is_gone()
+    print("[SUCCESS] Frame cache entries round-trip, go stale and are evicted.")
@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+import config  # noqa: E402
+from agent import CleaningAgent  # noqa: E402
+from cleaning_ops import CleaningOps  # noqa: E402
+from image_ops import (DENOISE_MODES, blockiness, denoise, denoise_tiled, estimate_sigma,  # noqa: E402
+                       measure_image, resolve_mode, tile_spans)
+
+
+def gradient(height=400, width=500):
+    y, x = np.mgrid[0:height, 0:width]
+    return np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+
+
+def noisy_image(height=520, width=600, sigma=20, seed=0):
+    rng = np.random.default_rng(seed)
+    base = gradient(height, width)
+    base[100:300, 150:400] = (40, 200, 90)  # hard edges crossing tile seams
+    return np.clip(base + rng.normal(0, sigma, base.shape), 0, 255).astype(np.uint8)
+
+
+def denoise_steps(plan):
+    return [step for step in plan["plan"] if step["action"] == "fastNlMeansDenoisingColored"]
+
+
+def plan_for(sigma, blocky=1.0):
+    return CleaningAgent().generate_cleaning_plan({"noise_sigma": sigma, "blockiness": blocky}, "image")
+
+
+def test_tile_spans_cover_the_image_with_overlap():
+    for length, tile, overlap in ((600, 256, 16), (520, 256, 16), (1000, 300, 40), (257, 256, 16)):
+        spans = tile_spans(length, tile, overlap)
+        assert spans[0][0] == 0 and spans[-1][1] == length
+        assert all(0 < stop - start <= tile for start, stop in spans)
+        for (_, stop), (start, _) in zip(spans, spans[1:]):
+            assert stop - start >= overlap, (length, spans)
+    assert tile_spans(200, 256, 16) == [(0, 200)]
+    assert tile_spans(256, 256, 16) == [(0, 256)]
+
+
+def test_tiled_denoise_matches_the_whole_image_in_every_mode():
+    img = noisy_image()
+    for mode in DENOISE_MODES:
+        params = resolve_mode({"mode": mode})
+        expected = denoise(img, params)
+        assert np.array_equal(denoise_tiled(img, params, tile_size=256, overlap=16, workers=2), expected), mode
+
+
+def test_single_tile_and_single_worker():
+    params = resolve_mode({"mode": "fast"})
+    small = noisy_image(200, 240)
+    assert np.array_equal(denoise_tiled(small, params, tile_size=256), denoise(small, params))
+    img = noisy_image()
+    assert np.array_equal(denoise_tiled(img, params, tile_size=256, workers=1), denoise(img, params))
+
+
+def test_noise_is_measured_per_channel():
+    clean = gradient().astype(np.uint8)
+    assert estimate_sigma(clean[..., 1]) < 0.5
+    assert measure_image(clean)["noise_sigma"] < 0.5 and blockiness(clean[..., 1]) < config.IMAGE_BLOCKINESS_THRESHOLD
+    rng = np.random.default_rng(1)
+    noisy = np.clip(gradient() + rng.normal(0, 15, clean.shape), 0, 255).astype(np.uint8)
+    assert abs(measure_image(noisy)["noise_sigma"] - 15) < 1.5
+    # Decimation for large images keeps the per-pixel noise level
+    large = np.clip(gradient(1600, 2000) + rng.normal(0, 15, (1600, 2000, 3)), 0, 255).astype(np.uint8)
+    measured = measure_image(large, max_side=1024)
+    assert measured["analysis_scale"] == 0.5 and abs(measured["noise_sigma"] - 15) < 1.5
+    # Tiny inputs have no measurable noise or blocking
+    assert estimate_sigma(np.zeros((2, 50), np.uint8)) == 0.0 and blockiness(np.zeros((8, 8), np.uint8)) == 1.0
+
+
+def test_compression_blocks_are_detected():
+    ok, jpeg = cv2.imencode(".jpg", gradient().astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 5])
+    blocky = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    assert ok and blockiness(cv2.cvtColor(blocky, cv2.COLOR_BGR2GRAY)) >= config.IMAGE_BLOCKINESS_THRESHOLD
+    steps = denoise_steps(plan_for(0.0, measure_image(blocky)["blockiness"]))
+    assert [step["mode"] for step in steps] == ["fast"]
+
+
+def test_the_plan_follows_the_measured_noise():
+    agent = CleaningAgent()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clean.png")
+        cv2.imwrite(path, gradient().astype(np.uint8))
+        analysis = agent.analyze_image(path)
+        assert analysis["detected_issues"] == []
+        assert denoise_steps(agent.generate_cleaning_plan(analysis, "image")) == []
+
+    # Mild noise gets the bilateral filter, its colour sigma clipped to [10, 75]
+    light, mild = denoise_steps(plan_for(2.1)), denoise_steps(plan_for(4.9))
+    assert resolve_mode(light[0])["filter"] == resolve_mode(mild[0])["filter"] == "bilateral"
+    assert light[0]["params"]["sigma_color"] == 10.0 and mild[0]["params"]["sigma_color"] == 4 * 4.9
+
+    # Stronger noise gets non-local means with h following sigma, clipped to [3, 20]
+    for sigma, h in ((5.0, 5.0), (14.3, 14.0), (60.0, 20.0)):
+        step, = denoise_steps(plan_for(sigma))
+        assert step["mode"] == config.IMAGE_DENOISE_MODE
+        assert resolve_mode(step)["filter"] == "nlmeans"
+        assert step["params"] == {"h": h, "h_color": h}
+    fast_sigma = config.IMAGE_FAST_MODE_SIGMA
+    config.IMAGE_FAST_MODE_SIGMA = 1.0
+    try:
+        assert denoise_steps(plan_for(2.1))[0]["params"]["h"] == 3.0
+    finally:
+        config.IMAGE_FAST_MODE_SIGMA = fast_sigma
+
+    # Analyses without measurements keep the previous unconditional denoise
+    assert denoise_steps(agent.generate_cleaning_plan({}, "image"))[0]["mode"] == config.IMAGE_DENOISE_MODE
+
+
+def test_clean_images_are_copied_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = os.path.join(tmp, "photo.jpg"), os.path.join(tmp, "cleaned.jpg")
+        cv2.imwrite(source, noisy_image(200, 240))
+        assert CleaningOps.clean_image(source, target, []) == target
+        with open(source, "rb") as a, open(target, "rb") as b:
+            assert a.read() == b.read()
+
+
+if __name__ == "__main__":
+    test_tile_spans_cover_the_image_with_overlap()
+    test_tiled_denoise_matches_the_whole_image_in_every_mode()
+    test_single_tile_and_single_worker()
+    test_noise_is_measured_per_channel()
+    test_compression_blocks_are_detected()
+    test_the_plan_follows_the_measured_noise()
+    test_clean_images_are_copied_unchanged()
+    print("[SUCCESS] Images are measured, planned and denoised tile by tile.")
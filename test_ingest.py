@@ -0,0 +1,109 @@
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import zipfile
+
+import pandas as pd
+from fastapi import UploadFile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from ingest import UploadRejected, receive_upload, sniff_format  # noqa: E402
+
+CSV = "name,value\nAnn,1\nbob,2\n"
+
+
+def archive(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name in names:
+            zf.writestr(name, "x")
+    return buffer.getvalue()
+
+
+def upload(data, filename, known_size=True):
+    return UploadFile(io.BytesIO(data), filename=filename, size=len(data) if known_size else None)
+
+
+def receive(data, filename, directory, known_size=True, **options):
+    return asyncio.run(receive_upload(upload(data, filename, known_size), directory, "f1", **options))
+
+
+def test_formats_are_sniffed_from_the_content():
+    workbook = archive("[Content_Types].xml", "xl/workbook.xml")
+    assert sniff_format(workbook, "xlsx") == "xlsx"
+    assert sniff_format(workbook, "bin") == "xlsx"
+    assert sniff_format(archive("data.csv"), "csv") == "zip"
+    assert sniff_format(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + bytes(100), "xlsx") == "xls"
+    assert sniff_format(b"\x89PNG\r\n\x1a\n" + bytes(100), "jpg") == "png"
+    assert sniff_format(b"\xff\xd8\xff\xe0" + bytes(100), "jpeg") == "jpeg"
+    assert sniff_format(b"\xff\xd8\xff\xe0" + bytes(100), "png") == "jpg"
+    assert sniff_format(CSV.encode(), "txt") == "csv"
+    assert sniff_format(CSV.encode(), "md") == "md"
+    # Binary content under a known extension is refused, unknown formats are kept as they are
+    assert sniff_format(bytes(range(256)), "csv") is None
+    assert sniff_format(bytes(range(256)), "bin") == "bin"
+
+
+def test_utf16_text_is_stored_as_utf8():
+    for encoding in ("utf-16", "utf-16-be"):
+        data = ("\ufeff" if encoding == "utf-16-be" else "") + "name,city\n" + "Zoë,Kraków\n" * 50
+        raw = data.encode(encoding)
+        assert sniff_format(raw[:101], "csv") == "csv"  # cut mid-character
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = receive(raw, "export.csv", tmp, chunk_size=33)
+            assert stored["path"].endswith(".csv") and stored["size"] == len(raw)
+            df = pd.read_csv(stored["path"])
+            assert list(df.columns) == ["name", "city"] and len(df) == 50 and (df["city"] == "Kraków").all()
+    # A BOM in front of binary content is not text
+    assert sniff_format(b"\xff\xfe" + bytes(range(0xd8, 0xe0)) * 20, "csv") is None
+
+
+def test_uploads_are_hashed_and_sampled():
+    samples = []
+
+    async def on_sample(sample, ext):
+        samples.append((sample, ext))
+        return "preview"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = (CSV * 100).encode()
+        stored = receive(data, "data.CSV", tmp, chunk_size=64, sample_bytes=100, on_sample=on_sample)
+        assert stored["path"] == os.path.join(tmp, "f1.csv") and stored["size"] == len(data)
+        assert stored["sample_result"] == "preview" and samples == [(data[:100], "csv")]
+        with open(stored["path"], "rb") as f:
+            assert f.read() == data
+
+
+def test_oversized_uploads_are_refused_and_removed():
+    data = (CSV * 1000).encode()
+    with tempfile.TemporaryDirectory() as tmp:
+        for known_size in (True, False):
+            try:
+                receive(data, "data.csv", tmp, known_size, max_bytes=1024, chunk_size=256)
+                assert False, "expected UploadRejected"
+            except UploadRejected as e:
+                assert e.status_code == 413
+            # No partial file is left behind when the limit is crossed mid-stream
+            assert os.listdir(tmp) == []
+        assert receive(data, "data.csv", tmp, max_bytes=len(data))["size"] == len(data)
+
+
+def test_content_that_contradicts_its_extension_is_refused():
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            receive(bytes(range(256)) * 4, "data.csv", tmp)
+            assert False, "expected UploadRejected"
+        except UploadRejected as e:
+            assert e.status_code == 415
+        assert os.listdir(tmp) == []
+
+
+if __name__ == "__main__":
+    test_formats_are_sniffed_from_the_content()
+    test_utf16_text_is_stored_as_utf8()
+    test_uploads_are_hashed_and_sampled()
+    test_oversized_uploads_are_refused_and_removed()
+    test_content_that_contradicts_its_extension_is_refused()
+    print("[SUCCESS] Uploads are sniffed, size-limited and stored.")
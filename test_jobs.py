@@ -0,0 +1,159 @@
+import atexit
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+# Keep uploads/, cleaned/ and the rest of the server's state out of the working directory
+TMP = tempfile.mkdtemp(prefix="datasanct_jobs_")
+atexit.register(shutil.rmtree, TMP, True)
+os.environ.update({name: os.path.join(TMP, name.lower()) for name in
+                   ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR")})
+import config  # noqa: E402
+for _name in ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR"):
+    setattr(config, _name, os.environ[_name])
+config.JOB_EVENTS_POLL_SECONDS = 0.01
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jobs import JobManager, JobQueueFull  # noqa: E402
+import main  # noqa: E402
+
+gate = threading.Event()
+
+
+def run_clean(progress, file_id, **options):
+    progress("loading", 10)
+    gate.wait(10)
+    progress("cleaning", 50)
+    progress("writing", 80)
+    # Lets the events drain before the job finishes
+    time.sleep(0.1)
+    return {"status": "success", "file_id": file_id}
+
+
+def spin(progress):
+    while True:
+        progress("working", 50)
+        time.sleep(0.01)
+
+
+@contextmanager
+def job_manager(max_workers=1, max_queue=2):
+    """
+    A thread-pool JobManager serving main's routes, whose jobs run the tasks above
+    (jobs look tasks up by name on the pipeline module).
+    """
+    saved_pipeline, saved_jobs = sys.modules.get("pipeline"), main.jobs
+    sys.modules["pipeline"] = types.SimpleNamespace(run_clean=run_clean, spin=spin)
+    manager = main.jobs = JobManager("thread", max_workers=max_workers, max_queue=max_queue)
+    gate.clear()
+    try:
+        yield manager
+    finally:
+        gate.set()
+        manager.shutdown()
+        main.jobs = saved_jobs
+        if saved_pipeline is None:
+            sys.modules.pop("pipeline", None)
+        else:
+            sys.modules["pipeline"] = saved_pipeline
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_full_queue_is_refused_with_429():
+    with job_manager(max_queue=2) as manager:
+        client = TestClient(main.app)
+        accepted = [client.post(f"/clean/f{i}?async_job=true", json={}) for i in range(2)]
+        assert [r.status_code for r in accepted] == [202, 202]
+        refused = client.post("/clean/f2?async_job=true", json={})
+        assert refused.status_code == 429 and "queue is full" in refused.json()["detail"]
+        try:
+            manager.submit("run_clean", file_id="f3")
+            assert False, "expected JobQueueFull"
+        except JobQueueFull:
+            pass
+        # Finished jobs free their slots
+        gate.set()
+        for response in accepted:
+            wait_until(lambda: manager.get(response.json()["job_id"]).finished)
+        assert client.post("/clean/f4?async_job=true", json={}).status_code == 202
+
+
+def test_cancelled_jobs_stop_at_their_next_checkpoint():
+    with job_manager(max_workers=1, max_queue=4) as manager:
+        running = manager.submit("spin")
+        queued = manager.submit("spin")
+        wait_until(lambda: running.status == "running")
+        assert manager.cancel(queued.id)
+        assert manager.cancel(running.id)
+        wait_until(lambda: running.finished and queued.finished)
+        assert running.status == "cancelled" and queued.status == "cancelled"
+        assert running.events[-1]["status"] == "cancelled"
+        assert not manager.cancel(running.id)
+
+
+def test_event_stream_reports_progress_in_order_then_the_result():
+    with job_manager() as manager:
+        client = TestClient(main.app)
+        job_id = client.post("/clean/f0?async_job=true", json={}).json()["job_id"]
+        wait_until(lambda: manager.get(job_id).stage == "loading")
+        gate.set()
+        events, result = [], None
+        with client.stream("GET", f"/jobs/{job_id}/events") as response:
+            kind = None
+            for line in response.iter_lines():
+                if line.startswith("event: "):
+                    kind = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if kind == "result":
+                        result = data
+                    else:
+                        events.append(data)
+    assert events[0] == {"status": "queued", "stage": "queued", "percent": 0}
+    progress = [(e["stage"], e["percent"]) for e in events if e["status"] == "running"]
+    assert progress == [("queued", 0), ("loading", 10), ("cleaning", 50), ("writing", 80)]
+    assert events[-1] == {"status": "succeeded", "stage": "done", "percent": 100}
+    assert result["status"] == "succeeded" and result["result"] == {"status": "success", "file_id": "f0"}
+
+
+
+def test_thread_jobs_run_without_a_manager_process():
+    with job_manager() as manager:
+        gate.set()
+        job = manager.submit("run_clean", file_id="f0")
+        wait_until(lambda: job.finished)
+        assert job.status == "succeeded" and manager._manager is None
+        assert not multiprocessing.active_children()
+    # Thread mode also starts from a script read from stdin, which spawn cannot re-import
+    script = ("import sys, types; sys.path.insert(0, 'server')\n"
+              "sys.modules['pipeline'] = types.SimpleNamespace(ping=lambda progress: 'pong')\n"
+              "from jobs import JobManager\n"
+              "manager = JobManager('thread')\n"
+              "print(manager.submit('ping').future.result(10))\n"
+              "manager.shutdown()\n")
+    done = subprocess.run([sys.executable, "-"], input=script, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+    assert done.returncode == 0 and done.stdout.strip() == "pong", done.stderr
+
+
+if __name__ == "__main__":
+    test_full_queue_is_refused_with_429()
+    test_cancelled_jobs_stop_at_their_next_checkpoint()
+    test_event_stream_reports_progress_in_order_then_the_result()
+    test_thread_jobs_run_without_a_manager_process()
+    print("[SUCCESS] Jobs queue, cancel and stream their progress.")
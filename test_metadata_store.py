@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from metadata_store import MetadataStore, collect_garbage  # noqa: E402
+
+
+def set_accessed(store, table, key, seconds_ago):
+    column = "file_id" if table == "uploads" else "cache_key"
+    with sqlite3.connect(store.db_path) as conn:
+        conn.execute(f"UPDATE {table} SET accessed_at = ? WHERE {column} = ?", (time.time() - seconds_ago, key))
+
+
+def touch_file(path, content="x"):
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def test_register_update_and_get():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetadataStore(os.path.join(tmp, "metadata.db"))
+        store.register("f1", "uploads/f1.csv", "csv", "data.csv", size=10, content_hash="h1")
+        plan = {"plan": [{"action": "drop_duplicates"}]}
+        assert store.update("f1", analysis={"rows": 3}, plan=plan, response={"file_id": "f1"})
+        record = store.get("f1")
+        assert record["original_filename"] == "data.csv" and record["analysis"] == {"rows": 3}
+        assert record["plan"] == plan and record["last_plan"] is None
+        assert not store.update("missing", plan=plan)
+        try:
+            store.update("f1", accessed_at=0)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+        # Only analyzed uploads (with a stored response) are found by content
+        store.register("f2", "uploads/f2.csv", "csv", content_hash="h1")
+        assert store.find_by_hash("h1", "csv")["file_id"] == "f1"
+        assert store.find_by_hash("h1", "xlsx") is None
+
+        # A provisional plan never replaces the exact one
+        assert not store.set_provisional_plan("f1", {"status": "provisional"})
+        assert store.set_provisional_plan("f2", {"status": "provisional"})
+        assert store.get("f2")["plan"] == {"status": "provisional"}
+
+        # get() refreshes the LRU position unless asked not to
+        set_accessed(store, "uploads", "f1", 100)
+        before = store.get("f1", touch=False)["accessed_at"]
+        assert store.get("f1")["accessed_at"] > before
+
+
+def test_older_databases_are_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metadata.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE uploads (file_id TEXT PRIMARY KEY, original_filename TEXT, upload_path TEXT, "
+                         "ext TEXT, size INTEGER, content_hash TEXT, type TEXT, analysis TEXT, plan TEXT, "
+                         "output_path TEXT, created_at REAL, updated_at REAL, accessed_at REAL)")
+        store = MetadataStore(path)
+        store.register("f1", "uploads/f1.csv", "csv")
+        assert store.update("f1", response={"file_id": "f1"}, last_plan={"plan": []})
+        assert store.get("f1")["last_plan"] == {"plan": []}
+
+
+def test_expired_records_are_claimed_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetadataStore(os.path.join(tmp, "metadata.db"))
+        for i in range(40):
+            store.register(f"f{i}", f"uploads/f{i}.csv", "csv")
+            set_accessed(store, "uploads", f"f{i}", 1000 if i < 30 else 0)
+
+        claimed = []
+        def claim():
+            while True:
+                batch = store.claim_expired(500, limit=3)
+                if not batch:
+                    return
+                claimed.extend(r["file_id"] for r in batch)
+        workers = [threading.Thread(target=claim) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # DELETE ... RETURNING hands every expired record to exactly one collector
+        assert sorted(claimed) == sorted(f"f{i}" for i in range(30))
+        assert store.get("f30") is not None and store.get("f0") is None
+
+
+def test_least_recently_used_records_beyond_the_budget_are_claimed():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetadataStore(os.path.join(tmp, "metadata.db"))
+        for i, age in enumerate((30, 10, 20)):
+            store.register(f"f{i}", f"uploads/f{i}.csv", "csv", size=100)
+            set_accessed(store, "uploads", f"f{i}", age)
+        # f1 and f2 are the most recent 200 bytes
+        assert [r["file_id"] for r in store.claim_over_budget("uploads", 250)] == ["f0"]
+        assert store.claim_over_budget("uploads", 250) == []
+        assert store.stats()["uploads"] == {"entries": 2, "bytes": 200}
+
+
+def test_cached_outputs_are_served_and_evicted_least_recently_used_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetadataStore(os.path.join(tmp, "metadata.db"))
+        for key, age in (("k0", 30), ("k1", 20), ("k2", 10)):
+            store.put_output(key, "f1", f"cleaned/cleaned_f1_{key}.csv", 100, {"download_url": key})
+            set_accessed(store, "outputs", key, age)
+        assert store.get_output("k0")["result"] == {"download_url": "k0"}  # now the most recent
+        assert store.get_output("missing") is None
+        assert store.output_referenced("cleaned/cleaned_f1_k1.csv")
+
+        assert [r["cache_key"] for r in store.claim_over_budget("outputs", 250)] == ["k1"]
+        assert not store.output_referenced("cleaned/cleaned_f1_k1.csv")
+        set_accessed(store, "outputs", "k2", 1000)
+        assert [r["cache_key"] for r in store.claim_expired_outputs(500)] == ["k2"]
+        assert store.stats()["outputs"] == {"entries": 1, "bytes": 100}
+
+
+def test_garbage_collection_removes_expired_uploads_and_their_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        upload_dir, cleaned_dir = os.path.join(tmp, "uploads"), os.path.join(tmp, "cleaned")
+        os.makedirs(upload_dir)
+        os.makedirs(cleaned_dir)
+        store = MetadataStore(os.path.join(tmp, "metadata.db"))
+        for file_id, age in (("old", 1000), ("new", 0)):
+            path = touch_file(os.path.join(upload_dir, f"{file_id}.csv"))
+            store.register(file_id, path, "csv", size=1)
+            output = touch_file(os.path.join(cleaned_dir, f"cleaned_{file_id}.csv"))
+            store.update(file_id, output_path=output)
+            set_accessed(store, "uploads", file_id, age)
+        # Unknown to the store and older than the TTL: left over from a crash
+        stray = touch_file(os.path.join(upload_dir, "stray.csv"))
+        os.utime(stray, (time.time() - 1000, time.time() - 1000))
+
+        removed = collect_garbage(store, upload_dir, cleaned_dir, ttl_seconds=500)
+        assert removed == 3
+        assert sorted(os.listdir(upload_dir)) == ["new.csv"]
+        assert sorted(os.listdir(cleaned_dir)) == ["cleaned_new.csv"]
+        assert store.get("old") is None and store.get("new") is not None
+
+
+if __name__ == "__main__":
+    test_register_update_and_get()
+    test_older_databases_are_migrated()
+    test_expired_records_are_claimed_once()
+    test_least_recently_used_records_beyond_the_budget_are_claimed()
+    test_cached_outputs_are_served_and_evicted_least_recently_used_first()
+    test_garbage_collection_removes_expired_uploads_and_their_files()
+    print("[SUCCESS] The metadata store indexes, expires and evicts uploads and outputs.")
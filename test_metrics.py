@@ -0,0 +1,72 @@
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from metrics import MetricsRegistry, Timings  # noqa: E402
+
+
+def sample_frame(n=400):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({"x": rng.normal(size=n), "name": rng.choice([" a", "b ", "c"], n)})
+    df.loc[::7, "x"] = np.nan
+    return pd.concat([df, df.head(40)], ignore_index=True)
+
+
+PLAN = [
+    {"action": "clean_text", "columns": ["name"]},
+    {"action": "impute_or_drop", "details": {"x": "median"}},
+    {"action": "drop_duplicates"},
+]
+
+
+def test_every_step_is_recorded_with_its_rows():
+    timings = Timings()
+    with timings.measure("cleaning", rows_in=440) as entry:
+        cleaned, _ = CleaningOps.clean_tabular(sample_frame(), PLAN, timings)
+        entry["rows_out"] = len(cleaned)
+    result = timings.to_dict("csv")
+    assert [step["name"] for step in result["steps"]] == ["clean_text", "impute_or_drop", "drop_duplicates"]
+    assert result["steps"][-1]["rows_in"] == 440 and result["steps"][-1]["rows_out"] == len(cleaned)
+    assert result["phases"][0]["rows_out"] == len(cleaned)
+    for entry in result["phases"] + result["steps"]:
+        assert entry["wall_ms"] >= 0 and entry["cpu_ms"] >= 0
+
+
+def test_traced_peaks_cover_nested_steps():
+    tracemalloc.start()
+    try:
+        timings = Timings()
+        with timings.measure("outer"):
+            with timings.measure("inner", "step"):
+                block = np.ones(2_000_000)
+                del block
+    finally:
+        tracemalloc.stop()
+    inner, outer = timings.entries
+    assert timings.memory_source == "tracemalloc"
+    # The inner step's allocation is part of the enclosing phase's peak too
+    assert inner["peak_bytes"] >= 16_000_000 and outer["peak_bytes"] >= inner["peak_bytes"]
+
+
+def test_metrics_render_cumulative_histograms():
+    registry = MetricsRegistry()
+    for wall_ms in (3, 40, 40_000):
+        registry.observe("clean", {"file_type": "csv", "phases": [],
+                                   "steps": [{"name": "iqr_filter", "wall_ms": wall_ms, "cpu_ms": 1}]})
+    lines = registry.render().splitlines()
+    assert 'datasanct_step_seconds_bucket{action="iqr_filter",file_type="csv",le="0.005"} 1' in lines
+    assert 'datasanct_step_seconds_bucket{action="iqr_filter",file_type="csv",le="0.05"} 2' in lines
+    assert 'datasanct_step_seconds_bucket{action="iqr_filter",file_type="csv",le="+Inf"} 3' in lines
+    assert 'datasanct_step_seconds_count{action="iqr_filter",file_type="csv"} 3' in lines
+
+
+if __name__ == "__main__":
+    test_every_step_is_recorded_with_its_rows()
+    test_traced_peaks_cover_nested_steps()
+    test_metrics_render_cumulative_histograms()
+    print("[SUCCESS] Steps are timed and exported as histograms.")
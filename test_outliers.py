@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from outliers import compute_bounds, filter_outliers  # noqa: E402
+from plan_compiler import compile_plan, execute_compiled  # noqa: E402
+
+# x's last row is an outlier. Once it is gone, y's last two 20s fall outside fences
+# re-fitted on the rest; fences fitted on the whole frame keep them.
+FRAME = pd.DataFrame({"x": [1.0, 2, 3, 4, 5, 6, 7, 8, 9, 100],
+                      "y": [10.0, 10, 10, 10, 10, 10, 10, 20, 20, 20]})
+
+
+def test_iqr_fences_for_every_column_come_from_the_same_frame():
+    bounds = compute_bounds(FRAME, ["x", "y"], "iqr")
+    # x: Q1 3.25, Q3 7.75; y: Q1 10, Q3 17.5
+    assert bounds == {"x": (-3.5, 14.5), "y": (-1.25, 28.75)}
+    kept, flagged = filter_outliers(FRAME, {"action": "iqr_filter", "columns": ["x", "y"]})
+    pd.testing.assert_frame_equal(kept, FRAME.iloc[:9])
+    assert flagged == {"x": 1, "y": 0}
+
+
+def test_mad_fences_for_every_column_come_from_the_same_frame():
+    bounds = compute_bounds(FRAME, ["x", "y"], "mad")
+    # x: median 5.5, MAD 2.5; y: MAD 0, so the mean absolute deviation (3) scales it
+    assert bounds["x"] == (5.5 - 3.5 * 1.4826 * 2.5, 5.5 + 3.5 * 1.4826 * 2.5)
+    assert abs(bounds["y"][1] - 23.16) < 0.01
+    kept, flagged = filter_outliers(FRAME, {"action": "iqr_filter", "columns": ["x", "y"], "method": "mad"})
+    pd.testing.assert_frame_equal(kept, FRAME.iloc[:9])
+    assert flagged == {"x": 1, "y": 0}
+
+
+def test_executors_apply_one_joint_mask_per_step():
+    for method in ("iqr", "mad"):
+        plan = [{"action": "iqr_filter", "columns": ["x", "y"], "method": method}]
+        for cleaned, report in (CleaningOps.clean_tabular(FRAME, plan), execute_compiled(FRAME, compile_plan(plan))):
+            assert len(cleaned) == 9
+            assert report["outliers_by_column"] == {"x": 1, "y": 0} and report["outliers_removed"] == 1
+        # Two steps re-fit on what the first one left, as separate steps always did
+        cleaned, _ = CleaningOps.clean_tabular(FRAME, [{"action": "iqr_filter", "columns": ["x"], "method": method},
+                                                       {"action": "iqr_filter", "columns": ["y"], "method": method}])
+        assert len(cleaned) == 7
+
+
+if __name__ == "__main__":
+    test_iqr_fences_for_every_column_come_from_the_same_frame()
+    test_mad_fences_for_every_column_come_from_the_same_frame()
+    test_executors_apply_one_joint_mask_per_step()
+    print("[SUCCESS] Outlier fences are fitted jointly per step.")
@@ -0,0 +1,119 @@
+import atexit
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+# Keep uploads/, cleaned/ and the rest of the server's state out of the working directory
+TMP = tempfile.mkdtemp(prefix="datasanct_outputs_")
+atexit.register(shutil.rmtree, TMP, True)
+os.environ.update({name: os.path.join(TMP, name.lower()) for name in
+                   ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR")})
+import config  # noqa: E402
+for _name in ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR"):
+    setattr(config, _name, os.environ[_name])
+config.CONTENT_DEDUPE = True
+
+import pipeline  # noqa: E402
+
+OVERRIDE = {"plan": [{"action": "drop_duplicates"}]}
+
+
+def messy_csv(seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"value": rng.normal(10, 2, 300), "label": rng.choice([" a", "b ", None], 300)})
+    df.loc[::50, "value"] = 1000.0
+    df.loc[::7, "value"] = np.nan
+    return pd.concat([df, df.head(40)]).to_csv(index=False)
+
+
+def analyze(name, content):
+    """
+    What /analyze does with an upload: stored content answers from the store,
+    new content is registered and analyzed.
+    """
+    os.makedirs(pipeline.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(pipeline.CLEANED_DIR, exist_ok=True)
+    file_id = str(uuid.uuid4())
+    path = os.path.join(pipeline.UPLOAD_DIR, f"{file_id}.csv")
+    with open(path, "w") as f:
+        f.write(content)
+    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    duplicate = pipeline.find_duplicate_upload(content_hash, "csv", name)
+    if duplicate:
+        os.remove(path)
+        return duplicate
+    pipeline.metadata.register(file_id, path, "csv", name, os.path.getsize(path), content_hash)
+    return pipeline.run_analysis(file_id, path, "csv", name)
+
+
+def output_bytes(result):
+    with open(os.path.join(pipeline.CLEANED_DIR, os.path.basename(result["download_url"])), "rb") as f:
+        return f.read()
+
+
+def test_identical_uploads_share_the_analysis_and_outputs():
+    content = messy_csv(seed=1)
+    first = analyze("one.csv", content)
+    again = analyze("two.csv", content)
+    assert again["file_id"] == first["file_id"] and again["cache"] == "hit"
+    assert again["original_filename"] == "two.csv"
+
+    cleaned = pipeline.run_clean(first["file_id"])
+    assert "cache" not in cleaned
+    hit = pipeline.run_clean(again["file_id"])
+    assert hit["cache"] == "hit" and hit["download_url"] == cleaned["download_url"]
+
+
+def test_a_plan_override_never_replaces_the_default_output():
+    first = analyze("data.csv", messy_csv(seed=2))
+    file_id = first["file_id"]
+    default = pipeline.run_clean(file_id)
+    default_bytes = output_bytes(default)
+    override = pipeline.run_clean(file_id, plan_override=OVERRIDE)
+    assert override["plan"] == OVERRIDE and override["stats"] != default["stats"]
+    assert override["download_url"] != default["download_url"]
+
+    # The stored plan is still the analysis plan; the override is only recorded as the last one run
+    record = pipeline.metadata.get(file_id)
+    assert record["plan"] == first["plan"] and record["last_plan"] == OVERRIDE
+
+    again = pipeline.run_clean(file_id)
+    assert again["cache"] == "hit"
+    assert again["plan"] == first["plan"] and again["stats"] == default["stats"]
+    assert again["download_url"] == default["download_url"]
+
+    # With the cached outputs evicted, the default clean runs the analysis plan again
+    # and leaves the override's file alone
+    override_bytes = output_bytes(override)
+    pipeline.metadata.claim_over_budget("outputs", 0)
+    rerun = pipeline.run_clean(file_id)
+    assert "cache" not in rerun
+    assert rerun["plan"] == first["plan"] and rerun["stats"] == default["stats"]
+    assert output_bytes(rerun) == default_bytes and output_bytes(override) == override_bytes
+
+
+def test_outputs_are_named_by_plan_without_the_cache():
+    first = analyze("data.csv", messy_csv(seed=3))
+    config.CONTENT_DEDUPE = False
+    try:
+        default = pipeline.run_clean(first["file_id"])
+        default_bytes = output_bytes(default)
+        override = pipeline.run_clean(first["file_id"], plan_override=OVERRIDE)
+    finally:
+        config.CONTENT_DEDUPE = True
+    assert override["download_url"] != default["download_url"]
+    assert output_bytes(default) == default_bytes
+
+
+if __name__ == "__main__":
+    test_identical_uploads_share_the_analysis_and_outputs()
+    test_a_plan_override_never_replaces_the_default_output()
+    test_outputs_are_named_by_plan_without_the_cache()
+    print("[SUCCESS] Cleaned outputs are cached per content and plan.")
@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from output_formats import OUTPUT_FORMATS, FrameWriter, follow_output, format_of, publishing, write_frame  # noqa: E402
+
+
+def sample_frame(n=250):
+    rng = np.random.default_rng(8)
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "value": np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+        "name": pd.Series(rng.choice(["a", "b", None], n), dtype="str"),
+        "kind": pd.Categorical(rng.choice(["x", "y"], n)),
+    })
+
+
+def read_back(path):
+    fmt = format_of(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "arrow":
+        return ipc.open_file(path).read_all().to_pandas()
+    if fmt == "csv.gz":
+        return pd.read_csv(io.BytesIO(gzip.open(path).read()))
+    if fmt == "csv.zst":
+        return pd.read_csv(io.BytesIO(pa.CompressedInputStream(pa.OSFile(path), "zstd").read()))
+    if fmt == "ndjson":
+        return pd.read_json(path, lines=True)
+    return pd.read_excel(path) if fmt == "xlsx" else pd.read_csv(path)
+
+
+def test_every_format_round_trips_in_chunks():
+    df = sample_frame()
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, suffix in OUTPUT_FORMATS.items():
+            path = os.path.join(tmp, f"out{suffix}")
+            write_frame(df, path, chunk_rows=64)
+            back = read_back(path)
+            assert list(back.columns) == list(df.columns), fmt
+            pd.testing.assert_frame_equal(back.astype(object).where(back.notna(), None),
+                                          df.astype(object).where(df.notna(), None),
+                                          check_dtype=False, check_exact=False, rtol=1e-9)
+
+
+def test_chunked_csv_matches_a_single_write():
+    df = sample_frame()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.csv")
+        write_frame(df, path, chunk_rows=7)
+        with open(path) as f:
+            assert f.read() == df.to_csv(index=False)
+
+
+def test_columnar_chunks_are_cast_to_the_first_schema():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.parquet")
+        with FrameWriter(path) as writer:
+            writer.write(pd.DataFrame({"n": [1, 2]}))
+            writer.write(pd.DataFrame({"n": [3.0, np.nan]}))
+        assert pd.read_parquet(path)["n"].tolist()[:3] == [1, 2, 3]
+
+
+def test_download_follows_an_output_while_it_is_written():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.csv")
+
+        def write():
+            with publishing(path), FrameWriter(path) as writer:
+                for i in range(4):
+                    writer.write(pd.DataFrame({"i": [i]}))
+                    time.sleep(0.1)
+
+        async def download():
+            return b"".join([block async for block in follow_output(path, chunk_size=4, poll_seconds=0.02)])
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        while not os.path.exists(path):
+            time.sleep(0.01)
+        body = asyncio.run(download())
+        thread.join()
+        assert body == b"i\n0\n1\n2\n3\n"
+
+
+if __name__ == "__main__":
+    test_every_format_round_trips_in_chunks()
+    test_chunked_csv_matches_a_single_write()
+    test_columnar_chunks_are_cast_to_the_first_schema()
+    test_download_follows_an_output_while_it_is_written()
+    print("[SUCCESS] Every output format round-trips and downloads follow writes.")
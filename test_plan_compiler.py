@@ -0,0 +1,193 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from plan_compiler import compile_plan, duplicate_groups, execute_compiled  # noqa: E402
+from agent import agent  # noqa: E402
+
+REPORT_KEYS = ["removed_columns", "imputed_columns", "outliers_removed", "duplicates_removed", "dropped_rows",
+               "outliers_by_column", "standardized_cells"]
+
+
+def random_frame(rng):
+    """Small messy frame: NaNs, padded strings, mixed objects, heavy duplication, outliers."""
+    n = int(rng.integers(5, 120))
+    df = pd.DataFrame({
+        "num_a": np.where(rng.random(n) < 0.2, np.nan, rng.normal(10, 3, n).round(1)),
+        "num_b": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 5, n)).astype(float),
+        "num_c": rng.integers(0, 3, n),
+        "sparse": np.where(rng.random(n) < 0.7, np.nan, rng.random(n)),
+        "txt": pd.Series(rng.choice([" a", "a", "b ", None, "c"], n), dtype=object),
+        "txt2": pd.Series(rng.choice(["x", " y", None], n), dtype=object),
+        # Values that are equal (1 and 1.0, -0.0 and 0.0) or only look alike (1 and "1")
+        "mixed": pd.Series(rng.choice(np.array([1, "1", 1.0, 2, "2", -0.0, 0.0, None], dtype=object), n),
+                           dtype=object),
+    })
+    df.loc[rng.random(n) < 0.05, "num_a"] = 500.0
+    repeats = df.sample(int(rng.integers(0, n)), replace=True, random_state=int(rng.integers(1 << 30)))
+    return pd.concat([df, repeats]).sample(frac=1, random_state=int(rng.integers(1 << 30)))
+
+
+def random_plan(rng, columns):
+    numeric = [c for c in columns if c.startswith(("num", "sparse"))]
+    text = ["txt", "txt2"]
+    candidates = [
+        {"action": "clean_text", "columns": text},
+        {"action": "drop_columns", "columns": list(rng.choice(columns, int(rng.integers(0, 3)), replace=False))},
+        {"action": "impute_or_drop", "details": {"num_a": str(rng.choice(["mean", "median"])), "num_b": "median",
+                                                 "txt": "mode", "txt2": "mode"}},
+        {"action": "drop_duplicates"},
+        {"action": "iqr_filter", "columns": list(rng.permutation(numeric))},
+        {"action": "iqr_filter", "columns": ["num_b"]},
+    ]
+    picked = [candidates[i] for i in rng.permutation(len(candidates))[:int(rng.integers(1, len(candidates) + 1))]]
+    return picked
+
+
+def assert_same_result(df, plan, analysis):
+    expected, expected_report = CleaningOps.clean_tabular(df, plan)
+    compiled = compile_plan(plan, analysis, min_duplicate_ratio=0.0)
+    actual, actual_report = execute_compiled(df, compiled)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-12)
+    for key in REPORT_KEYS:
+        if key == "imputed_columns":
+            # Pruned steps no longer report imputing columns that are dropped anyway
+            kept = {c for step in compiled for c in step.get("details", {})}
+            expected_report[key] = [e for e in expected_report[key] if e.rsplit(" (", 1)[0] in kept]
+        elif isinstance(expected_report.get(key), dict):
+            kept = {c for step in compiled if step.get("action") != "drop_columns" for c in step.get("columns", [])}
+            expected_report[key] = {c: n for c, n in expected_report[key].items() if c in kept}
+        # Keys that only appear when something happened compare equal to empty ones
+        assert (actual_report.get(key) or None) == (expected_report.get(key) or None), (key, plan, compiled)
+
+
+def test_compiled_plan_matches_naive_executor_on_random_inputs():
+    rng = np.random.default_rng(1234)
+    for _ in range(300):
+        df = random_frame(rng)
+        plan = random_plan(rng, list(df.columns))
+        assert_same_result(df, plan, agent.analyze_tabular(df))
+
+
+def test_compiled_generated_plan_matches_naive_executor():
+    rng = np.random.default_rng(99)
+    for _ in range(50):
+        df = random_frame(rng)
+        analysis = agent.analyze_tabular(df)
+        plan = agent.generate_cleaning_plan(analysis, "tabular")["plan"]
+        assert_same_result(df, plan, analysis)
+
+
+def test_compiler_prunes_dropped_columns_and_collapses_duplicates():
+    plan = [
+        {"action": "clean_text", "columns": ["a", "b"]},
+        {"action": "drop_columns", "columns": ["b"]},
+        {"action": "impute_or_drop", "details": {"a": "mode"}},
+        {"action": "drop_duplicates"},
+        {"action": "iqr_filter", "columns": ["b", "c"]},
+    ]
+    compiled = compile_plan(plan, {"rows": 10, "duplicates": 5})
+    assert [s["action"] for s in compiled] == [
+        "drop_columns", "collapse_duplicates", "clean_text", "impute_or_drop", "drop_duplicates", "iqr_filter"]
+    assert compiled[2]["columns"] == ["a"]
+    assert compiled[-1]["columns"] == ["c"]
+
+
+def run_both(df, plan, analysis):
+    """
+    (compiled steps, compiled result, naive result) for `plan` on `df`.
+    """
+    compiled = compile_plan(plan, analysis)
+    return compiled, execute_compiled(df, compiled), CleaningOps.clean_tabular(df, plan)
+
+
+# Pinned by hand rather than against CleaningOps, so a change to either executor shows up here
+
+
+def test_pinned_hoisted_drop_prunes_work_on_dropped_columns():
+    df = pd.DataFrame({"name": [" Ann", "bob ", " Ann", None], "note": [" x", None, "y ", "z"],
+                       "n": [1.0, np.nan, 3.0, 1.0]})
+    plan = [
+        {"action": "clean_text", "columns": ["name", "note"]},
+        {"action": "impute_or_drop", "details": {"note": "mode", "n": "median"}},
+        {"action": "drop_columns", "columns": ["note"]},
+    ]
+    compiled, (actual, report), (naive, _) = run_both(df, plan, {"rows": 4, "duplicates": 0})
+    assert [s["action"] for s in compiled] == ["drop_columns", "clean_text", "impute_or_drop"]
+    assert compiled[1]["columns"] == ["name"] and compiled[2]["details"] == {"n": "median"}
+    expected = pd.DataFrame({"name": ["Ann", "bob", "Ann", None], "n": [1.0, 1.0, 3.0, 1.0]})
+    for frame in (actual, naive):
+        pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+    assert report["removed_columns"] == ["note"]
+    assert report["imputed_columns"] == ["n (median)"]
+    assert report["standardized_cells"] == {"name": 3}
+
+
+def test_pinned_collapsed_duplicates_keep_their_weight():
+    df = pd.DataFrame({"key": ["a", "a", "a", "b", "c", "c"], "v": [1.0, 1.0, 1.0, 4.0, np.nan, np.nan],
+                       "t": [" p", " p", " p", "q", None, None]})
+    plan = [
+        {"action": "clean_text", "columns": ["t"]},
+        {"action": "impute_or_drop", "details": {"v": "mean", "t": "mode"}},
+        {"action": "drop_duplicates"},
+    ]
+    compiled, (actual, report), (naive, _) = run_both(df, plan, {"rows": 6, "duplicates": 3})
+    assert [s["action"] for s in compiled] == ["collapse_duplicates", "clean_text", "impute_or_drop",
+                                              "drop_duplicates"]
+    # The mean counts "a" three times, (1 + 1 + 1 + 4) / 4, as it does before deduplication
+    expected = pd.DataFrame({"key": ["a", "b", "c"], "v": [1.0, 4.0, 1.75], "t": ["p", "q", "p"]},
+                            index=[0, 3, 4])
+    for frame in (actual, naive):
+        pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+    assert report["standardized_cells"] == {"t": 3}
+    assert report["duplicates_removed"] == 3 and report["dropped_rows"] == 3
+
+
+def test_pinned_fused_outlier_filter():
+    df = pd.DataFrame({"x": [1.0, 2, 3, 4, 100, 3], "y": [10.0, 11, 12, 13, 12, 50]})
+    plan = [{"action": "iqr_filter", "columns": ["x", "y"]}]
+    # Fences: x in [0, 6] (Q1 2.25, Q3 3.75), y in [9, 15] (Q1 11.25, Q3 12.75)
+    _, (actual, report), (naive, _) = run_both(df, plan, None)
+    expected = df.iloc[:4]
+    for frame in (actual, naive):
+        pd.testing.assert_frame_equal(frame, expected)
+    assert report["outliers_by_column"] == {"x": 1, "y": 1}
+    assert report["outliers_removed"] == 2 and report["dropped_rows"] == 2
+
+
+
+def test_pinned_collapse_tells_numbers_from_their_strings():
+    df = pd.DataFrame({"a": pd.Series([1, "1", 2, 2], dtype=object), "b": [1.0, 1.0, np.nan, np.nan]})
+    plan = [{"action": "impute_or_drop", "details": {"b": "median"}}, {"action": "drop_duplicates"}]
+    compiled, (actual, report), (expected, expected_report) = run_both(df, plan, agent.analyze_tabular(df))
+    assert compiled[0]["action"] == "collapse_duplicates"
+    pd.testing.assert_frame_equal(actual, expected)
+    assert list(actual["a"]) == [1, "1", 2] and report["duplicates_removed"] == 1
+
+
+def test_duplicate_groups_survive_hash_collisions():
+    df = pd.DataFrame({"a": [1, 2, 1, 3], "b": ["x", "y", "x", None]})
+    hash_rows = pd.util.hash_pandas_object
+    # Every row hashes alike: only the equality check tells them apart
+    pd.util.hash_pandas_object = lambda frame, index=False: pd.Series(np.zeros(len(frame), dtype=np.uint64))
+    try:
+        groups = duplicate_groups(df)
+    finally:
+        pd.util.hash_pandas_object = hash_rows
+    assert list(groups) == [0, 1, 0, 2]
+
+
+if __name__ == "__main__":
+    test_compiled_plan_matches_naive_executor_on_random_inputs()
+    test_compiled_generated_plan_matches_naive_executor()
+    test_compiler_prunes_dropped_columns_and_collapses_duplicates()
+    test_pinned_hoisted_drop_prunes_work_on_dropped_columns()
+    test_pinned_collapsed_duplicates_keep_their_weight()
+    test_pinned_fused_outlier_filter()
+    test_pinned_collapse_tells_numbers_from_their_strings()
+    test_duplicate_groups_survive_hash_collisions()
+    print("[SUCCESS] Compiled plans match the naive executor.")
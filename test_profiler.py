@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from profiler import count_duplicate_rows  # noqa: E402
+
+
+def test_duplicate_count_matches_duplicated_on_mixed_objects():
+    mixed = pd.Series([1, 1.0, "1", None, np.nan], dtype=object)
+    for df in (pd.DataFrame({"a": mixed}),
+               pd.DataFrame({"a": mixed, "b": [1, 1, 1, 1, 1]}),
+               pd.DataFrame({"a": [0.0, -0.0, np.nan, np.nan], "b": [1, 1, 2, 2]})):
+        assert count_duplicate_rows(df) == int(df.duplicated().sum())
+
+
+def test_duplicate_count_matches_duplicated_on_random_frames():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = int(rng.integers(2, 300))
+        df = pd.DataFrame({
+            "num": rng.choice([0.0, -0.0, 1.5, np.nan], n),
+            "int": rng.integers(0, 3, n),
+            "obj": pd.Series(rng.choice(np.array([1, 1.0, "1", "a", None, np.nan, True], dtype=object), n), dtype=object),
+            "text": pd.Series(rng.choice(["x", "y", None], n), dtype="str"),
+            "cat": pd.Categorical(rng.choice(["u", "v"], n)),
+        })
+        assert count_duplicate_rows(df) == int(df.duplicated().sum())
+
+
+def test_unhashable_cells_behave_like_duplicated():
+    df = pd.DataFrame({"a": [[1], [1], [2]], "b": [1, 1, 1]})
+    for count in (lambda: int(df.duplicated().sum()), lambda: count_duplicate_rows(df)):
+        try:
+            count()
+            assert False, "expected TypeError"
+        except TypeError:
+            pass
+
+
+if __name__ == "__main__":
+    test_duplicate_count_matches_duplicated_on_mixed_objects()
+    test_duplicate_count_matches_duplicated_on_random_frames()
+    test_unhashable_cells_behave_like_duplicated()
+    print("[SUCCESS] Profiled duplicate counts match DataFrame.duplicated().")
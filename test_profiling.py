@@ -0,0 +1,59 @@
+import json
+import os
+import pstats
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from profiling import new_profile_id, profile_paths, run_profiled  # noqa: E402
+
+
+def allocate_and_sort():
+    values = np.random.default_rng(0).normal(size=2_000_000)
+    return float(np.sort(values)[0])
+
+
+def test_profile_summary_and_raw_stats_are_written():
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_id = new_profile_id()
+        assert run_profiled(profile_id, tmp, "run_clean", allocate_and_sort, top_n=5) == allocate_and_sort()
+        paths = profile_paths(tmp, profile_id)
+        with open(paths["summary"]) as f:
+            summary = json.load(f)
+        assert summary["task"] == "run_clean" and summary["error"] is None
+        assert len(summary["top_functions"]) == 5
+        assert any("allocate_and_sort" == row["function"] for row in summary["top_cumulative"])
+        # The 16 MB array was alive at the peak even though it is gone by the end
+        assert summary["peak_traced_bytes"] >= 16_000_000
+        assert summary["top_allocations"][0]["size_bytes"] >= 16_000_000
+        assert pstats.Stats(paths["pstats"]).total_calls > 0
+
+
+def test_failed_tasks_are_profiled_and_old_profiles_pruned():
+    def fail():
+        raise ValueError("bad upload")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = [new_profile_id() for _ in range(3)]
+        for profile_id in ids:
+            try:
+                run_profiled(profile_id, tmp, "run_analysis", fail, keep=2)
+            except ValueError:
+                pass
+        assert sorted(os.listdir(tmp)) == sorted(f"{i}{suffix}" for i in ids[1:] for suffix in (".json", ".prof"))
+        with open(profile_paths(tmp, ids[-1])["summary"]) as f:
+            assert json.load(f)["error"] == "ValueError: bad upload"
+
+
+def test_only_uuids_name_profiles():
+    assert profile_paths("profiles", "../metadata") is None
+    assert profile_paths("profiles", new_profile_id()) is not None
+
+
+if __name__ == "__main__":
+    test_profile_summary_and_raw_stats_are_written()
+    test_failed_tasks_are_profiled_and_old_profiles_pruned()
+    test_only_uuids_name_profiles()
+    print("[SUCCESS] Profiles are captured, summarized and pruned.")
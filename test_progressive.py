@@ -0,0 +1,141 @@
+import atexit
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+# Keep uploads/, cleaned/ and the rest of the server's state out of the working directory
+TMP = tempfile.mkdtemp(prefix="datasanct_progressive_")
+atexit.register(shutil.rmtree, TMP, True)
+os.environ.update({name: os.path.join(TMP, name.lower()) for name in
+                   ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR")})
+import config  # noqa: E402
+for _name in ("UPLOAD_DIR", "CLEANED_DIR", "FRAME_CACHE_DIR", "METADATA_DB", "PROFILES_DIR"):
+    setattr(config, _name, os.environ[_name])
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jobs import JobManager  # noqa: E402
+import main  # noqa: E402
+import pipeline  # noqa: E402
+
+
+def messy_csv(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"value": rng.normal(10, 2, rows), "label": rng.choice([" a", "b ", None], rows)})
+    df.loc[::13, "value"] = np.nan
+    return pd.concat([df, df.head(rows // 10)]).to_csv(index=False)
+
+
+def upload(content):
+    """
+    A registered upload, as /analyze leaves it before the analysis job runs.
+    """
+    os.makedirs(pipeline.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(pipeline.CLEANED_DIR, exist_ok=True)
+    file_id = str(uuid.uuid4())
+    path = os.path.join(pipeline.UPLOAD_DIR, f"{file_id}.csv")
+    with open(path, "w") as f:
+        f.write(content)
+    pipeline.metadata.register(file_id, path, "csv", "data.csv", os.path.getsize(path),
+                               hashlib.sha256(content.encode()).hexdigest())
+    return file_id, path
+
+
+@contextmanager
+def thread_jobs():
+    """
+    A thread-pool JobManager serving main's routes with the real pipeline. main keeps
+    the directories of whichever test imported it first, so they follow pipeline's.
+    """
+    saved = main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR
+    manager = main.jobs = JobManager("thread", max_workers=1)
+    main.UPLOAD_DIR, main.CLEANED_DIR = pipeline.UPLOAD_DIR, pipeline.CLEANED_DIR
+    os.makedirs(pipeline.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(pipeline.CLEANED_DIR, exist_ok=True)
+    try:
+        yield manager
+    finally:
+        manager.shutdown()
+        main.jobs, main.UPLOAD_DIR, main.CLEANED_DIR = saved
+
+
+def test_the_sample_stays_within_its_row_budget():
+    rows = 3 * pipeline.SAMPLE_CHUNK_ROWS
+    _, path = upload(messy_csv(rows, seed=1))
+    total = rows + rows // 10
+
+    provisional = pipeline.sample_analysis(path, "csv", 60, 500)
+    assert provisional["plan"]["status"] == "provisional"
+    assert provisional["sample"] == {"rows": 500, "rows_scanned": total, "complete": False}
+    assert provisional["analysis"]["rows"] == total and provisional["analysis"]["profile_mode"] == "sample"
+    # Null counts are scaled from the sample to the whole file
+    assert abs(provisional["analysis"]["missing_values"]["value"] / total - 1 / 13) < 0.05
+
+    # Out of time after the first chunk: the total is extrapolated from the bytes read
+    # (the parser reads ahead, so only roughly)
+    hurried = pipeline.sample_analysis(path, "csv", 0, 500)
+    assert hurried["sample"]["rows"] == 500 and hurried["sample"]["rows_scanned"] == pipeline.SAMPLE_CHUNK_ROWS
+    assert total / 2 < hurried["analysis"]["rows"] < 2 * total
+
+    small = pipeline.sample_analysis(upload(messy_csv(100, seed=2))[1], "csv", 60, 500)
+    assert small["sample"] == {"rows": 110, "rows_scanned": 110, "complete": True}
+    assert pipeline.sample_analysis(path, "png", 60, 500) is None
+
+
+def test_the_upload_preview_drops_the_incomplete_last_line():
+    data = messy_csv(200, seed=3).encode()
+    preview = pipeline.preview_analysis(data[:1000], "csv")
+    assert preview["plan"]["status"] == "provisional"
+    assert preview["sample"]["rows"] == data[:1000].count(b"\n") - 1
+    assert pipeline.preview_analysis(data[:1000], "xlsx") is None
+    assert pipeline.preview_analysis(data[:5], "csv") is None
+
+
+def test_a_provisional_plan_gives_way_to_the_final_one():
+    file_id, path = upload(messy_csv(2000, seed=4))
+    provisional = pipeline.sample_analysis(path, "csv", 60, 300)
+    assert pipeline.metadata.set_provisional_plan(file_id, provisional["plan"])
+
+    # Before the exact analysis finishes, /clean re-plans unless asked to use the provisional plan
+    assert pipeline.run_clean(file_id, use_provisional=True)["plan"]["status"] == "provisional"
+    assert pipeline.run_clean(file_id)["plan"]["status"] == "final"
+
+    final = pipeline.run_analysis(file_id, path, "csv", "data.csv")["plan"]
+    assert final["status"] == "final"
+    # A late provisional plan never replaces the final one
+    assert not pipeline.metadata.set_provisional_plan(file_id, provisional["plan"])
+    assert pipeline.metadata.get(file_id)["plan"] == final
+    assert pipeline.run_clean(file_id)["plan"] == final
+    assert pipeline.run_clean(file_id, use_provisional=True)["plan"] == final
+
+
+def test_progressive_analysis_ends_with_the_final_plan():
+    with thread_jobs() as manager:
+        client = TestClient(main.app)
+        response = client.post("/analyze?progressive=true",
+                               files={"file": ("data.csv", messy_csv(5000, seed=5), "text/csv")})
+        assert response.status_code == 202, response.text
+        accepted = response.json()
+        assert accepted["plan"]["status"] == "provisional" and accepted["sample"]["rows"] <= config.ANALYSIS_SAMPLE_ROWS
+        final = manager.get(accepted["job_id"]).future.result(timeout=30)["plan"]
+        assert final["status"] == "final"
+        assert pipeline.metadata.get(accepted["file_id"])["plan"] == final
+
+        cleaned = client.post(f"/clean/{accepted['file_id']}")
+        assert cleaned.status_code == 200, cleaned.text
+        assert cleaned.json()["plan"] == final
+
+
+if __name__ == "__main__":
+    test_the_sample_stays_within_its_row_budget()
+    test_the_upload_preview_drops_the_incomplete_last_line()
+    test_a_provisional_plan_gives_way_to_the_final_one()
+    test_progressive_analysis_ends_with_the_final_plan()
+    print("[SUCCESS] Provisional plans are sampled within budget and give way to the final plan.")
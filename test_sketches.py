@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from agent import CleaningAgent  # noqa: E402
+from sketches import KLLSketch, ReservoirSample, RowHashSketch  # noqa: E402
+
+# Rank error allowed for a k=200 sketch (KLL's bound is O(1/k) with high probability)
+RANK_ERROR = 0.01
+
+
+def rank_error(values, qs, estimates):
+    # A value repeated in the data stands for a range of ranks
+    values = np.sort(values)
+    lo = np.searchsorted(values, estimates, side="left") / len(values)
+    hi = np.searchsorted(values, estimates, side="right") / len(values)
+    return max(max(l - q, q - h, 0.0) for q, l, h in zip(qs, lo, hi))
+
+
+def messy_frame(rows=40000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "value": np.where(rng.random(rows) < 0.05, np.nan, rng.lognormal(3, 1, rows)),
+        "count": rng.integers(0, 50, rows),
+        "sparse": np.where(np.arange(rows) < rows - 500, np.nan, rng.random(rows)),
+        "label": rng.choice(["a", "b", "c", None], rows),
+    })
+    # Duplicates spread over several chunks
+    return pd.concat([df, df.sample(3000, random_state=1)], ignore_index=True)
+
+
+def test_streaming_profile_matches_the_in_memory_one():
+    agent = CleaningAgent()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        messy_frame().to_csv(path, index=False)
+        whole = pd.read_csv(path)
+        expected = agent.analyze_tabular(whole)
+        actual = agent.analyze_tabular_chunks(pd.read_csv(path, chunksize=4000))
+
+    for key in ("rows", "columns_list", "missing_values", "dtypes", "duplicates",
+                "numeric_columns", "categorical_columns"):
+        assert actual[key] == expected[key], key
+    assert actual["duplicates_exact"]
+    for col in expected["numeric_columns"]:
+        got, want = actual["stats"][col], expected["stats"][col]
+        for stat in ("mean", "std", "min", "max"):
+            assert abs(got[stat] - want[stat]) <= 1e-9 * max(1.0, abs(want[stat])), (col, stat)
+        valid = whole[col].dropna().to_numpy(dtype=float)
+        assert rank_error(valid, (0.25, 0.75), (got["25%"], got["75%"])) <= RANK_ERROR, col
+
+
+def test_merged_quantile_sketches_keep_the_error_bound():
+    rng = np.random.default_rng(2)
+    values = rng.normal(0, 1, 200000)
+    qs = (0.01, 0.25, 0.5, 0.75, 0.99)
+    parts = [KLLSketch(k=200, seed=i) for i in range(4)]
+    for part, chunk in zip(parts, np.array_split(values, 4)):
+        for block in np.array_split(chunk, 10):
+            part.update(block)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.count == values.size
+    # Memory stays bounded by the compactors, not the input
+    assert sum(level.size for level in merged.levels) < 2000
+    assert rank_error(values, qs, merged.quantiles(qs)) <= RANK_ERROR
+    assert np.isnan(KLLSketch().quantiles([0.5])).all()
+
+
+def test_row_hashes_count_duplicates_like_duplicated_across_chunks():
+    mixed = pd.DataFrame({
+        "a": pd.Series([1, "1", 1.0, True, None, np.nan, "None", -0.0, 0.0, "a"] * 3, dtype=object),
+        "b": [1.0, 1.0, 1.0, 1.0, 2.0, 2.0, 2.0, 3.0, 3.0, 3.0] * 3,
+    })
+    sketch = RowHashSketch()
+    for chunk in np.array_split(np.arange(len(mixed)), 4):
+        sketch.update(mixed.iloc[chunk])
+    assert sketch.duplicates() == int(mixed.duplicated().sum())
+
+
+def test_row_hashes_fall_back_to_hyperloglog_past_the_exact_limit():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"id": np.arange(50000), "x": rng.random(50000)})
+    df = pd.concat([df, df.iloc[:10000]], ignore_index=True)
+    left, right = RowHashSketch(exact_limit=5000), RowHashSketch(exact_limit=5000)
+    left.update(df.iloc[:30000])
+    right.update(df.iloc[30000:])
+    assert not left.is_exact
+    merged = left.merge(right)
+    assert merged.rows == len(df) and not merged.is_exact
+    # HyperLogLog with 2 ** 14 registers: about 1% standard error on the distinct count
+    assert abs(merged.distinct() - 50000) <= 50000 * 0.03
+    assert abs(merged.duplicates() - 10000) <= 50000 * 0.03
+
+
+def test_reservoir_keeps_a_uniform_sample_within_its_budget():
+    sample = ReservoirSample(500, seed=4)
+    for start in range(0, 20000, 1000):
+        sample.update(pd.DataFrame({"row": np.arange(start, start + 1000)}))
+    rows = sample.frame()["row"]
+    assert len(rows) == 500 and rows.is_unique and not sample.complete
+    # Drawn from the whole stream, not just its head or tail
+    assert 6000 < rows.mean() < 14000
+
+
+if __name__ == "__main__":
+    test_streaming_profile_matches_the_in_memory_one()
+    test_merged_quantile_sketches_keep_the_error_bound()
+    test_row_hashes_count_duplicates_like_duplicated_across_chunks()
+    test_row_hashes_fall_back_to_hyperloglog_past_the_exact_limit()
+    test_reservoir_keeps_a_uniform_sample_within_its_budget()
+    print("[SUCCESS] The streaming profiler matches the in-memory one within its sketch bounds.")
@@ -0,0 +1,112 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from cleaning_ops import CleaningOps  # noqa: E402
+from plan_compiler import compile_plan, execute_compiled  # noqa: E402
+from step_cache import StepCache, frame_bytes  # noqa: E402
+
+
+def messy_frame(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "value": np.where(rng.random(rows) < 0.2, np.nan, rng.normal(10, 3, rows)),
+        "count": rng.integers(0, 5, rows).astype(float),
+        "label": pd.Series(rng.choice([" a", "a", "B ", None], rows), dtype=object),
+        "junk": rng.random(rows),
+    })
+    df.loc[::97, "value"] = 500.0
+    return pd.concat([df, df.head(300)], ignore_index=True)
+
+
+PLAN = [
+    {"action": "clean_text", "columns": ["label"]},
+    {"action": "impute_or_drop", "details": {"value": "median", "label": "mode"}},
+    {"action": "drop_duplicates"},
+    {"action": "iqr_filter", "columns": ["value"]},
+]
+
+
+def test_edited_plan_resumes_after_the_shared_prefix():
+    df = messy_frame()
+    edited = PLAN[:-1] + [{"action": "iqr_filter", "columns": ["value", "count"]}]
+    for run in (lambda d, p, memo=None: execute_compiled(d, compile_plan(p), memo=memo),
+                lambda d, p, memo=None: CleaningOps.clean_tabular(d, p, memo=memo)):
+        cache = StepCache(64 * 1024 * 1024)
+        first = cache.memo("upload:1", df)
+        run(df, PLAN, first)
+        assert first.reused == 0
+
+        again = cache.memo("upload:1", df)
+        actual, actual_report = run(df, edited, again)
+        assert again.reused == len(PLAN) - 1
+        expected, expected_report = run(df, edited)
+        pd.testing.assert_frame_equal(actual, expected)
+        assert actual_report == expected_report
+
+        # A different source (or a replaced upload) never matches
+        other = cache.memo("upload:2", df)
+        run(df, edited, other)
+        assert other.reused == 0
+
+
+def test_memoized_frames_are_not_changed_by_later_steps():
+    df = messy_frame()
+    cache = StepCache(64 * 1024 * 1024)
+    CleaningOps.clean_tabular(df, [{"action": "clean_text", "columns": ["label"]}], memo=cache.memo("k", df))
+    memo = cache.memo("k", df)
+    # drop_columns runs in place on the resumed frame
+    CleaningOps.clean_tabular(df, [{"action": "clean_text", "columns": ["label"]},
+                                   {"action": "drop_columns", "columns": ["junk"]}], memo=memo)
+    assert memo.reused == 1
+    resumed = cache.memo("k", df).resume("stepwise", [{"action": "clean_text", "columns": ["label"]}])
+    assert "junk" in resumed[1].columns
+
+
+def test_cache_is_bounded_and_evicts_least_recently_used():
+    df = messy_frame()
+    cache = StepCache(int(frame_bytes(df) * 2.5))
+    for key in ("a", "b", "c"):
+        cache.put(key, df.copy(), None, {})
+    assert cache.get("a") is None and cache.get("b") is not None
+    cache.put("d", df.copy(), None, {})
+    # "b" was used more recently than "c"
+    assert cache.get("c") is None and cache.get("b") is not None
+    assert cache.total <= cache.max_bytes
+
+
+def test_columns_shared_between_steps_are_counted_once():
+    df = messy_frame()
+    df["text"] = df["label"].astype("str")
+    size = frame_bytes(df)
+    # Within 10% of a deep scan, from a sample of the object column
+    assert abs(size - df.memory_usage(index=True, deep=True).sum()) < size * 0.1
+
+    cache = StepCache(size * 10)
+    cache.put("a", df, None, {})
+    # Like a plan step: one column replaced, the others shared under copy-on-write
+    step = df.assign(value=df["value"].fillna(0))
+    cache.put("b", step, None, {})
+    # Each entry has its own index
+    value_bytes, index_bytes = step["value"].to_numpy().nbytes, df.index.nbytes
+    assert cache.total == size + value_bytes + index_bytes
+    cache.put("c", df.copy(deep=False), None, {})
+    assert cache.total == size + value_bytes + 2 * index_bytes
+
+    # Storage is released with the last entry using it
+    cache.max_bytes = size + value_bytes
+    cache.put("a", df, None, {})
+    assert cache.get("b") is None and cache.total == size + index_bytes
+    cache.clear()
+    assert cache.total == 0
+
+
+if __name__ == "__main__":
+    test_edited_plan_resumes_after_the_shared_prefix()
+    test_memoized_frames_are_not_changed_by_later_steps()
+    test_cache_is_bounded_and_evicts_least_recently_used()
+    test_columns_shared_between_steps_are_counted_once()
+    print("[SUCCESS] Edited plans reuse memoized steps.")
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from text_ops import clean_text_step  # noqa: E402
+
+
+def frame():
+    return pd.DataFrame({
+        "obj": pd.Series([" a", "a", None, np.nan, "b ", 5], dtype=object),
+        "arrow": pd.Series([" a", None, "b", "b ", " ", "c"], dtype="string[pyarrow]"),
+        "text": pd.Series([" x", "x", None, "y", "y ", " "], dtype="str"),
+        "n": [1.0, np.nan, 2.0, 3.0, 4.0, 5.0],
+    })
+
+
+def test_object_columns_are_stripped_and_missing_cells_stay_missing():
+    df, changed = clean_text_step(frame(), {"action": "clean_text", "columns": ["obj", "n", "absent"]})
+    # Numbers in object columns become text, which counts as a change
+    assert changed == {"obj": 3}
+    assert list(df["obj"][[0, 1, 4, 5]]) == ["a", "a", "b", "5"]
+    assert df["obj"][[2, 3]].isna().all() and df["obj"].dtype == object
+    assert df["n"].isna().sum() == 1
+
+
+def test_string_dtypes_strip_in_place():
+    df, changed = clean_text_step(frame(), {"action": "clean_text", "columns": ["arrow", "text"]})
+    assert changed == {"arrow": 3, "text": 3}
+    assert str(df["arrow"].dtype) == "string" and df["arrow"].isna().tolist() == [False, True] + [False] * 4
+    assert df["arrow"].dropna().tolist() == ["a", "b", "b", "", "c"]
+    assert df["text"].dropna().tolist() == ["x", "x", "y", "y", ""] and df["text"].isna().sum() == 1
+
+
+def test_category_output_and_weighted_counts():
+    weights = np.array([1, 2, 3, 4, 5, 6])
+    step = {"action": "clean_text", "columns": ["obj", "arrow"], "as_category": True}
+    df, changed = clean_text_step(frame(), step, weights)
+    # Every row counts as many times as its weight
+    assert changed == {"obj": 1 + 5 + 6, "arrow": 1 + 4 + 5}
+    for col in ("obj", "arrow"):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+        assert list(df[col].cat.categories) == sorted(df[col].cat.categories)
+    assert df["obj"].astype(object).where(df["obj"].notna(), None).tolist() == ["a", "a", None, None, "b", "5"]
+    assert df["arrow"].isna().tolist() == [False, True, False, False, False, False]
+
+
+if __name__ == "__main__":
+    test_object_columns_are_stripped_and_missing_cells_stay_missing()
+    test_string_dtypes_strip_in_place()
+    test_category_output_and_weighted_counts()
+    print("[SUCCESS] clean_text_step strips text and counts its changes exactly.")
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+from workbook import read_workbook, sheet_names, write_parquet_sheets, write_workbook  # noqa: E402
+
+
+def sample_sheets():
+    rng = np.random.default_rng(3)
+    return {
+        "Orders": pd.DataFrame({"id": np.arange(50), "amount": rng.normal(100, 5, 50).round(2)}),
+        "Customers 2024": pd.DataFrame({"name": rng.choice(["ann", " bo", None], 20), "age": rng.integers(18, 90, 20)}),
+        "empty": pd.DataFrame({"only_header": pd.Series([], dtype=float)}),
+    }
+
+
+def test_every_sheet_is_read_in_order_with_any_worker_count():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "book.xlsx")
+        write_workbook(path, sample_sheets())
+        assert sheet_names(path, "xlsx") == list(sample_sheets())
+        sequential = read_workbook(path, "xlsx", workers=1)
+        parallel = read_workbook(path, "xlsx", workers=3)
+        assert list(sequential) == list(parallel) == list(sample_sheets())
+        for name, df in sequential.items():
+            pd.testing.assert_frame_equal(parallel[name], df)
+            pd.testing.assert_frame_equal(df, pd.read_excel(path, sheet_name=name, engine="openpyxl"))
+
+
+def test_parquet_sheets_get_safe_names():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_parquet_sheets(tmp, sample_sheets())
+        assert [arcname for arcname, _ in files] == ["000_Orders.parquet", "001_Customers_2024.parquet",
+                                                     "002_empty.parquet"]
+        pd.testing.assert_frame_equal(pd.read_parquet(files[0][1]), sample_sheets()["Orders"])
+
+
+if __name__ == "__main__":
+    test_every_sheet_is_read_in_order_with_any_worker_count()
+    test_parquet_sheets_get_safe_names()
+    print("[SUCCESS] Workbooks are read and written sheet by sheet.")